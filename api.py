@@ -0,0 +1,333 @@
+"""
+API JSON — Crypto Predictor 5min
+═════════════════════════════════
+Servicio HTTP sin interfaz para bots. Usa las mismas caches que la app
+(analizar() por par y minuto, scanner de fondo) y un pool de hilos para
+las consultas por lotes.
+
+  GET /prediccion?symbol=BTC       predicción, precio y régimen
+  GET /indicadores?symbol=BTC      valores, señales y puntuaciones
+  GET /scan?symbol=BTC             scan rápido 1m de un símbolo
+  GET /scan                        últimos resultados del scanner de fondo
+  GET /scan?universo=1             top-K alcista/bajista de todos los pares (--universo)
+  GET /lote?symbols=BTC,ETH&tipo=prediccion|indicadores|scan
+  GET /metricas                    latencias por endpoint, rechazos, caches
+
+Uso:  python api.py --puerto 8080 [--registro predicciones] [--metricas-puerto 9108]
+                   [--universo]
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from crypto_predictor import (
+    analizar, scan_rapido, usar_motor_divergencia, usar_motor_correlacion,
+    usar_historial_derivados, usar_instantaneas, CacheLRU, _CACHE_ANALISIS,
+)
+from correlacion import MatrizCorrelacion
+from derivados import HistorialDerivados
+from registro import RegistroPredicciones
+from metricas import METRICAS, ServidorMetricas
+from divergencia import MotorDivergencia
+from instantanea import Instantaneas
+from scanner import EscanerUniverso, ServicioScan
+
+_TOP = ["BTC", "ETH", "SOL", "XRP", "BNB", "ADA", "DOGE", "DOT", "AVAX", "LINK", "LTC", "ATOM"]
+
+
+def _json_seguro(obj):
+    """Convierte a tipos JSON: numpy → Python, NaN/inf → None, tuplas → listas."""
+    if isinstance(obj, dict):
+        return {str(k): _json_seguro(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_seguro(v) for v in obj]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+# ─────────────────────────────────────────────
+# MÉTRICAS DE LATENCIA
+# ─────────────────────────────────────────────
+class MetricasLatencia:
+    """
+    Por endpoint: peticiones, errores y las últimas `ventana` latencias
+    para p50/p95/p99. Seguro entre hilos.
+    """
+
+    def __init__(self, ventana: int = 2048):
+        self._lock  = threading.Lock()
+        self._ventana = ventana
+        self._lat   = {}
+        self._n     = {}
+        self._errores = {}
+        self.rechazadas = 0
+
+    def registrar(self, endpoint: str, segundos: float, ok: bool = True):
+        with self._lock:
+            self._lat.setdefault(endpoint, deque(maxlen=self._ventana)).append(segundos)
+            self._n[endpoint] = self._n.get(endpoint, 0) + 1
+            if not ok:
+                self._errores[endpoint] = self._errores.get(endpoint, 0) + 1
+
+    def rechazar(self):
+        with self._lock:
+            self.rechazadas += 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            lat = {k: np.array(v) for k, v in self._lat.items()}
+            n, err, rech = dict(self._n), dict(self._errores), self.rechazadas
+        endpoints = {}
+        for k, v in lat.items():
+            p50, p95, p99 = np.percentile(v, [50, 95, 99]) * 1000
+            endpoints[k] = {"peticiones": n[k], "errores": err.get(k, 0),
+                            "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                            "max_ms": v.max() * 1000}
+        return {"endpoints": endpoints, "rechazadas": rech}
+
+
+# ─────────────────────────────────────────────
+# VISTAS — análisis → JSON
+# ─────────────────────────────────────────────
+def _vista_prediccion(a: dict) -> dict:
+    pred, info = a["pred"], a["info"]
+    return {
+        "symbol":      info["nombre"],
+        "precio":      info["precio_actual"],
+        "cambio_pct":  info["cambio_pct"],
+        "regimen":     a["regimen"],
+        "hurst":       a["hurst"],
+        "prediccion":  {k: v for k, v in pred.items() if k != "pesos_efectivos"},
+        "ts":          a["ts"],
+    }
+
+
+def _vista_indicadores(a: dict) -> dict:
+    return {
+        "symbol":       a["info"]["nombre"],
+        "indicadores":  a["indicadores"],
+        "señales":      {k: {"tipo": s[0], "texto": s[1]} for k, s in a["señales"].items()},
+        "puntuaciones": a["puntuaciones"],
+        "ts":           a["ts"],
+    }
+
+
+# ─────────────────────────────────────────────
+# SERVICIO
+# ─────────────────────────────────────────────
+class ServicioAPI:
+    """
+    Servidor HTTP multihilo. Como mucho `max_concurrentes` peticiones se
+    atienden a la vez; las demás esperan hasta `espera_max` s y si no hay
+    hueco reciben 503. Los lotes (hasta `max_lote` símbolos) se resuelven
+    en paralelo en un pool de `workers` hilos.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 8080,
+                 max_concurrentes: int = 32, espera_max: float = 2.0,
+                 workers: int = 16, max_lote: int = 50,
+                 servicio_scan: ServicioScan = None,
+                 registro: RegistroPredicciones = None,
+                 universo: EscanerUniverso = None):
+        self.host, self.puerto = host, puerto
+        self.espera_max = espera_max
+        self.max_lote   = max_lote
+        self.metricas   = MetricasLatencia()
+        self.scan       = servicio_scan
+        self.registro   = registro
+        self.universo   = universo
+        self._cache_scan = CacheLRU(max_items=512)
+        METRICAS.registrar_cache("scan", self._cache_scan)
+        self._cupo  = threading.BoundedSemaphore(max_concurrentes)
+        self._pool  = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._rutas = {
+            "/prediccion":  self._prediccion,
+            "/indicadores": self._indicadores,
+            "/scan":        self._scan,
+            "/lote":        self._lote,
+            "/metricas":    self._metricas,
+        }
+        self.httpd = None
+
+    # ── Endpoints: (params) → (status, cuerpo) ──
+    def _analisis(self, symbol: str, vista):
+        if self.scan is not None:
+            self.scan.observar(symbol)
+        a = analizar(symbol)
+        if a.get("error") or a.get("df") is None:
+            return 404, {"symbol": symbol, "error": a.get("error") or "sin datos"}
+        if self.registro:
+            self.registro.registrar(symbol.upper(), a)
+        return 200, vista(a)
+
+    def _prediccion(self, q: dict):
+        return self._analisis(q["symbol"], _vista_prediccion)
+
+    def _indicadores(self, q: dict):
+        return self._analisis(q["symbol"], _vista_indicadores)
+
+    def _scan_symbol(self, symbol: str):
+        symbol = symbol.upper()
+        if self.scan and symbol in self.scan.symbols:
+            res = self.scan.resultados().get(symbol)
+            if res:
+                return 200, res
+        clave = (symbol, int(time.time() // 60))
+        return 200, self._cache_scan.obtener(clave, lambda: scan_rapido(symbol))
+
+    def _scan(self, q: dict):
+        if q.get("universo") not in (None, "", "0"):
+            if self.universo is None:
+                return 404, {"error": "scan del universo desactivado (arrancar con --universo)"}
+            ranking = self.universo.resultados()
+            if ranking is None:
+                return 503, {"error": "primera pasada del universo en curso"}
+            return 200, ranking
+        if q.get("symbol"):
+            return self._scan_symbol(q["symbol"])
+        return 200, self.scan.resultados() if self.scan else {}
+
+    def _lote(self, q: dict):
+        symbols = [s.strip() for s in q.get("symbols", "").split(",") if s.strip()]
+        if not symbols:
+            return 400, {"error": "falta symbols=A,B,C"}
+        if len(symbols) > self.max_lote:
+            return 400, {"error": f"máximo {self.max_lote} símbolos por lote"}
+        tipo = q.get("tipo", "prediccion")
+        if tipo == "scan":
+            fn = self._scan_symbol
+        elif tipo in ("prediccion", "indicadores"):
+            vista = _vista_prediccion if tipo == "prediccion" else _vista_indicadores
+            fn = lambda s: self._analisis(s, vista)
+        else:
+            return 400, {"error": f"tipo desconocido: {tipo}"}
+        res = {}
+        for sym, (status, cuerpo) in zip(symbols, self._pool.map(fn, symbols)):
+            res[sym] = cuerpo if status == 200 else {"error": cuerpo.get("error"),
+                                                     "status": status}
+        return 200, res
+
+    def _metricas(self, q: dict):
+        m = self.metricas.resumen()
+        m["caches"] = {
+            "analisis": {"items": len(_CACHE_ANALISIS), "hits": _CACHE_ANALISIS.hits,
+                         "misses": _CACHE_ANALISIS.misses,
+                         "evictions": _CACHE_ANALISIS.evictions},
+            "scan":     {"items": len(self._cache_scan), "hits": self._cache_scan.hits,
+                         "misses": self._cache_scan.misses,
+                         "evictions": self._cache_scan.evictions},
+        }
+        return 200, m
+
+    # ── Despacho ──
+    def atender(self, ruta: str, q: dict):
+        """(status, cuerpo) de una petición; aplica el límite de concurrencia."""
+        fn = self._rutas.get(ruta)
+        if fn is None:
+            return 404, {"error": f"ruta desconocida: {ruta}",
+                         "rutas": sorted(self._rutas)}
+        if ruta in ("/prediccion", "/indicadores") and not q.get("symbol"):
+            return 400, {"error": "falta symbol="}
+        if not self._cupo.acquire(timeout=self.espera_max):
+            self.metricas.rechazar()
+            return 503, {"error": "servicio saturado, reintentar"}
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            status, cuerpo = fn(q)
+        except Exception as e:
+            cuerpo = {"error": str(e)}
+        finally:
+            self._cupo.release()
+            self.metricas.registrar(ruta, time.perf_counter() - t0, status < 500)
+        return status, cuerpo
+
+    def _manejador(self):
+        servicio = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, cuerpo = servicio.atender(url.path.rstrip("/") or "/", q)
+                datos = json.dumps(_json_seguro(cuerpo), ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return _Manejador
+
+    def iniciar(self, bloquear: bool = True):
+        """Arranca el servidor (y el scanner de fondo si lo hay)."""
+        if self.scan:
+            self.scan.iniciar()
+        if self.universo:
+            self.universo.iniciar()
+        self.httpd = ThreadingHTTPServer((self.host, self.puerto), self._manejador())
+        self.httpd.daemon_threads = True
+        if bloquear:
+            self.httpd.serve_forever()
+        else:
+            threading.Thread(target=self.httpd.serve_forever, name="api-http",
+                             daemon=True).start()
+        return self
+
+    def detener(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        if self.scan:
+            self.scan.detener()
+        if self.universo:
+            self.universo.detener()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="API JSON de Crypto Predictor 5min")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8080)
+    ap.add_argument("--max-concurrentes", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--metricas-puerto", type=int, metavar="PUERTO",
+                    help="sirve /metrics (Prometheus) en 127.0.0.1:PUERTO")
+    ap.add_argument("--registro", metavar="DIR",
+                    help="guarda las predicciones servidas en DIR (parquet/npz)")
+    ap.add_argument("--universo", action="store_true",
+                    help="escanea todos los pares USD/USDT en segundo plano (/scan?universo=1)")
+    args = ap.parse_args()
+    print(f"API en http://{args.host}:{args.puerto}")
+    if args.metricas_puerto:
+        ServidorMetricas(args.metricas_puerto).iniciar()
+    inst = Instantaneas()
+    usar_instantaneas(inst)
+    METRICAS.registrar_cache("instantanea", inst)
+    usar_motor_divergencia(MotorDivergencia().iniciar())
+    usar_historial_derivados(HistorialDerivados().iniciar())
+    matriz = MatrizCorrelacion()
+    usar_motor_correlacion(matriz)
+    ServicioAPI(args.host, args.puerto, args.max_concurrentes, workers=args.workers,
+                servicio_scan=ServicioScan(_TOP, incremental=True,
+                                           al_refrescar=matriz.actualizar,
+                                           instantaneas=inst),
+                registro=RegistroPredicciones(args.registro).iniciar() if args.registro
+                         else None,
+                universo=EscanerUniverso() if args.universo else None).iniciar()
@@ -0,0 +1,388 @@
+"""
+Bench — Crypto Predictor 5min
+══════════════════════════════
+Benchmarks sin red sobre fixturas: las respuestas de todas las fuentes se
+generan una vez (fixturas.MercadoSintetico) o se leen de un fichero
+grabado, y se reproducen desde memoria, así que solo se mide el código.
+
+  micro — cada indicador (tramos "indicador.*"), los parsers de cada
+          fuente, Hurst, scan_rapido, puntuar_lote y el render del gráfico
+  macro — descargar_datos → calcular_indicadores → calcular_prediccion
+          para 1, 12 y 200 símbolos (en serie y con lote.ejecutar), con
+          pico de memoria (tracemalloc) y RSS máximo
+
+  python bench.py                               # tabla por stderr, JSON por stdout
+  python bench.py --salida base.json
+  python bench.py --salida nuevo.json --comparar base.json
+  python bench.py --grabar reales.json.gz BTC ETH SOL   # graba la red real
+  python bench.py --fixturas reales.json.gz              # benchmark sobre lo grabado
+  python bench.py --paridad      # scan vectorizado vs camino general (código 1 si difieren)
+"""
+
+import argparse
+import gc
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import crypto_predictor as cp
+from crypto_predictor import (
+    KRAKEN_BASE, CacheIntermedios, calcular_indicadores,
+    calcular_prediccion, descargar_datos, normalizar_symbol, usar_transporte,
+)
+from fixturas import FixturasGrabadas, Grabadora, MercadoSintetico, grabar
+from libro import Libro
+from tiempos import informe
+import lote
+
+ESCALAS = (1, 12, 200)
+
+
+# ─────────────────────────────────────────────
+# MEDICIÓN
+# ─────────────────────────────────────────────
+def _estadisticas(muestras_s) -> dict:
+    us = np.asarray(muestras_s, dtype=float) * 1e6
+    return {"n": int(len(us)), "media_us": float(us.mean()), "p50_us": float(np.median(us)),
+            "p95_us": float(np.percentile(us, 95)), "min_us": float(us.min())}
+
+
+def medir(fn, repeticiones: int = 50, min_s: float = 0.2) -> dict:
+    """Ejecuta fn() al menos `repeticiones` veces y `min_s` segundos (tras un calentamiento)."""
+    fn()
+    muestras, t_fin = [], time.perf_counter() + min_s
+    while len(muestras) < repeticiones or time.perf_counter() < t_fin:
+        t0 = time.perf_counter()
+        fn()
+        muestras.append(time.perf_counter() - t0)
+    return _estadisticas(muestras)
+
+
+def _memoria(fn) -> dict:
+    """Pico de memoria Python de fn() (tracemalloc) en MB."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"pico_mem_mb": pico / 2**20}
+
+
+def _rss_max_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 1024
+
+
+# ─────────────────────────────────────────────
+# FIXTURAS
+# ─────────────────────────────────────────────
+def _analizar(symbol: str):
+    df, df5, book, futures_data, info, error, df15, df1h = descargar_datos(symbol)
+    if error or df is None:
+        return None
+    indicadores, _, puntuaciones, atr_pct, regimen, h = calcular_indicadores(
+        df, df5, book, futures_data, info, df15, df1h, cache=CacheIntermedios())
+    pred = calcular_prediccion(puntuaciones, info["precio_actual"], indicadores,
+                               regimen=regimen, fng_data=futures_data)
+    return df, df5, book, futures_data, info, df15, df1h, puntuaciones, pred
+
+
+def preparar_fixturas(symbols, ruta: str = None, seed: int = 7) -> FixturasGrabadas:
+    """
+    Transporte de reproducción con todas las respuestas que necesitan
+    `symbols`: las de un fichero grabado o, sin él, las del mercado
+    sintético grabadas en una pasada previa.
+    """
+    if ruta:
+        fixturas = FixturasGrabadas(ruta)
+    else:
+        mercado = MercadoSintetico(symbols, seed=seed, reloj=1.8e9)
+        grabadora = Grabadora(mercado.transporte)
+        usar_transporte(grabadora.transporte)
+        for s in symbols:
+            _analizar(s)
+            cp.scan_rapido(s)
+        fixturas = FixturasGrabadas(respuestas=grabadora.respuestas)
+    usar_transporte(fixturas.transporte)
+    return fixturas
+
+
+def _symbols_grabados(fixturas: FixturasGrabadas) -> list:
+    """Bases con velas 1m en un fichero grabado."""
+    pares = {c.split("pair=")[1].split("&")[0] for c in fixturas.respuestas
+             if "/OHLC?" in c and "interval=1&" in c}
+    return sorted(cp._base_from_kraken(p) for p in pares)
+
+
+# ─────────────────────────────────────────────
+# MICRO
+# ─────────────────────────────────────────────
+def bench_indicadores(symbol: str, repeticiones: int) -> dict:
+    """Tiempo de cada indicador (y de la etapa completa) con caches frías."""
+    df, df5, book, futures_data, info, df15, df1h, _, _ = _analizar(symbol)
+    muestras = {}
+    for _ in range(repeticiones + 1):
+        with informe() as inf:
+            calcular_indicadores(df, df5, book, futures_data, info, df15, df1h,
+                                 cache=CacheIntermedios())
+        for nombre, nivel, _, dur in inf.tramos:
+            muestras.setdefault(nombre, []).append(dur)
+    return {n: _estadisticas(v[1:]) for n, v in muestras.items()
+            if n.startswith("indicador.") or n == "indicadores"}
+
+
+def bench_parsers(symbol: str) -> dict:
+    pair, _ = normalizar_symbol(symbol)
+    base = cp._base_from_kraken(pair)
+    ohlc = cp._get(f"{KRAKEN_BASE}/OHLC", {"pair": pair, "interval": 1})
+    filas = ohlc["result"][pair][-101:-1] if ohlc else None
+    book = cp._okx_book(base) or cp._kraken_book(pair)
+    casos = {
+        "parser.ohlc_df":     (lambda: cp._ohlc_df(filas)) if filas else None,
+        "parser.kraken_ohlc": lambda: cp._kraken_ohlc(pair, 1, 100),
+        "parser.kraken_book": lambda: cp._kraken_book(pair),
+        "parser.okx_book":    lambda: cp._okx_book(base),
+        "parser.okx_trades":  lambda: cp._okx_trades(base),
+        "parser.okx_oi_history": lambda: cp._okx_oi_history(base),
+        "parser.okx_long_short": lambda: cp._okx_long_short(base),
+        "parser.fear_greed":  cp._fear_greed,
+        "parser.libro":       (lambda: Libro.desde_dict(book)) if book else None,
+    }
+    return {n: medir(fn) for n, fn in casos.items() if fn is not None}
+
+
+def bench_calculo(symbols) -> dict:
+    df = cp._kraken_ohlc(normalizar_symbol(symbols[0])[0], 1, 100)
+    velas = {s: cp._kraken_ohlc(normalizar_symbol(s)[0], 1, 60) for s in symbols}
+    velas = {s: v for s, v in velas.items() if v is not None}
+    res = {
+        "hurst.var":  medir(lambda: cp.hurst_exponent(df["close"])),
+        "hurst.rs":   medir(lambda: cp.hurst_rs(df["close"])),
+        "hurst.dfa":  medir(lambda: cp.hurst_dfa(df["close"])),
+        "scan_rapido": medir(lambda: cp.scan_rapido(symbols[0])),
+        # Solo el cálculo, con las velas ya descargadas
+        "scan.desde_velas": medir(lambda: cp.puntuar_lote({symbols[0]: df.iloc[-60:]})),
+    }
+    lote_ = medir(lambda: cp.puntuar_lote(velas), repeticiones=10)
+    res[f"puntuar_lote.{len(velas)}"] = lote_
+    res["puntuar_lote.por_symbol"] = {k: (v / len(velas) if k.endswith("_us") else v)
+                                      for k, v in lote_.items()}
+    return res
+
+
+def bench_grafico(symbol: str) -> dict:
+    try:
+        from graficos import RenderizadorGraficos, datos_graficos
+    except ImportError:
+        return {}
+    df, df5, book, futures_data, info, df15, df1h, _, _ = _analizar(symbol)
+    cache = CacheIntermedios()
+    _, _, punt, _, _, _ = calcular_indicadores(df, df5, book, futures_data, info,
+                                               df15, df1h, cache=cache)
+    datos = datos_graficos(df, cache, punt, info["precio_actual"], 50.0, "↑ SUBE", symbol)
+    render = RenderizadorGraficos()
+    return {"grafico.datos":  medir(lambda: datos_graficos(df, cache, punt, info["precio_actual"],
+                                                           50.0, "↑ SUBE", symbol)),
+            "grafico.render": medir(lambda: render._render(datos), repeticiones=3, min_s=0)}
+
+
+def _scan_referencia(df, symbol: str) -> dict:
+    """Scan por el camino general: perfil "scan" de calcular_indicadores + calcular_prediccion."""
+    df = cp._enriquecer_taker(df.copy(), None)
+    precio = float(df["close"].iloc[-1])
+    info = {"symbol": symbol, "nombre": symbol + "/USD", "precio_actual": precio,
+            "precio_prev": float(df["close"].iloc[-2]), "cambio_pct": 0.0, "vol_24h": 0.0,
+            "high_24h": precio, "low_24h": precio, "okx_price": None, "base": symbol}
+    inds, _, punts, _, reg, _ = calcular_indicadores(df, None, None, {}, info, None, None,
+                                                     perfil="scan")
+    return calcular_prediccion(punts, precio, inds, regimen=reg, fng_data={})
+
+
+def paridad_scan(symbols, longitudes=(20, 30, 45, 60), tolerancia: float = 1e-9) -> dict:
+    """
+    scan_rapido / puntuar_lote (motor vectorizado) frente al camino general
+    para cada símbolo y varias longitudes de serie: misma prob_subida (±
+    tolerancia), dirección y color.
+    """
+    casos, malos, max_diff = 0, [], 0.0
+    for s in symbols:
+        df = cp._kraken_ohlc(normalizar_symbol(s)[0], 1, 60)
+        if df is None:
+            continue
+        for n in longitudes:
+            if len(df) < n:
+                continue
+            ref = _scan_referencia(df.iloc[-n:], s)
+            vec = cp.puntuar_lote({s: df.iloc[-n:]}, n_velas=n)[s]
+            diff = abs(ref["prob_subida"] - vec["prob_subida"])
+            color = "alcista" if ref["prob_subida"] > 55 else (
+                "bajista" if ref["prob_subida"] < 45 else "neutro")
+            casos += 1
+            max_diff = max(max_diff, diff)
+            if diff > tolerancia or ref["direccion"] != vec["direccion"] or color != vec["color"]:
+                malos.append(f"{s}/{n}")
+    return {"casos": casos, "discrepancias": len(malos), "max_diff": max_diff,
+            "ejemplos": malos[:10]}
+
+
+# ─────────────────────────────────────────────
+# MACRO
+# ─────────────────────────────────────────────
+def bench_macro(symbols, fixturas: FixturasGrabadas, workers: int) -> dict:
+    res = {}
+    for n in ESCALAS:
+        sel = symbols[:n]
+        if len(sel) < n:
+            continue
+        casos = {f"serie.{n}": lambda: [_analizar(s) for s in sel]}
+        if n > 1:
+            casos[f"lote{workers}.{n}"] = lambda: list(lote.ejecutar(sel, workers))
+        for nombre, fn in casos.items():
+            antes = fixturas.peticiones
+            t0 = time.perf_counter()
+            fn()
+            total = time.perf_counter() - t0
+            res[nombre] = {"symbols": n, "total_ms": total * 1000,
+                           "ms_por_symbol": total * 1000 / n,
+                           "peticiones": fixturas.peticiones - antes, **_memoria(fn)}
+    return res
+
+
+# ─────────────────────────────────────────────
+# SALIDA Y COMPARACIÓN
+# ─────────────────────────────────────────────
+def _git() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _metrica(seccion: str, valores: dict):
+    """Valor que se compara entre ejecuciones: p50 en micro, ms por símbolo en macro."""
+    return valores.get("p50_us") if seccion == "micro" else valores.get("ms_por_symbol")
+
+
+def comparar(actual: dict, base: dict, tolerancia: float = 0.10) -> list:
+    """Filas (seccion, nombre, base, actual, ratio, estado) de lo que está en ambos."""
+    filas = []
+    for seccion in ("micro", "macro"):
+        for nombre, v in actual.get(seccion, {}).items():
+            b = base.get(seccion, {}).get(nombre)
+            if not b or not _metrica(seccion, b):
+                continue
+            ratio = _metrica(seccion, v) / _metrica(seccion, b)
+            estado = ("más lento" if ratio > 1 + tolerancia
+                      else "más rápido" if ratio < 1 - tolerancia else "=")
+            filas.append((seccion, nombre, _metrica(seccion, b), _metrica(seccion, v),
+                          ratio, estado))
+    return filas
+
+
+def _tabla(res: dict):
+    err = sys.stderr
+    print(f"{'micro':<44}{'p50 µs':>12}{'p95 µs':>12}{'n':>7}", file=err)
+    for n, v in res["micro"].items():
+        print(f"{n[:44]:<44}{v['p50_us']:>12.1f}{v['p95_us']:>12.1f}{v['n']:>7}", file=err)
+    print(f"\n{'macro':<20}{'total ms':>12}{'ms/symbol':>12}{'peticiones':>12}{'pico MB':>10}",
+          file=err)
+    for n, v in res["macro"].items():
+        print(f"{n:<20}{v['total_ms']:>12.1f}{v['ms_por_symbol']:>12.2f}"
+              f"{v['peticiones']:>12}{v['pico_mem_mb']:>10.1f}", file=err)
+    print(f"\nRSS máximo: {res['memoria']['rss_max_mb']:.0f} MB", file=err)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks sin red sobre fixturas")
+    ap.add_argument("symbols", nargs="*", help="con --grabar: símbolos a grabar")
+    ap.add_argument("--fixturas", help="fichero grabado (.json.gz); por defecto mercado sintético")
+    ap.add_argument("--grabar", metavar="RUTA", help="graba respuestas reales de la red y sale")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--repeticiones", type=int, default=30)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--sin-macro", action="store_true")
+    ap.add_argument("--paridad", action="store_true",
+                    help="solo la comprobación de paridad del scan (código 1 si falla)")
+    ap.add_argument("--salida", help="escribe el resultado JSON en este fichero")
+    ap.add_argument("--comparar", metavar="BASE", help="JSON de una ejecución anterior")
+    ap.add_argument("--tolerancia", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    if args.grabar:
+        symbols = args.symbols or ["BTC", "ETH"]
+        n = grabar(args.grabar, lambda: [(_analizar(s), cp.scan_rapido(s)) for s in symbols])
+        print(f"{n} respuestas grabadas en {args.grabar}", file=sys.stderr)
+        return
+
+    if args.fixturas:
+        fixturas = preparar_fixturas(None, args.fixturas)
+        symbols = _symbols_grabados(fixturas)
+    else:
+        symbols = MercadoSintetico(n_symbols=max(ESCALAS), seed=args.seed).symbols
+        fixturas = preparar_fixturas(symbols, seed=args.seed)
+    if not symbols:
+        sys.exit("Las fixturas no tienen velas de ningún símbolo")
+
+    paridad = paridad_scan(symbols)
+    print(f"Paridad scan: {paridad['casos']} casos · {paridad['discrepancias']} discrepancias · "
+          f"máx. Δprob {paridad['max_diff']:.2e}", file=sys.stderr)
+    if args.paridad:
+        sys.exit(1 if paridad["discrepancias"] else 0)
+
+    micro = {}
+    micro.update(bench_indicadores(symbols[0], args.repeticiones))
+    micro.update(bench_parsers(symbols[0]))
+    micro.update(bench_calculo(symbols[:max(ESCALAS)]))
+    micro.update(bench_grafico(symbols[0]))
+    macro = {} if args.sin_macro else bench_macro(symbols, fixturas, args.workers)
+
+    res = {
+        "meta": {
+            "fecha":      time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git":        _git(),
+            "python":     platform.python_version(),
+            "numpy":      np.__version__,
+            "pandas":     pd.__version__,
+            "plataforma": platform.platform(),
+            "cpu":        platform.processor() or platform.machine(),
+            "fixturas":   args.fixturas or f"sintético seed={args.seed}",
+            "symbols":    len(symbols),
+            "sin_fixtura": fixturas.fallos,
+        },
+        "paridad_scan": paridad,
+        "micro":   micro,
+        "macro":   macro,
+        "memoria": {"rss_max_mb": _rss_max_mb()},
+    }
+    _tabla(res)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            filas = comparar(res, json.load(f), args.tolerancia)
+        res["comparacion"] = [dict(zip(("seccion", "nombre", "base", "actual", "ratio",
+                                        "estado"), f)) for f in filas]
+        print(f"\n{'comparación':<44}{'base':>12}{'actual':>12}{'ratio':>8}", file=sys.stderr)
+        for seccion, nombre, b, a, ratio, estado in filas:
+            print(f"{nombre[:44]:<44}{b:>12.1f}{a:>12.1f}{ratio:>8.2f}  {estado}",
+                  file=sys.stderr)
+
+    texto = json.dumps(res, ensure_ascii=False, indent=1)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
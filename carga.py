@@ -0,0 +1,244 @@
+"""
+Carga — Crypto Predictor 5min
+══════════════════════════════
+Prueba de carga de app_cripto.py: N sesiones simultáneas ejecutan el
+script real (streamlit.testing AppTest, una por hilo, en el mismo proceso
+y con los mismos servicios compartidos que el servidor) contra el
+simulador local de simulador.py, sin red.
+
+Cada sesión carga la página y hace `--acciones` interacciones al azar
+con una pausa entre ellas:
+  chip      — ?crypto=SYM (el grid de chips del scan)
+  boton     — botón TOP 12 de la barra lateral
+  analizar  — escribir un par arriba y pulsar ⚡ ANALIZAR
+  refresco  — rerun con el auto-refresh activado
+
+Por nivel de concurrencia informa de la latencia de render (p50/p95/p99,
+total y por acción), peticiones al simulador (por sesión y por render) y
+memoria por sesión (crecimiento del RSS / sesiones).
+
+  python carga.py --sesiones 1 5 10 20 --acciones 8
+  python carga.py --sesiones 10 --latencia 80 --jitter 40 --errores 0.02 --salida carga.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault("CRYPTO_METRICAS_PUERTO", "0")   # sin /metrics en las sesiones de prueba
+
+from fixturas import MercadoSintetico
+from simulador import SimuladorMercado
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_cripto.py")
+ACCIONES = {"chip": 4, "boton": 2, "analizar": 2, "refresco": 2}     # pesos
+
+
+def _rss_mb() -> float:
+    """RSS actual del proceso (MB); sin /proc, el máximo."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 2**20 if sys.platform == "darwin" else rss / 1024
+
+
+class _MonitorRSS:
+    """Muestrea el RSS en un hilo y guarda el máximo."""
+
+    def __init__(self, intervalo: float = 0.2):
+        self.intervalo = intervalo
+        self.maximo    = _rss_mb()
+        self._parar    = threading.Event()
+        self._hilo     = threading.Thread(target=self._bucle, name="carga-rss", daemon=True)
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.maximo = max(self.maximo, _rss_mb())
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+
+class Sesion:
+    """Un usuario: una AppTest propia que ejecuta acciones al azar."""
+
+    def __init__(self, n: int, acciones: int, pausa: float, seed: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        self.n        = n
+        self.acciones = acciones
+        self.pausa    = pausa
+        self.rng      = random.Random(seed * 1000 + n)
+        self.at       = AppTest.from_file(APP, default_timeout=timeout)
+        self.tiempos  = []            # (acción, s)
+        self.errores  = []
+        self.symbols  = []
+
+    def _medir(self, accion: str, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+            self.errores += [f"{accion}: {e.value}" for e in self.at.exception]
+        except Exception as e:
+            self.errores.append(f"{accion}: {e!r}")
+        self.tiempos.append((accion, time.perf_counter() - t0))
+
+    def _accion(self, accion: str):
+        at, sym = self.at, self.rng.choice(self.symbols)
+        if accion == "chip":
+            at.query_params["crypto"] = sym
+            at.run()
+        elif accion == "boton":
+            at.button(key=f"sb_{sym}").click().run()
+        elif accion == "analizar":
+            at.text_input(key="top_input").input(sym)
+            at.button(key="top_btn").click().run()
+        else:
+            if not at.checkbox[0].value:
+                at.checkbox[0].check()
+            at.run()
+
+    def ejecutar(self):
+        self._medir("inicio", self.at.run)
+        self.symbols = [b.key[3:] for b in self.at.button
+                        if b.key and b.key.startswith("sb_") and b.key != "sb_btn"] or ["BTC"]
+        nombres, pesos = zip(*ACCIONES.items())
+        for _ in range(self.acciones):
+            time.sleep(self.rng.expovariate(1 / self.pausa) if self.pausa else 0)
+            accion = self.rng.choices(nombres, pesos)[0]
+            self._medir(accion, lambda: self._accion(accion))
+
+
+def _percentiles(segundos) -> dict:
+    ms = np.asarray(segundos, dtype=float) * 1000
+    if not len(ms):
+        return {"n": 0}
+    return {"n": int(len(ms)), "media_ms": float(ms.mean()),
+            **{f"p{q}_ms": float(np.percentile(ms, q)) for q in (50, 95, 99)},
+            "max_ms": float(ms.max())}
+
+
+def nivel(n: int, sim: SimuladorMercado, acciones: int, pausa: float, seed: int,
+          timeout: float) -> dict:
+    """Ejecuta `n` sesiones simultáneas y resume latencias, peticiones y memoria."""
+    sesiones = [Sesion(i, acciones, pausa, seed, timeout) for i in range(n)]
+    antes, rss0 = sim.estadisticas(), _rss_mb()
+    total0 = sim.total_peticiones()
+    hilos = [threading.Thread(target=s.ejecutar, name=f"sesion-{s.n}") for s in sesiones]
+    t0 = time.perf_counter()
+    with _MonitorRSS() as rss:
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    duracion = time.perf_counter() - t0
+
+    tiempos = [t for s in sesiones for t in s.tiempos]
+    peticiones = sim.total_peticiones() - total0
+    por_venue = {}
+    for venue, eps in sim.estadisticas().items():
+        total = sum(sum(r.values()) for r in eps.values())
+        previo = sum(sum(r.values()) for r in antes.get(venue, {}).values())
+        por_venue[venue] = total - previo
+    return {
+        "sesiones":    n,
+        "duracion_s":  duracion,
+        "renders":     len(tiempos),
+        "renders_s":   len(tiempos) / duracion,
+        "render":      _percentiles([t for _, t in tiempos]),
+        "por_accion":  {a: _percentiles([t for b, t in tiempos if b == a])
+                        for a in ("inicio", *ACCIONES)},
+        "peticiones":  {"total": peticiones, "por_sesion": peticiones / n,
+                        "por_render": peticiones / max(1, len(tiempos)),
+                        "por_venue": por_venue},
+        "memoria":     {"rss_inicio_mb": rss0, "rss_max_mb": rss.maximo,
+                        "por_sesion_mb": (rss.maximo - rss0) / n},
+        "errores":     [e for s in sesiones for e in s.errores][:20],
+        "n_errores":   sum(len(s.errores) for s in sesiones),
+    }
+
+
+def _tabla(niveles: list):
+    err = sys.stderr
+    print(f"{'sesiones':>8}{'renders':>9}{'r/s':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'pet/ses':>9}{'pet/rend':>10}{'MB/ses':>8}{'errores':>9}", file=err)
+    for r in niveles:
+        p = r["render"]
+        print(f"{r['sesiones']:>8}{r['renders']:>9}{r['renders_s']:>7.2f}"
+              f"{p.get('p50_ms', 0):>9.0f}{p.get('p95_ms', 0):>9.0f}{p.get('p99_ms', 0):>9.0f}"
+              f"{r['peticiones']['por_sesion']:>9.1f}{r['peticiones']['por_render']:>10.2f}"
+              f"{r['memoria']['por_sesion_mb']:>8.1f}{r['n_errores']:>9}", file=err)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Prueba de carga de app_cripto.py contra el simulador")
+    ap.add_argument("--sesiones", type=int, nargs="+", default=[1, 5, 10],
+                    help="niveles de concurrencia (uno tras otro)")
+    ap.add_argument("--acciones", type=int, default=6, help="interacciones por sesión")
+    ap.add_argument("--pausa", type=float, default=1.0, help="pausa media entre acciones (s)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--timeout", type=float, default=180.0, help="máximo por render (s)")
+    ap.add_argument("--symbols", type=int, default=18, help="símbolos del simulador")
+    ap.add_argument("--latencia", type=float, default=50.0, help="latencia del simulador (ms)")
+    ap.add_argument("--jitter", type=float, default=25.0)
+    ap.add_argument("--errores", type=float, default=0.0)
+    ap.add_argument("--timeouts", type=float, default=0.0)
+    ap.add_argument("--limite", type=float, help="peticiones/s por venue en el simulador")
+    ap.add_argument("--directorio", help="directorio de trabajo (registro de predicciones); "
+                                         "por defecto uno temporal")
+    ap.add_argument("--salida", help="escribe el resultado JSON en este fichero")
+    args = ap.parse_args(argv)
+
+    from streamlit import logger
+    logger.set_log_level(logging.ERROR)
+    salida = os.path.abspath(args.salida) if args.salida else None
+    if args.directorio:
+        os.makedirs(args.directorio, exist_ok=True)
+    os.chdir(args.directorio or tempfile.mkdtemp(prefix="carga-"))
+    sim = SimuladorMercado(MercadoSintetico(n_symbols=args.symbols, seed=args.seed), puerto=0,
+                           latencia=args.latencia, jitter=args.jitter, errores=args.errores,
+                           timeouts=args.timeouts, limite=args.limite, espera_timeout=15.0,
+                           seed=args.seed).iniciar()
+    sim.configurar()
+    print(f"Simulador en {sim.url} · trabajo en {os.getcwd()}", file=sys.stderr)
+
+    # Calentamiento: arranca los servicios compartidos (scan, divergencia, derivados…)
+    nivel(1, sim, 0, 0, args.seed, args.timeout)
+    niveles = []
+    for n in args.sesiones:
+        niveles.append(nivel(n, sim, args.acciones, args.pausa, args.seed, args.timeout))
+        print(f"· {n} sesiones: {niveles[-1]['duracion_s']:.1f}s", file=sys.stderr)
+    sim.detener()
+    _tabla(niveles)
+
+    res = {"meta": {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "acciones": args.acciones,
+                    "pausa_s": args.pausa, "simulador": {
+                        "symbols": args.symbols, "latencia_ms": args.latencia,
+                        "jitter_ms": args.jitter, "errores": args.errores,
+                        "timeouts": args.timeouts, "limite": args.limite}},
+           "niveles": niveles}
+    texto = json.dumps(res, ensure_ascii=False, indent=1)
+    if salida:
+        with open(salida, "w") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cobertura — Crypto Predictor 5min
+══════════════════════════════════
+Peticiones cubiertas ("hedged") para datos con dos fuentes: se lanza la
+primaria y, si tarda más que el p90 de sus latencias observadas, también
+el respaldo; gana la primera respuesta válida y la otra se cancela.
+
+  cob = Cobertura("book")
+  book = cob.pedir(lambda: _okx_book(base), lambda: _kraken_book(pair))
+
+En régimen normal solo ~1 de cada 10 peticiones lanza el respaldo, así
+que la carga apenas sube y la cola de latencia queda acotada por la del
+respaldo. Si la primaria falla antes del umbral, el respaldo se pide en
+el acto (como el fallback de siempre).
+
+Cancelar una petición HTTP en curso no es posible con requests: la
+perdedora se cancela si aún no empezó y, si ya estaba en marcha, su
+respuesta se descarta al llegar (su latencia sí se anota, para que el
+p90 no se sesgue hacia las rápidas).
+
+Cuando el respaldo hace falta de todos modos (el book de Kraken entra en
+el book consolidado), ambas() lanza las dos a la vez una sola vez y el
+umbral solo decide cuánto se espera a la primaria:
+
+  okx, kraken = cob.ambas(lambda: _okx_book(base), lambda: _kraken_book(pair))
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from metricas import METRICAS
+
+_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="cobertura")
+
+_RESULTADOS = METRICAS.contador(
+    "crypto_cobertura_total",
+    "Peticiones cubiertas por fuente y ganador (primaria, respaldo, ninguna) y si se "
+    "lanzó el respaldo", ("fuente", "ganador", "respaldo"))
+_UMBRAL = METRICAS.histograma(
+    "crypto_cobertura_umbral_segundos", "Umbral de espera (p90 de la primaria) al pedir",
+    ("fuente",))
+
+
+def _valido(r) -> bool:
+    return r is not None
+
+
+class Cobertura:
+    """
+    Petición primaria + respaldo para una fuente. El umbral es el cuantil
+    `cuantil` de las últimas `ventana` latencias de la primaria (acotado
+    por abajo por `minimo`); hasta tener `min_muestras`, `inicial`.
+    """
+
+    def __init__(self, nombre: str, cuantil: float = 0.9, ventana: int = 200,
+                 min_muestras: int = 20, inicial: float = 1.0, minimo: float = 0.05):
+        self.nombre   = nombre
+        self.cuantil  = cuantil
+        self.min_muestras = min_muestras
+        self.inicial  = inicial
+        self.minimo   = minimo
+        self._lat     = deque(maxlen=ventana)
+        self._lock    = threading.Lock()
+        self._umbral  = inicial
+        self._cambios = 0
+        self.lanzados = 0            # respaldos lanzados por tardanza
+        self.peticiones = 0
+
+    def _anotar(self, segundos: float):
+        with self._lock:
+            self._lat.append(segundos)
+            self._cambios += 1
+            # Recalcular el cuantil cada pocas muestras: barato y suficientemente fresco
+            if len(self._lat) >= self.min_muestras and self._cambios >= 5:
+                self._umbral = max(self.minimo,
+                                   float(np.quantile(self._lat, self.cuantil)))
+                self._cambios = 0
+
+    def umbral(self) -> float:
+        """Segundos que se espera a la primaria antes de lanzar el respaldo."""
+        with self._lock:
+            return self._umbral if len(self._lat) >= self.min_muestras else self.inicial
+
+    def _fin(self, ganador: str, lanzado: bool, r):
+        _RESULTADOS.inc(fuente=self.nombre, ganador=ganador, respaldo=str(lanzado).lower())
+        return r
+
+    def pedir(self, primaria, respaldo, valido=_valido):
+        """Resultado de la primera de las dos llamadas que devuelva algo válido (o None)."""
+        self.peticiones += 1
+        umbral = self.umbral()
+        _UMBRAL.observar(umbral, fuente=self.nombre)
+        t0 = time.perf_counter()
+        fp = _POOL.submit(primaria)
+        fp.add_done_callback(lambda _: self._anotar(time.perf_counter() - t0))
+
+        hechas, _ = wait([fp], timeout=umbral)
+        if hechas:
+            r = fp.result() if fp.exception() is None else None
+            if valido(r):
+                return self._fin("primaria", False, r)
+            try:
+                r = respaldo()
+            except Exception:
+                r = None
+            return self._fin("respaldo" if valido(r) else "ninguna", False,
+                             r if valido(r) else None)
+
+        # La primaria pasa de su p90: se lanza el respaldo y gana la primera válida
+        self.lanzados += 1
+        fb = _POOL.submit(respaldo)
+        pendientes = {fp: "primaria", fb: "respaldo"}
+        while pendientes:
+            hechas, _ = wait(list(pendientes), return_when=FIRST_COMPLETED)
+            for f in hechas:
+                nombre = pendientes.pop(f)
+                r = f.result() if f.exception() is None else None
+                if valido(r):
+                    for otra in pendientes:
+                        otra.cancel()
+                    return self._fin(nombre, True, r)
+        return self._fin("ninguna", True, None)
+
+    def ambas(self, primaria, respaldo, valido=_valido) -> tuple:
+        """
+        (primaria, respaldo) lanzadas a la vez. El respaldo se espera
+        siempre; la primaria, hasta el umbral (o hasta que llegue el
+        respaldo, si tarda más): si no llega a tiempo o no es válida, None.
+        """
+        self.peticiones += 1
+        umbral = self.umbral()
+        _UMBRAL.observar(umbral, fuente=self.nombre)
+        t0 = time.perf_counter()
+        fp = _POOL.submit(primaria)
+        fp.add_done_callback(lambda _: self._anotar(time.perf_counter() - t0))
+        fb = _POOL.submit(respaldo)
+
+        wait([fp], timeout=umbral)
+        try:
+            rb = fb.result()
+        except Exception:
+            rb = None
+        rb = rb if valido(rb) else None
+        rp = None
+        if fp.done():
+            rp = fp.result() if fp.exception() is None else None
+            rp = rp if valido(rp) else None
+        else:
+            self.lanzados += 1           # se sigue sin ella: cuenta como respaldo usado
+            fp.cancel()
+        ganador = "primaria" if rp is not None else "respaldo" if rb is not None else "ninguna"
+        self._fin(ganador, True, None)
+        return rp, rb
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            lat = np.array(self._lat) if self._lat else np.zeros(0)
+        return {
+            "peticiones": self.peticiones,
+            "respaldos":  self.lanzados,
+            "umbral_s":   self.umbral(),
+            "p50_s":      float(np.median(lat)) if len(lat) else None,
+            "muestras":   int(len(lat)),
+        }
@@ -0,0 +1,123 @@
+"""
+Correlación — Crypto Predictor 5min
+════════════════════════════════════
+Correlación y beta de cada par frente a BTC, matriz completa por pares y
+correlación adelantada (BTC en t−1 frente al par en t), sobre velas 1m
+alineadas. Se recalcula una vez por refresco del scanner con las velas
+que ya tiene en memoria — ninguna descarga extra por altcoin — y la
+comparten todos los análisis del proceso.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _corr_beta(x: np.ndarray, ref: np.ndarray):
+    """
+    Correlación y beta de cada fila de x frente a ref sobre el último eje.
+    x (..., W), ref (..., W) broadcastable → (corr, beta) de forma (...).
+    """
+    xc = x - x.mean(axis=-1, keepdims=True)
+    rc = ref - ref.mean(axis=-1, keepdims=True)
+    cov   = (xc * rc).mean(axis=-1)
+    var_x = (xc * xc).mean(axis=-1)
+    var_r = (rc * rc).mean(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.sqrt(var_x * var_r)
+        beta = cov / var_r
+    return corr, beta
+
+
+class MatrizCorrelacion:
+    """
+    actualizar({symbol: df 1m}) alinea los cierres por timestamp, pasa a
+    log-retornos (símbolos × velas) y calcula de una vez:
+      • corr / beta frente a `referencia` en las últimas `ventana` velas,
+      • su versión móvil sobre todo el histórico (sliding windows),
+      • la correlación adelantada `lag` velas (BTC lidera),
+      • la matriz de correlación completa entre todos los pares.
+    Lecturas seguras entre hilos con lectura(), matriz() y rolling().
+    """
+
+    def __init__(self, referencia: str = "BTC", ventana: int = 30, lag: int = 1):
+        self.referencia = referencia
+        self.ventana    = ventana
+        self.lag        = lag
+        self._lock      = threading.Lock()
+        self._estado    = None
+        self.ts         = 0.0
+
+    def actualizar(self, velas: dict) -> bool:
+        """Recalcula con las velas dadas; False si no hay datos suficientes."""
+        cierres = pd.concat({s: df["close"] for s, df in velas.items()
+                             if df is not None and len(df)}, axis=1).dropna()
+        if self.referencia not in cierres or len(cierres) < self.ventana + self.lag + 1:
+            return False
+        symbols = list(cierres.columns)
+        r   = np.diff(np.log(cierres.values.T.astype(float)), axis=1)   # (S, T)
+        ref = r[symbols.index(self.referencia)]
+        w   = self.ventana
+
+        corr, beta = _corr_beta(r[:, -w:], ref[-w:])
+        vent_r   = np.lib.stride_tricks.sliding_window_view(r, w, axis=1)     # (S, T-w+1, w)
+        vent_ref = np.lib.stride_tricks.sliding_window_view(ref, w)          # (T-w+1, w)
+        corr_mov, beta_mov = _corr_beta(vent_r, vent_ref[None])
+        corr_lag, _ = _corr_beta(r[:, -w:], ref[-w - self.lag:-self.lag])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pares = np.corrcoef(r[:, -w:])
+
+        estado = {
+            "symbols":  symbols,
+            "indice":   cierres.index[-corr_mov.shape[1]:],
+            "corr":     corr,
+            "beta":     beta,
+            "corr_lag": corr_lag,
+            "corr_mov": corr_mov,
+            "beta_mov": beta_mov,
+            "pares":    pares,
+            # Movimiento reciente de la referencia (%), últimas 1 y 3 velas
+            "ref_1m":   (np.exp(ref[-1]) - 1) * 100,
+            "ref_3m":   (np.exp(ref[-3:].sum()) - 1) * 100,
+        }
+        with self._lock:
+            self._estado = estado
+            self.ts = time.time()
+        return True
+
+    def lectura(self, symbol: str):
+        """
+        {"corr", "beta", "corr_lag", "ref_1m", "ref_3m", "ts"} de un par
+        frente a la referencia; None para la propia referencia o si el par
+        no se sigue.
+        """
+        with self._lock:
+            e, ts = self._estado, self.ts
+        if e is None or symbol == self.referencia or symbol not in e["symbols"]:
+            return None
+        i = e["symbols"].index(symbol)
+        if not np.isfinite(e["corr"][i]):
+            return None
+        return {"corr": float(e["corr"][i]), "beta": float(e["beta"][i]),
+                "corr_lag": float(e["corr_lag"][i]),
+                "ref_1m": float(e["ref_1m"]), "ref_3m": float(e["ref_3m"]), "ts": ts}
+
+    def matriz(self) -> pd.DataFrame:
+        """Matriz de correlación entre todos los pares seguidos."""
+        with self._lock:
+            e = self._estado
+        if e is None:
+            return pd.DataFrame()
+        return pd.DataFrame(e["pares"], index=e["symbols"], columns=e["symbols"])
+
+    def rolling(self, symbol: str) -> pd.DataFrame:
+        """Correlación y beta móviles de `symbol` frente a la referencia."""
+        with self._lock:
+            e = self._estado
+        if e is None or symbol not in e["symbols"]:
+            return pd.DataFrame(columns=["corr", "beta"])
+        i = e["symbols"].index(symbol)
+        return pd.DataFrame({"corr": e["corr_mov"][i], "beta": e["beta_mov"][i]},
+                            index=e["indice"])
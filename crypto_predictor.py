@@ -25,8 +25,18 @@ import numpy as np
 import warnings
 import ssl
 import os
+import threading
+import time
 import urllib3
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from libro import desde_book, imbalance_ponderado, curva_profundidad, muros_liquidez
+from tiempos import informe, medido, tramo
+from metricas import METRICAS
+from cobertura import Cobertura
 
 warnings.filterwarnings("ignore")
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -36,25 +46,80 @@ os.environ["PYTHONHTTPSVERIFY"] = "0"
 # ─────────────────────────────────────────────
 # ENDPOINTS
 # ─────────────────────────────────────────────
-KRAKEN_BASE  = "https://api.kraken.com/0/public"
-OKX_BASE     = "https://www.okx.com/api/v5"
-FNG_URL      = "https://api.alternative.me/fng/?limit=3"
+# Configurables por entorno (p. ej. para apuntar al simulador de simulador.py)
+KRAKEN_BASE  = os.environ.get("CRYPTO_KRAKEN_BASE", "https://api.kraken.com/0/public")
+OKX_BASE     = os.environ.get("CRYPTO_OKX_BASE", "https://www.okx.com/api/v5")
+FNG_URL      = os.environ.get("CRYPTO_FNG_URL", "https://api.alternative.me/fng/?limit=3")
 
 
 # ─────────────────────────────────────────────
 # CLIENTE HTTP
 # ─────────────────────────────────────────────
+_HTTP_PETICIONES = METRICAS.contador(
+    "crypto_http_peticiones_total",
+    "Peticiones HTTP por endpoint y resultado (código HTTP, timeout, conexion, "
+    "json = respuesta no parseable, api_error = error en el cuerpo)",
+    ("endpoint", "estado"))
+_PARSEO = METRICAS.contador(
+    "crypto_parseo_fallos_total", "Respuestas con un formato inesperado por fuente",
+    ("fuente",))
+_HTTP_LATENCIA = METRICAS.histograma(
+    "crypto_http_latencia_segundos", "Latencia de las peticiones HTTP por endpoint",
+    ("endpoint",))
+
+
+@lru_cache(maxsize=256)
+def _endpoint(url: str) -> str:
+    """https://api.kraken.com/0/public/OHLC → api.kraken.com/0/public/OHLC"""
+    u = urlsplit(url)
+    return u.netloc + u.path
+
+
+# Transporte alternativo (fixturas, simulador): fn(url, params, timeout) → JSON o None
+_TRANSPORTE = None
+
+
+def usar_transporte(fn):
+    """
+    Sustituye la red en _get por fn(url, params, timeout), que devuelve el
+    JSON ya interpretado o None (p. ej. fixturas.MercadoSintetico().transporte).
+    None vuelve a usar requests.
+    """
+    global _TRANSPORTE
+    _TRANSPORTE = fn
+
+
 def _get(url, params=None, timeout=10):
+    endpoint, estado = _endpoint(url), "error"
+    t0 = time.perf_counter()
     try:
-        r = requests.get(url, params=params, verify=False, timeout=timeout)
-        if r.status_code == 200:
-            data = r.json()
-            if isinstance(data, dict) and data.get("error") and data["error"]:
+        if _TRANSPORTE is not None:
+            data = _TRANSPORTE(url, params, timeout)
+            if data is None:
+                return None
+        else:
+            r = requests.get(url, params=params, verify=False, timeout=timeout)
+            estado = str(r.status_code)
+            if r.status_code != 200:
                 return None
-            return data
+            estado = "json"
+            data = r.json()
+        estado = "200"
+        if isinstance(data, dict) and data.get("error") and data["error"]:
+            estado = "api_error"
+            return None
+        return data
+    except requests.exceptions.Timeout:
+        estado = "timeout"
+        return None
+    except requests.exceptions.ConnectionError:
+        estado = "conexion"
         return None
     except Exception:
         return None
+    finally:
+        _HTTP_LATENCIA.observar(time.perf_counter() - t0, endpoint=endpoint)
+        _HTTP_PETICIONES.inc(endpoint=endpoint, estado=estado)
 
 
 # ─────────────────────────────────────────────
@@ -126,6 +191,21 @@ def _base_from_kraken(kraken_pair: str) -> str:
 # FUNCIONES DE DESCARGA INDIVIDUALES
 # ─────────────────────────────────────────────
 
+def _ohlc_df(data) -> pd.DataFrame:
+    """
+    Filas OHLC crudas de Kraken → DataFrame indexado por tiempo. Los
+    strings de precio se convierten en bloque con numpy (no columna a
+    columna con pandas).
+    """
+    valores = np.array([f[1:7] for f in data], dtype=float).reshape(-1, 6)
+    tiempo  = pd.to_datetime(np.array([f[0] for f in data], dtype=np.int64), unit="s")
+    df = pd.DataFrame(valores, columns=["open","high","low","close","vwap","volume"],
+                      index=pd.DatetimeIndex(tiempo, name="time"))
+    df["count"] = np.array([f[7] for f in data], dtype=int)
+    return df
+
+
+@medido("fetch._kraken_ohlc")
 def _kraken_ohlc(pair: str, interval: int, limit: int = 100):
     """Descarga velas de Kraken. Devuelve DataFrame o None."""
     raw = _get(f"{KRAKEN_BASE}/OHLC", {"pair": pair, "interval": interval})
@@ -135,17 +215,30 @@ def _kraken_ohlc(pair: str, interval: int, limit: int = 100):
     data = raw["result"][key][-(limit + 1):-1]
     if len(data) < 10:
         return None
-    df = pd.DataFrame(data, columns=["time","open","high","low","close","vwap","volume","count"])
-    df["time"] = pd.to_datetime(df["time"], unit="s")
-    df = df.set_index("time")
-    for col in ["open","high","low","close","vwap","volume"]:
-        df[col] = df[col].astype(float)
-    df["count"] = df["count"].astype(int)
-    return df
+    return _ohlc_df(data)
 
 
-def _kraken_book(pair: str):
-    raw = _get(f"{KRAKEN_BASE}/Depth", {"pair": pair, "count": 20})
+@medido("fetch._kraken_ohlc_desde")
+def _kraken_ohlc_desde(pair: str, interval: int = 1, since=None):
+    """
+    Velas cerradas posteriores a `since` (el id "last" que devuelve Kraken).
+    Sin since trae todo el histórico. Devuelve (DataFrame, last) o
+    (None, since) si falla; la vela en curso se descarta siempre.
+    """
+    params = {"pair": pair, "interval": interval}
+    if since:
+        params["since"] = since
+    raw = _get(f"{KRAKEN_BASE}/OHLC", params)
+    if not raw or "result" not in raw:
+        return None, since
+    key = [k for k in raw["result"] if k != "last"][0]
+    return _ohlc_df(raw["result"][key][:-1]), raw["result"].get("last", since)
+
+
+@medido("fetch._kraken_book")
+def _kraken_book(pair: str, niveles: int = 100):
+    """Order book de Kraken — hasta 500 niveles por lado."""
+    raw = _get(f"{KRAKEN_BASE}/Depth", {"pair": pair, "count": niveles})
     if raw and "result" in raw:
         key = list(raw["result"].keys())[0]
         bk  = raw["result"][key]
@@ -157,12 +250,13 @@ def _kraken_book(pair: str):
     return None
 
 
-def _okx_book(base: str):
-    """Order book de OKX spot — profundidad 20 niveles."""
+@medido("fetch._okx_book")
+def _okx_book(base: str, niveles: int = 400):
+    """Order book de OKX spot — hasta 400 niveles por lado."""
     inst = _OKX_SPOT.get(base)
     if not inst:
         return None
-    raw = _get(f"{OKX_BASE}/market/books", {"instId": inst, "sz": "20"})
+    raw = _get(f"{OKX_BASE}/market/books", {"instId": inst, "sz": str(niveles)})
     if raw and raw.get("code") == "0" and raw.get("data"):
         bk = raw["data"][0]
         return {
@@ -173,6 +267,7 @@ def _okx_book(base: str):
     return None
 
 
+@medido("fetch._okx_trades")
 def _okx_trades(base: str):
     """Últimos 100 trades de OKX — permite calcular taker buy/sell real."""
     inst = _OKX_SPOT.get(base)
@@ -195,6 +290,7 @@ def _okx_trades(base: str):
     return None
 
 
+@medido("fetch._okx_funding")
 def _okx_funding(base: str):
     """Funding rate actual del perpetuo en OKX."""
     inst = _OKX_SWAP.get(base)
@@ -211,6 +307,7 @@ def _okx_funding(base: str):
     return None
 
 
+@medido("fetch._okx_open_interest")
 def _okx_open_interest(base: str):
     """Open Interest del perpetuo en OKX."""
     inst = _OKX_SWAP.get(base)
@@ -223,17 +320,19 @@ def _okx_open_interest(base: str):
     return None
 
 
+@medido("fetch._okx_oi_history")
 def _okx_oi_history(base: str):
     """Historial de OI (8 puntos cada 5min) para calcular cambio %."""
     inst = _OKX_SWAP.get(base)
     if not inst:
         return None
-    raw = _get(f"{OKX_BASE}/rubik/stat/contracts/open-interest-volume",
-               {"ccy": base, "period": "5m"})
-    # Endpoint alternativo si falla
-    if not raw or raw.get("code") != "0":
-        raw = _get(f"{OKX_BASE}/public/open-interest-history",
-                   {"instId": inst, "period": "5m", "limit": "8"})
+    # rubik con open-interest-history de respaldo (cubierto: ver _COBERTURAS)
+    raw = _COBERTURAS["oi_hist"].pedir(
+        lambda: _get(f"{OKX_BASE}/rubik/stat/contracts/open-interest-volume",
+                     {"ccy": base, "period": "5m"}),
+        lambda: _get(f"{OKX_BASE}/public/open-interest-history",
+                     {"instId": inst, "period": "5m", "limit": "8"}),
+        valido=_okx_ok)
     if raw and raw.get("code") == "0" and raw.get("data") and len(raw["data"]) >= 2:
         try:
             vals = [float(d[1]) if isinstance(d, list) else float(d.get("oiCcy", 0))
@@ -241,10 +340,11 @@ def _okx_oi_history(base: str):
             if vals[0] > 0 and vals[-1] > 0:
                 return (vals[0] - vals[-1]) / vals[-1] * 100
         except Exception:
-            pass
+            _PARSEO.inc(fuente="_okx_oi_history")
     return None
 
 
+@medido("fetch._okx_long_short")
 def _okx_long_short(base: str):
     """Ratio long/short de OKX."""
     raw = _get(f"{OKX_BASE}/rubik/stat/contracts/long-short-account-ratio",
@@ -258,10 +358,11 @@ def _okx_long_short(base: str):
                 "ls_raw":      ls_ratio,
             }
         except Exception:
-            pass
+            _PARSEO.inc(fuente="_okx_long_short")
     return None
 
 
+@medido("fetch._fear_greed")
 def _fear_greed():
     """Fear & Greed Index de alternative.me — actualiza cada hora."""
     raw = _get(FNG_URL, timeout=6)
@@ -276,10 +377,11 @@ def _fear_greed():
                 "trend":          int(latest["value"]) - int(prev["value"]),
             }
         except Exception:
-            pass
+            _PARSEO.inc(fuente="_fear_greed")
     return None
 
 
+@medido("fetch._okx_price")
 def _okx_price(base: str):
     """Precio último de OKX para comparación multi-exchange."""
     inst = _OKX_SPOT.get(base)
@@ -290,13 +392,178 @@ def _okx_price(base: str):
         try:
             return float(raw["data"][0]["last"])
         except Exception:
-            pass
+            _PARSEO.inc(fuente="_okx_price")
     return None
 
 
+@medido("fetch._okx_ticker_24h")
+def _okx_ticker_24h(base: str):
+    """Ticker spot de OKX con el formato del de Kraken ({"result": {par: {c, o, v, h, l}}})."""
+    inst = _OKX_SPOT.get(base)
+    if not inst:
+        return None
+    raw = _get(f"{OKX_BASE}/market/ticker", {"instId": inst})
+    if raw and raw.get("code") == "0" and raw.get("data"):
+        try:
+            tk = raw["data"][0]
+            return {"fuente": "okx", "result": {inst: {
+                "c": [tk["last"]], "o": tk["open24h"], "v": [tk["vol24h"]] * 2,
+                "h": [tk["high24h"]] * 2, "l": [tk["low24h"]] * 2}}}
+        except Exception:
+            _PARSEO.inc(fuente="_okx_ticker_24h")
+    return None
+
+
+@medido("fetch._okx_ohlc")
+def _okx_ohlc(inst: str, limit: int = 100):
+    """
+    Velas 1m de OKX spot (instId "XXX-USDT") con las mismas columnas que
+    _kraken_ohlc. OKX no da nº de trades: count=0. Solo velas cerradas.
+    """
+    raw = _get(f"{OKX_BASE}/market/candles",
+               {"instId": inst, "bar": "1m", "limit": str(min(limit + 1, 300))})
+    if not raw or raw.get("code") != "0" or not raw.get("data"):
+        return None
+    data = [d for d in raw["data"] if len(d) < 9 or d[8] == "1"][:limit][::-1]
+    if len(data) < 10:
+        return None
+    df = pd.DataFrame([d[:6] for d in data],
+                      columns=["time","open","high","low","close","volume"])
+    df["time"] = pd.to_datetime(df["time"].astype("int64"), unit="ms")
+    df = df.set_index("time")
+    for col in ["open","high","low","close","volume"]:
+        df[col] = df[col].astype(float)
+    df["vwap"]  = df["close"]
+    df["count"] = 0
+    return df
+
+
+@medido("fetch._kraken_pares_usd")
+def _kraken_pares_usd():
+    """Todos los pares spot de Kraken cotizados en USD → [(altname, base)]."""
+    raw = _get(f"{KRAKEN_BASE}/AssetPairs", timeout=15)
+    if not raw or "result" not in raw:
+        return []
+    pares = []
+    for info in raw["result"].values():
+        alt = info.get("altname", "")
+        if info.get("quote") not in ("ZUSD", "USD") or alt.endswith(".d"):
+            continue
+        if info.get("status", "online") != "online":
+            continue
+        base = info.get("wsname", alt).split("/")[0]
+        pares.append((alt, {"XBT": "BTC", "XDG": "DOGE"}.get(base, base)))
+    return pares
+
+
+@medido("fetch._okx_pares_usdt")
+def _okx_pares_usdt():
+    """Todos los pares spot de OKX cotizados en USDT → [(instId, base)]."""
+    raw = _get(f"{OKX_BASE}/public/instruments", {"instType": "SPOT"}, timeout=15)
+    if not raw or raw.get("code") != "0":
+        return []
+    return [(d["instId"], d["baseCcy"]) for d in raw.get("data", [])
+            if d.get("quoteCcy") == "USDT" and d.get("state") == "live"]
+
+
+# ─────────────────────────────────────────────
+# FUENTES REDUNDANTES — peticiones cubiertas
+# La primaria se pide sola; si pasa de su p90 observado se lanza también
+# el respaldo y gana la primera respuesta válida (cobertura.Cobertura).
+# ─────────────────────────────────────────────
+def _okx_ok(raw) -> bool:
+    return bool(raw) and raw.get("code") == "0" and bool(raw.get("data"))
+
+
+def _kraken_ok(raw) -> bool:
+    return bool(raw) and bool(raw.get("result"))
+
+
+_COBERTURAS = {
+    # Los dos books se piden a la vez (Kraken entra en el book consolidado);
+    # el umbral solo marca cuánto se espera a OKX
+    "book":     Cobertura("book"),
+    "oi_hist":  Cobertura("oi_hist"),
+    "precio":   Cobertura("precio"),
+}
+
+
+def _books(pair: str, base: str) -> dict:
+    """
+    Books de OKX (más profundo) y Kraken, pedidos a la vez una sola vez. A
+    OKX se le espera hasta el p90 de su latencia; si no llega, se sigue con
+    el de Kraken. {"okx": book|None, "kraken": book|None}.
+    """
+    if base not in _OKX_SPOT:
+        return {"okx": None, "kraken": _kraken_book(pair)}
+    okx, kraken = _COBERTURAS["book"].ambas(lambda: _okx_book(base),
+                                            lambda: _kraken_book(pair))
+    return {"okx": okx, "kraken": kraken}
+
+
+def _ticker(pair: str, base: str):
+    """Ticker 24h: de la instantánea compartida si hay una conectada y sigue vigente."""
+    inst = _INSTANTANEAS
+    if inst is not None:
+        return inst.ticker(pair, lambda: _ticker_cubierto(pair, base))
+    return _ticker_cubierto(pair, base)
+
+
+def _ticker_cubierto(pair: str, base: str):
+    """Ticker 24h de Kraken, cubierto con el de OKX (mismo formato, "fuente": "okx")."""
+    primaria = lambda: _get(f"{KRAKEN_BASE}/Ticker", {"pair": pair})
+    if base not in _OKX_SPOT:
+        return primaria()
+    return _COBERTURAS["precio"].pedir(primaria, lambda: _okx_ticker_24h(base),
+                                       valido=_kraken_ok)
+
+
 # ─────────────────────────────────────────────
 # HURST EXPONENT (detección de régimen)
+# Motor vectorizado: todas las varianzas por lag en una sola pasada,
+# rolling sobre todo el histórico y lote de símbolos a la vez.
 # ─────────────────────────────────────────────
+def _tau_lags(precios: np.ndarray, lags: np.ndarray) -> np.ndarray:
+    """
+    Desviación típica de las diferencias p[t+lag] − p[t] para cada lag.
+    precios (m, n) → tau (m, k). Una sola pasada con un tensor (m, k, n)
+    enmascarado donde t + lag se sale de la serie.
+    """
+    n   = precios.shape[1]
+    idx = np.arange(n)
+    fin = idx[None, :] + lags[:, None]                      # (k, n)
+    mask = fin < n
+    dif  = precios[:, np.minimum(fin, n - 1)] - precios[:, None, :]
+    dif  = np.where(mask[None], dif, 0.0)
+    cnt  = mask.sum(axis=1)[None, :]                        # (1, k)
+    media = dif.sum(axis=2) / cnt
+    dev   = np.where(mask[None], dif - media[..., None], 0.0)
+    return np.sqrt((dev * dev).sum(axis=2) / cnt)
+
+
+def _pendiente_loglog(tau: np.ndarray, min_lag: int) -> np.ndarray:
+    """
+    Pendiente de log(tau) frente a log(lag) por fila, recortada a [0.1, 0.9].
+    Igual que el ajuste original: los tau nulos se descartan y se ajusta
+    contra los primeros lags; con menos de 3 puntos válidos → 0.5.
+    """
+    m, k  = tau.shape
+    h     = np.full(m, 0.5)
+    validos = tau > 0
+    completos = validos.all(axis=1)
+    if k >= 3 and completos.any():
+        x  = np.log(np.arange(min_lag, min_lag + k, dtype=float))
+        xc = x - x.mean()
+        y  = np.log(tau[completos])
+        h[completos] = (y - y.mean(axis=1, keepdims=True)) @ xc / (xc @ xc)
+    for i in np.flatnonzero(~completos):
+        t = tau[i][validos[i]]
+        if len(t) >= 3:
+            h[i] = np.polyfit(np.log(np.arange(min_lag, min_lag + len(t))), np.log(t), 1)[0]
+    h = np.where(np.isfinite(h), h, 0.5)
+    return np.clip(h, 0.1, 0.9)
+
+
 def hurst_exponent(series: pd.Series, min_lag: int = 2, max_lag: int = 20) -> float:
     """
     H > 0.6  → tendencia persistente (trending)
@@ -304,21 +571,125 @@ def hurst_exponent(series: pd.Series, min_lag: int = 2, max_lag: int = 20) -> fl
     H < 0.4  → reversión a la media (mean-reverting)
     """
     try:
-        prices = series.dropna().values
-        if len(prices) < max_lag * 2:
+        prices = series.dropna().values.astype(float)
+        if len(prices) < max_lag * 2 or max_lag - min_lag < 3:
             return 0.5
-        lags   = range(min_lag, max_lag)
-        tau    = [np.std(np.subtract(prices[lag:], prices[:-lag])) for lag in lags]
-        tau    = [t for t in tau if t > 0]
-        if len(tau) < 3:
+        tau = _tau_lags(prices[None, :], np.arange(min_lag, max_lag))
+        return float(_pendiente_loglog(tau, min_lag)[0])
+    except Exception:
+        return 0.5
+
+
+def hurst_rolling(series: pd.Series, ventana: int = 80,
+                  min_lag: int = 2, max_lag: int = 20) -> pd.Series:
+    """
+    Hurst de cada ventana móvil de `ventana` velas sobre todo el histórico
+    (mismo estimador que hurst_exponent). NaN hasta completar la primera.
+    Por cada lag, las varianzas de todas las ventanas salen de una vista
+    deslizante sobre la serie de diferencias.
+    """
+    prices = series.values.astype(float)
+    n   = len(prices)
+    out = pd.Series(np.nan, index=series.index)
+    max_lag = min(max_lag, ventana // 2)
+    if n < ventana or max_lag - min_lag < 3:
+        return out
+    lags = range(min_lag, max_lag)
+    tau  = np.empty((n - ventana + 1, len(lags)))
+    for j, lag in enumerate(lags):
+        dif = prices[lag:] - prices[:-lag]
+        tau[:, j] = np.lib.stride_tricks.sliding_window_view(dif, ventana - lag).std(axis=1)
+    out.iloc[ventana - 1:] = _pendiente_loglog(tau, min_lag)
+    return out
+
+
+def hurst_rs(series: pd.Series, min_tramo: int = 8) -> float:
+    """
+    Variante R/S (rango reescalado) sobre log-retornos. Para cada tamaño de
+    tramo se parten los retornos en bloques y el R/S medio de todos los
+    bloques sale de operaciones sobre la matriz (bloques, tamaño).
+    """
+    try:
+        ret = np.diff(np.log(series.dropna().values.astype(float)))
+        n   = len(ret)
+        tamaños = np.unique(np.geomspace(min_tramo, n // 2, num=8).astype(int))
+        if len(tamaños) < 3:
             return 0.5
-        poly   = np.polyfit(np.log(list(range(min_lag, min_lag + len(tau)))),
-                            np.log(tau), 1)
-        return max(0.1, min(0.9, poly[0]))
+        rs = []
+        for t in tamaños:
+            bloques = ret[: (n // t) * t].reshape(-1, t)
+            dev  = np.cumsum(bloques - bloques.mean(axis=1, keepdims=True), axis=1)
+            rng  = dev.max(axis=1) - dev.min(axis=1)
+            std  = bloques.std(axis=1)
+            ok   = std > 0
+            rs.append((rng[ok] / std[ok]).mean() if ok.any() else np.nan)
+        rs = np.array(rs)
+        ok = np.isfinite(rs) & (rs > 0)
+        if ok.sum() < 3:
+            return 0.5
+        h = np.polyfit(np.log(tamaños[ok]), np.log(rs[ok]), 1)[0]
+        return float(max(0.1, min(0.9, h)))
     except Exception:
         return 0.5
 
 
+def hurst_dfa(series: pd.Series, min_escala: int = 4) -> float:
+    """
+    Variante DFA (detrended fluctuation analysis). El perfil acumulado se
+    parte en segmentos por escala y la tendencia lineal de cada segmento se
+    quita en forma cerrada, sin un polyfit por segmento.
+    """
+    try:
+        ret = np.diff(np.log(series.dropna().values.astype(float)))
+        perfil = np.cumsum(ret - ret.mean())
+        n = len(perfil)
+        escalas = np.unique(np.geomspace(min_escala, n // 4, num=8).astype(int))
+        if len(escalas) < 3:
+            return 0.5
+        fluct = []
+        for s in escalas:
+            seg = perfil[: (n // s) * s].reshape(-1, s)
+            x   = np.arange(s) - (s - 1) / 2
+            pend = (seg - seg.mean(axis=1, keepdims=True)) @ x / (x @ x)
+            res  = seg - seg.mean(axis=1, keepdims=True) - pend[:, None] * x
+            fluct.append(np.sqrt((res * res).mean()))
+        fluct = np.array(fluct)
+        ok = fluct > 0
+        if ok.sum() < 3:
+            return 0.5
+        h = np.polyfit(np.log(escalas[ok]), np.log(fluct[ok]), 1)[0]
+        return float(max(0.1, min(0.9, h)))
+    except Exception:
+        return 0.5
+
+
+def hurst_lote(series_por_symbol: dict, metodo: str = "var",
+               min_lag: int = 2, max_lag: int = 20) -> dict:
+    """
+    Hurst de muchos símbolos a la vez: {symbol: serie} → {symbol: H}.
+    Con metodo="var" las series de igual longitud se apilan en una matriz
+    y se resuelven en una sola pasada; "rs" y "dfa" usan sus variantes.
+    """
+    if metodo == "rs":
+        return {s: hurst_rs(v) for s, v in series_por_symbol.items()}
+    if metodo == "dfa":
+        return {s: hurst_dfa(v) for s, v in series_por_symbol.items()}
+
+    res, grupos = {}, {}
+    for sym, serie in series_por_symbol.items():
+        valores = serie.dropna().values.astype(float)
+        grupos.setdefault(len(valores), []).append((sym, valores))
+    for n, miembros in grupos.items():
+        lag_max = min(max_lag, n // 4)
+        if n < lag_max * 2 or lag_max - min_lag < 3:
+            res.update({sym: 0.5 for sym, _ in miembros})
+            continue
+        matriz = np.vstack([v for _, v in miembros])
+        hs = _pendiente_loglog(_tau_lags(matriz, np.arange(min_lag, lag_max)), min_lag)
+        res.update({sym: float(h) for (sym, _), h in zip(miembros, hs)})
+    return res
+
+
 def clasificar_regimen(h: float) -> str:
     if h > 0.62:
         return "trending"
@@ -328,6 +699,14 @@ def clasificar_regimen(h: float) -> str:
         return "noise"
 
 
+def clasificar_regimen_serie(h) -> pd.Series:
+    """Versión vectorizada de clasificar_regimen (p. ej. sobre hurst_rolling)."""
+    h = pd.Series(h)
+    return pd.Series(np.select([h > 0.62, h < 0.40],
+                               ["trending", "mean_reverting"], "noise"),
+                     index=h.index).where(h.notna())
+
+
 # ─────────────────────────────────────────────
 # DETECCIÓN DE WASH TRADING
 # ─────────────────────────────────────────────
@@ -348,55 +727,164 @@ def detectar_wash_trading(df: pd.DataFrame) -> float:
 # ─────────────────────────────────────────────
 # DESCARGA PRINCIPAL — PARALELA
 # ─────────────────────────────────────────────
-def _safe_call(fn, *args):
-    """Llama a fn, devuelve None ante cualquier excepción."""
+_EXCEPCIONES = METRICAS.contador(
+    "crypto_fuente_excepciones_total",
+    "Excepciones capturadas al descargar o interpretar una fuente", ("fuente", "tipo"))
+
+
+def _safe_call(fn, *args, fuente: str = None):
+    """Llama a fn, devuelve None ante cualquier excepción (contada en métricas)."""
     try:
         return fn(*args)
-    except Exception:
+    except Exception as e:
+        _EXCEPCIONES.inc(fuente=fuente or getattr(fn, "__name__", "?"),
+                         tipo=type(e).__name__)
         return None
 
 
-def descargar_datos(symbol: str):
+# Motor de divergencia multi-venue en marcha (divergencia.MotorDivergencia) o
+# None. Si hay uno, el precio OKX y la divergencia salen de su último ciclo
+# en vez de pedir un ticker por símbolo.
+_MOTOR_DIVERGENCIA = None
+
+
+def usar_motor_divergencia(motor):
+    """Conecta (o con None desconecta) el motor de divergencia del proceso."""
+    global _MOTOR_DIVERGENCIA
+    _MOTOR_DIVERGENCIA = motor
+
+
+def _precio_okx(base: str):
+    motor = _MOTOR_DIVERGENCIA
+    precio = motor.precio(base, "okx") if motor is not None else None
+    return precio if precio is not None else _okx_price(base)
+
+
+def _divergencia(base: str):
+    motor = _MOTOR_DIVERGENCIA
+    return motor.desviacion(base) if motor is not None else None
+
+
+# Matriz de correlación con BTC (correlacion.MatrizCorrelacion) o None. La
+# alimenta el scanner de fondo con sus velas 1m; aquí solo se lee.
+_MOTOR_CORRELACION = None
+
+
+def usar_motor_correlacion(motor):
+    """Conecta (o con None desconecta) la matriz de correlación del proceso."""
+    global _MOTOR_CORRELACION
+    _MOTOR_CORRELACION = motor
+
+
+def _lectura_btc(base: str):
+    motor = _MOTOR_CORRELACION
+    return motor.lectura(base) if motor is not None else None
+
+
+# Historial de derivados en memoria (derivados.HistorialDerivados) o None.
+# Con uno conectado, funding, Δ de OI y long/short salen de él sin pedir
+# nada por análisis; sin él se piden a OKX como siempre.
+_HISTORIAL_DERIVADOS = None
+
+
+def usar_historial_derivados(historial):
+    """Conecta (o con None desconecta) el historial de derivados del proceso."""
+    global _HISTORIAL_DERIVADOS
+    _HISTORIAL_DERIVADOS = historial
+
+
+# Instantánea de mercado compartida (instantanea.Instantaneas) o None. Con
+# una conectada, el scan, el análisis y el seguimiento en vivo leen velas y
+# ticker de ella y reutilizan lo que otro camino descargó hace poco.
+_INSTANTANEAS = None
+
+
+def usar_instantaneas(inst):
+    """Conecta (o con None desconecta) la instantánea de mercado del proceso."""
+    global _INSTANTANEAS
+    _INSTANTANEAS = inst
+
+
+def _velas(pair: str, intervalo: int, n: int):
+    """Últimas `n` velas cerradas, de la instantánea si hay una conectada."""
+    inst = _INSTANTANEAS
+    if inst is not None:
+        return inst.velas(pair, intervalo, n)
+    return _kraken_ohlc(pair, intervalo, n)
+
+
+def _derivado(base: str, clave: str, respaldo=None):
+    historial = _HISTORIAL_DERIVADOS
+    if historial is not None:
+        lectura = historial.lectura(base)
+        return lectura.get(clave) if lectura else None
+    return respaldo(base) if respaldo else None
+
+
+# Fuentes secundarias de descargar_datos: nombre → (llamada(pair, base), vigencia en s).
+# Todas opcionales: si fallan quedan a None. La vigencia la usa SeguimientoVivo
+# para no volver a pedir lo que no pudo cambiar (0 = pedir en cada refresco).
+_FUENTES = {
+    "books":       (lambda pair, base: _books(pair, base),                           0),
+    "okx_trades":  (lambda pair, base: _okx_trades(base),                            0),
+    "funding":     (lambda pair, base: _derivado(base, "funding", _okx_funding),    60),
+    "oi":          (lambda pair, base: _okx_open_interest(base),                    60),
+    "oi_chg":      (lambda pair, base: _derivado(base, "oi_chg", _okx_oi_history), 300),
+    "ls":          (lambda pair, base: _derivado(base, "ls", _okx_long_short),     300),
+    "derivados":   (lambda pair, base: _derivado(base, "ventanas"),                 60),
+    "okx_price":   (lambda pair, base: _precio_okx(base),                            0),
+    "divergencia": (lambda pair, base: _divergencia(base),                           0),
+    "btc_lead":    (lambda pair, base: _lectura_btc(base),                           0),
+    "fng":         (lambda pair, base: _fear_greed(),                             3600),
+    "ticker":      (lambda pair, base: _ticker(pair, base),                          0),
+}
+
+# Marcos de velas: clave → (intervalo en minutos, velas que se guardan)
+_MARCOS = {"df": (1, 100), "df5": (5, 60), "df15": (15, 50), "df1h": (60, 48)}
+
+
+def _fuente(clave: str, pair: str, base: str):
+    """Una entrada de _FUENTES, medida como tramo "fuente.<clave>"."""
+    with tramo(f"fuente.{clave}"):
+        return _safe_call(_FUENTES[clave][0], pair, base, fuente=clave)
+
+
+def _descargar_fuentes(symbol: str):
+    """
+    Descarga en bruto de un símbolo: (pair, display, base, marcos, fuentes,
+    error). `marcos` son las velas por clave de _MARCOS, `fuentes` el
+    resultado de cada entrada de _FUENTES.
+    """
     pair, display = normalizar_symbol(symbol)
     base = _base_from_kraken(pair)
 
     # ── OHLC 1m — obligatorio ──
-    df = _safe_call(_kraken_ohlc, pair, 1, 100)
+    df = _safe_call(_velas, pair, 1, 100)
     if df is None:
         try:
             assets = _get(f"{KRAKEN_BASE}/AssetPairs", {"pair": pair})
             if assets and "result" in assets:
                 alt = list(assets["result"].keys())[0]
-                df  = _safe_call(_kraken_ohlc, alt, 1, 100)
+                df  = _safe_call(_velas, alt, 1, 100)
         except Exception:
             pass
     if df is None or len(df) < 20:
-        return None, None, None, None, None, (
+        return pair, display, base, None, None, (
             f"Par '{pair}' no encontrado en Kraken. "
             "Prueba con: BTC, ETH, SOL, XRP, DOGE, ADA, DOT, AVAX, LINK, LTC…"
-        ), None, None
-
-    # ── OHLC adicionales — opcionales ──
-    df5   = _safe_call(_kraken_ohlc, pair, 5,  60)
-    df15  = _safe_call(_kraken_ohlc, pair, 15, 50)
-    df1h  = _safe_call(_kraken_ohlc, pair, 60, 48)
-
-    # ── Order book: OKX preferido, fallback Kraken ──
-    book_okx = _safe_call(_okx_book,    base)
-    book_krk = _safe_call(_kraken_book, pair)
-    book = book_okx if book_okx else book_krk
-
-    # ── Datos OKX — todos opcionales, nunca bloquean ──
-    okx_trades   = _safe_call(_okx_trades,       base)
-    funding_data = _safe_call(_okx_funding,       base) or {}
-    oi_val       = _safe_call(_okx_open_interest, base)
-    oi_chg       = _safe_call(_okx_oi_history,    base)
-    ls_data      = _safe_call(_okx_long_short,    base) or {}
-    okx_price    = _safe_call(_okx_price,         base)
-    fng          = _safe_call(_fear_greed)
-
-    # ── Enriquecer df con taker estimado (mejorado con OKX trades si disponible) ──
-    # okx_trades already set above
+        )
+
+    # ── OHLC adicionales y fuentes OKX / F&G / ticker — opcionales ──
+    marcos = {"df": df}
+    for clave, (intervalo, n) in _MARCOS.items():
+        if clave != "df":
+            marcos[clave] = _safe_call(_velas, pair, intervalo, n)
+    fuentes = {k: _fuente(k, pair, base) for k in _FUENTES}
+    return pair, display, base, marcos, fuentes, None
+
+
+def _enriquecer_taker(df: pd.DataFrame, okx_trades) -> pd.DataFrame:
+    """Columnas taker estimadas (con el ratio real de OKX si disponible)."""
     if okx_trades:
         # Usar ratio real de OKX para distribuir el volumen de las últimas velas
         real_ratio = okx_trades["buy_ratio"] / 100
@@ -404,22 +892,34 @@ def descargar_datos(symbol: str):
         df["quote_volume"]    = df["volume"] * df["close"]
         df["taker_buy_quote"] = df["quote_volume"] * real_ratio
     else:
+        # Estimación 60/40 según el color de la vela
+        ratio = np.where(df["close"].values >= df["open"].values, 0.6, 0.4)
         df["quote_volume"]    = df["volume"] * df["close"]
-        df["taker_buy_quote"] = df.apply(
-            lambda r: r["quote_volume"] * 0.6 if r["close"] >= r["open"]
-                      else r["quote_volume"] * 0.4, axis=1)
-        df["taker_buy_base"]  = df.apply(
-            lambda r: r["volume"] * 0.6 if r["close"] >= r["open"]
-                      else r["volume"] * 0.4, axis=1)
+        df["taker_buy_quote"] = df["quote_volume"] * ratio
+        df["taker_buy_base"]  = df["volume"] * ratio
     df["trades"] = df["count"]
+    return df
+
+
+def _ensamblar(pair: str, display: str, base: str, df: pd.DataFrame, fuentes: dict):
+    """Fuentes en bruto → (book, futures_data, info) como los da descargar_datos."""
+    funding_data = fuentes.get("funding") or {}
+    ls_data      = fuentes.get("ls") or {}
+    okx_trades   = fuentes.get("okx_trades")
+    okx_price    = fuentes.get("okx_price")
+    fng          = fuentes.get("fng")
 
     # ── Order book: preferir OKX (más profundo), fallback Kraken ──
-    # book_okx already set above
-    # book_krk already set above
-    book = book_okx if book_okx else book_krk
+    # Con los dos disponibles, "venues" los lleva juntos para el book consolidado
+    books  = fuentes.get("books") or {}
+    book   = books.get("okx") or books.get("kraken")
+    venues = {b["source"]: b for b in (books.get("okx"), books.get("kraken"))
+              if b and b.get("bids") and b.get("asks")}
+    if len(venues) > 1:
+        book = dict(book, venues=venues)
 
     # ── Ticker Kraken para precio y 24h stats ──
-    ticker_raw    = _get(f"{KRAKEN_BASE}/Ticker", {"pair": pair})
+    ticker_raw    = fuentes.get("ticker")
     precio_actual = float(df["close"].iloc[-1])
     cambio_pct    = 0.0
     vol_24h = high_24h = low_24h = 0.0
@@ -435,32 +935,29 @@ def descargar_datos(symbol: str):
         low_24h       = float(tk["l"][1])
 
     # ── Precio OKX para comparación multi-exchange ──
-    # okx_price already set above
+    # (si el ticker vino de OKX por la cobertura, comparar no tiene sentido)
     price_diverge = None
-    if okx_price and precio_actual > 0:
+    if okx_price and precio_actual > 0 and (ticker_raw or {}).get("fuente") != "okx":
         price_diverge = (precio_actual - okx_price) / okx_price * 100
 
     # ── Datos de futuros / derivados de OKX ──
-    # funding_data already set above
-    # oi_val already set above
-    # oi_chg already set above
-    # ls_data already set above
-
     futures_data = {
         "funding_rate":      funding_data.get("funding_rate"),
         "next_funding_rate": funding_data.get("next_funding_rate"),
-        "open_interest":     oi_val,
-        "oi_change_pct":     oi_chg,
+        "open_interest":     fuentes.get("oi"),
+        "oi_change_pct":     fuentes.get("oi_chg"),
         "long_ratio":        ls_data.get("long_ratio"),
         "short_ratio":       ls_data.get("short_ratio"),
         "ls_raw":            ls_data.get("ls_raw"),
+        "derivados":         fuentes.get("derivados"),
         "okx_trades":        okx_trades,
         "price_diverge":     price_diverge,
+        "divergencia":       fuentes.get("divergencia"),
+        "btc_lead":          fuentes.get("btc_lead"),
         "book_source":       book.get("source", "kraken") if book else "kraken",
     }
 
     # ── Fear & Greed ──
-    # fng already set above
     if fng:
         futures_data["fng_value"]  = fng["value"]
         futures_data["fng_class"]  = fng["classification"]
@@ -478,232 +975,460 @@ def descargar_datos(symbol: str):
         "okx_price":     okx_price,
         "base":          base,
     }
+    return book, futures_data, info
 
-    return df, df5, book, futures_data, info, None, df15, df1h
+
+@medido("descarga")
+def descargar_datos(symbol: str):
+    pair, display, base, marcos, fuentes, error = _descargar_fuentes(symbol)
+    if error:
+        return None, None, None, None, None, error, None, None
+    df = _enriquecer_taker(marcos["df"], fuentes["okx_trades"])
+    book, futures_data, info = _ensamblar(pair, display, base, df, fuentes)
+    return df, marcos["df5"], book, futures_data, info, None, marcos["df15"], marcos["df1h"]
 
 
 # ─────────────────────────────────────────────
-# 20 INDICADORES BASE + NUEVOS CONTEXTUALES
+# CACHE DE SERIES INTERMEDIAS
+# Una por refresco: EMAs, medias/desv. móviles, true range, RSI, MACD…
+# se calculan una sola vez por frame y las comparten indicadores y gráficos.
 # ─────────────────────────────────────────────
+class CacheIntermedios:
+    """
+    Memo de series intermedias con clave (identidad del frame, operación,
+    parámetros). Guarda una referencia a cada frame para que su id no se
+    reutilice mientras la cache viva — crear una nueva en cada refresco.
+    """
+
+    def __init__(self):
+        self._memo   = {}
+        self._frames = {}
+        self.hits    = 0
+        self.misses  = 0
+
+    def __len__(self):
+        return len(self._memo)
+
+    def memo(self, frame, op, params, fn):
+        """Devuelve fn() memorizado bajo (id(frame), op, params)."""
+        clave = (id(frame), op, params)
+        if clave in self._memo:
+            self.hits += 1
+            return self._memo[clave]
+        self.misses += 1
+        self._frames[id(frame)] = frame
+        res = self._memo[clave] = fn()
+        return res
+
+    # ── Primitivas ──
+    def diff(self, frame, col="close"):
+        return self.memo(frame, "diff", (col,), lambda: frame[col].diff())
+
+    def ewm(self, frame, col, span):
+        return self.memo(frame, "ewm", (col, span),
+                         lambda: frame[col].ewm(span=span).mean())
+
+    def rolling(self, frame, col, n, stat="mean"):
+        return self.memo(frame, "rolling", (col, n, stat),
+                         lambda: getattr(frame[col].rolling(n), stat)())
+
+    def true_range(self, frame):
+        def _tr():
+            high, low, close = frame["high"], frame["low"], frame["close"]
+            return pd.concat([high - low,
+                              (high - close.shift()).abs(),
+                              (low  - close.shift()).abs()], axis=1).max(axis=1)
+        return self.memo(frame, "true_range", (), _tr)
+
+    # ── Compuestos ──
+    def rsi(self, frame, n=9):
+        def _rsi():
+            delta = self.diff(frame, "close")
+            avg_g = delta.clip(lower=0).rolling(n).mean()
+            avg_l = (-delta.clip(upper=0)).rolling(n).mean()
+            return 100 - 100 / (1 + avg_g / avg_l)
+        return self.memo(frame, "rsi", (n,), _rsi)
+
+    def macd(self, frame, rapida=5, lenta=13, senal=3):
+        """(línea MACD, señal, histograma)."""
+        def _macd():
+            macd_l = self.ewm(frame, "close", rapida) - self.ewm(frame, "close", lenta)
+            sig_l  = macd_l.ewm(span=senal).mean()
+            return macd_l, sig_l, macd_l - sig_l
+        return self.memo(frame, "macd", (rapida, lenta, senal), _macd)
+
+    def bollinger(self, frame, n=20):
+        """(media, desviación) móviles del cierre."""
+        return (self.rolling(frame, "close", n, "mean"),
+                self.rolling(frame, "close", n, "std"))
+
+    def stoch(self, frame, n=5, suav=3):
+        """(%K, %D) del estocástico lento."""
+        def _stoch():
+            low_n  = self.rolling(frame, "low",  n, "min")
+            high_n = self.rolling(frame, "high", n, "max")
+            k = ((frame["close"] - low_n) / (high_n - low_n) * 100).rolling(suav).mean()
+            return k, k.rolling(suav).mean()
+        return self.memo(frame, "stoch", (n, suav), _stoch)
 
-def calcular_indicadores(df, df5, book, futures_data, info,
-                         df15=None, df1h=None):
-    indicadores  = {}
-    señales      = {}
-    puntuaciones = {}
 
-    close   = df["close"]
-    high    = df["high"]
-    low     = df["low"]
-    volume  = df["volume"]
-    precio  = info["precio_actual"]
-
-    # ── 1. RSI (9) ──
-    delta  = close.diff()
-    avg_g  = delta.clip(lower=0).rolling(9).mean()
-    avg_l  = (-delta.clip(upper=0)).rolling(9).mean()
-    rsi    = (100 - 100 / (1 + avg_g / avg_l)).iloc[-1]
-    indicadores["RSI (9)"] = round(rsi, 1)
+# ─────────────────────────────────────────────
+# REGISTRO DE INDICADORES
+# Cada indicador declara sus entradas, su lookback y los intermedios
+# compartidos que usa. El motor arma un plan mínimo según las salidas
+# pedidas (perfil) y los datos disponibles, y solo calcula eso.
+# ─────────────────────────────────────────────
+_INDICADORES = {}   # nombre → especificación (orden = orden de salida)
+_INTERMEDIOS = {}   # nombre → fn(ctx) que calcula la serie compartida
+
+
+def registrar_indicador(nombre, entradas=("df",), lookback=1, intermedios=(),
+                        contexto=(), na=("N/A", "Sin datos")):
+    """
+    Decorador para añadir un indicador al motor.
+      entradas    — datos que necesita: "df", "df5", "df15", "df1h", "book"
+                    o claves de futures_data ("funding_rate", "fng_value"…)
+      lookback    — velas mínimas del primer frame de `entradas`
+      intermedios — series compartidas que consume (ver registrar_intermedio)
+      contexto    — salidas extra que escribe en ctx ("atr_pct", "regimen"…)
+      na          — (valor, texto) a mostrar si faltan entradas
+    La función recibe ctx y devuelve (valor, (tipo, texto), puntuación).
+    """
+    def deco(fn):
+        _INDICADORES[nombre] = {
+            "fn":          fn,
+            "entradas":    tuple(entradas),
+            "lookback":    lookback,
+            "intermedios": tuple(intermedios),
+            "contexto":    tuple(contexto),
+            "na":          na,
+        }
+        return fn
+    return deco
+
+
+def registrar_intermedio(nombre):
+    """Decorador para una serie intermedia compartida entre indicadores."""
+    def deco(fn):
+        _INTERMEDIOS[nombre] = fn
+        return fn
+    return deco
+
+
+def _intermedio(ctx, nombre):
+    """Devuelve el intermedio `nombre`, calculándolo solo la primera vez."""
+    return ctx["cache"].memo(ctx["df"], nombre, (),
+                             lambda: _INTERMEDIOS[nombre](ctx))
+
+
+_FRAMES = ("df", "df5", "df15", "df1h")
+
+
+def datos_disponibles(df, df5=None, book=None, futures_data=None,
+                      df15=None, df1h=None) -> dict:
+    """
+    Inventario de entradas presentes: {entrada: nº de velas | True}.
+    Los frames guardan su longitud para poder validar el lookback.
+    """
+    disp = {}
+    for nombre, frame in zip(_FRAMES, (df, df5, df15, df1h)):
+        if frame is not None and len(frame):
+            disp[nombre] = len(frame)
+    if book and book.get("bids") and book.get("asks"):
+        disp["book"] = True
+    for k, v in (futures_data or {}).items():
+        if v is not None:
+            disp[k] = True
+    return disp
+
+
+def _entradas_ok(spec, disp) -> bool:
+    for e in spec["entradas"]:
+        if e not in disp:
+            return False
+        if e in _FRAMES and disp[e] < spec["lookback"]:
+            return False
+    return True
+
+
+def salidas_perfil(perfil: str = "full") -> list:
+    """
+    Salidas que pide cada perfil:
+      full — todos los indicadores + atr_pct + régimen (pantalla completa)
+      scan — solo lo que mueve el score: indicadores con peso > 0 y régimen
+    """
+    if perfil == "scan":
+        return [n for n in _INDICADORES if PESOS_BASE.get(n, 0) > 0] + ["regimen"]
+    return list(_INDICADORES) + ["atr_pct", "regimen"]
+
+
+def plan_evaluacion(salidas, disp, incluir_na: bool = True) -> dict:
+    """
+    Plan mínimo para producir `salidas` con las entradas de `disp`.
+    Devuelve {"calcular": [...], "na": [...], "intermedios": [...],
+    "lookback": int}. Las salidas de contexto (atr_pct, regimen…) arrastran
+    al indicador que las produce aunque no se pida su fila. Con
+    incluir_na=False las filas sin datos se omiten en vez de salir como N/A.
+    """
+    pedidas = set(salidas)
+    calcular, na, intermedios = [], [], []
+    lookback = 0
+    for nombre, spec in _INDICADORES.items():
+        if nombre not in pedidas and not pedidas & set(spec["contexto"]):
+            continue
+        if not _entradas_ok(spec, disp):
+            if nombre in pedidas and incluir_na:
+                na.append(nombre)
+            continue
+        calcular.append(nombre)
+        if spec["entradas"] and spec["entradas"][0] == "df":
+            lookback = max(lookback, spec["lookback"])
+        for i in spec["intermedios"]:
+            if i not in intermedios:
+                intermedios.append(i)
+    return {"calcular": calcular, "na": na,
+            "intermedios": intermedios, "lookback": lookback}
+
+
+# ─────────────────────────────────────────────
+# INTERMEDIOS COMPARTIDOS (frame 1m)
+# ─────────────────────────────────────────────
+@registrar_intermedio("delta")
+def _im_delta(ctx):
+    return ctx["cache"].diff(ctx["df"], "close")
+
+
+@registrar_intermedio("ema7")
+def _im_ema7(ctx):
+    return ctx["cache"].ewm(ctx["df"], "close", 7)
+
+
+@registrar_intermedio("ema25")
+def _im_ema25(ctx):
+    return ctx["cache"].ewm(ctx["df"], "close", 25)
+
+
+@registrar_intermedio("bb_mid")
+def _im_bb_mid(ctx):
+    return ctx["cache"].bollinger(ctx["df"], 20)[0]
+
+
+@registrar_intermedio("bb_std")
+def _im_bb_std(ctx):
+    return ctx["cache"].bollinger(ctx["df"], 20)[1]
+
+
+@registrar_intermedio("true_range")
+def _im_true_range(ctx):
+    return ctx["cache"].true_range(ctx["df"])
+
+
+@registrar_intermedio("vol_ma20")
+def _im_vol_ma20(ctx):
+    return ctx["cache"].rolling(ctx["df"], "volume", 20, "mean")
+
+
+@registrar_intermedio("libro")
+def _im_libro(ctx):
+    return desde_book(ctx["book"])
+
+
+@registrar_intermedio("cambio_5m")
+def _im_cambio_5m(ctx):
+    close = ctx["close"]
+    return (close.iloc[-1] / close.iloc[-6] - 1) * 100 if len(close) >= 6 else 0
+
+
+# ─────────────────────────────────────────────
+# 20 INDICADORES BASE + NUEVOS CONTEXTUALES
+# ─────────────────────────────────────────────
+
+# ── 1. RSI (9) ──
+@registrar_indicador("RSI (9)", lookback=10, intermedios=("delta",))
+def _ind_rsi(ctx):
+    rsi    = ctx["cache"].rsi(ctx["df"], 9).iloc[-1]
+    valor  = round(rsi, 1)
     if rsi < 30:
-        señales["RSI (9)"] = ("alcista", f"Sobreventa ({rsi:.1f})")
-        puntuaciones["RSI (9)"] = 1.0
+        return valor, ("alcista", f"Sobreventa ({rsi:.1f})"), 1.0
     elif rsi > 70:
-        señales["RSI (9)"] = ("bajista", f"Sobrecompra ({rsi:.1f})")
-        puntuaciones["RSI (9)"] = -1.0
+        return valor, ("bajista", f"Sobrecompra ({rsi:.1f})"), -1.0
     elif rsi < 45:
-        señales["RSI (9)"] = ("alcista_leve", f"Zona baja ({rsi:.1f})")
-        puntuaciones["RSI (9)"] = 0.4
+        return valor, ("alcista_leve", f"Zona baja ({rsi:.1f})"), 0.4
     elif rsi > 55:
-        señales["RSI (9)"] = ("bajista_leve", f"Zona alta ({rsi:.1f})")
-        puntuaciones["RSI (9)"] = -0.4
-    else:
-        señales["RSI (9)"] = ("neutro", f"Neutro ({rsi:.1f})")
-        puntuaciones["RSI (9)"] = 0.0
+        return valor, ("bajista_leve", f"Zona alta ({rsi:.1f})"), -0.4
+    return valor, ("neutro", f"Neutro ({rsi:.1f})"), 0.0
 
-    # ── 2. MACD (5,13,3) ──
-    macd_l  = close.ewm(span=5).mean() - close.ewm(span=13).mean()
-    sig_l   = macd_l.ewm(span=3).mean()
-    hist    = macd_l - sig_l
+
+# ── 2. MACD (5,13,3) ──
+@registrar_indicador("MACD (5,13,3)", lookback=13)
+def _ind_macd(ctx):
+    macd_l, sig_l, hist = ctx["cache"].macd(ctx["df"], 5, 13, 3)
     h_val, h_prev = hist.iloc[-1], hist.iloc[-2]
-    indicadores["MACD (5,13,3)"] = f"{macd_l.iloc[-1]:.4f} / {sig_l.iloc[-1]:.4f}"
+    valor = f"{macd_l.iloc[-1]:.4f} / {sig_l.iloc[-1]:.4f}"
     if h_val > 0 and h_val > h_prev:
-        señales["MACD (5,13,3)"] = ("alcista", "Histograma subiendo")
-        puntuaciones["MACD (5,13,3)"] = 1.0
+        return valor, ("alcista", "Histograma subiendo"), 1.0
     elif h_val > 0 and h_val <= h_prev:
-        señales["MACD (5,13,3)"] = ("alcista_leve", "MACD+ perdiendo fuerza")
-        puntuaciones["MACD (5,13,3)"] = 0.3
+        return valor, ("alcista_leve", "MACD+ perdiendo fuerza"), 0.3
     elif h_val < 0 and h_val < h_prev:
-        señales["MACD (5,13,3)"] = ("bajista", "Histograma bajando")
-        puntuaciones["MACD (5,13,3)"] = -1.0
+        return valor, ("bajista", "Histograma bajando"), -1.0
     elif h_val < 0 and h_val >= h_prev:
-        señales["MACD (5,13,3)"] = ("bajista_leve", "MACD- perdiendo fuerza")
-        puntuaciones["MACD (5,13,3)"] = -0.3
-    else:
-        señales["MACD (5,13,3)"] = ("neutro", "Cruce zona 0")
-        puntuaciones["MACD (5,13,3)"] = 0.0
+        return valor, ("bajista_leve", "MACD- perdiendo fuerza"), -0.3
+    return valor, ("neutro", "Cruce zona 0"), 0.0
+
 
-    # ── 3. EMA 7/25 ──
-    ema7  = close.ewm(span=7).mean().iloc[-1]
-    ema25 = close.ewm(span=25).mean().iloc[-1]
-    indicadores["EMA 7/25"] = f"{ema7:.4f} / {ema25:.4f}"
+# ── 3. EMA 7/25 ──
+@registrar_indicador("EMA 7/25", lookback=2, intermedios=("ema7", "ema25"))
+def _ind_ema(ctx):
+    precio = ctx["precio"]
+    ema7   = _intermedio(ctx, "ema7").iloc[-1]
+    ema25  = _intermedio(ctx, "ema25").iloc[-1]
+    valor  = f"{ema7:.4f} / {ema25:.4f}"
     if ema7 > ema25 and precio > ema7:
-        señales["EMA 7/25"] = ("alcista", "Precio > EMA7 > EMA25")
-        puntuaciones["EMA 7/25"] = 1.0
+        return valor, ("alcista", "Precio > EMA7 > EMA25"), 1.0
     elif ema7 > ema25:
-        señales["EMA 7/25"] = ("alcista_leve", "EMA7 > EMA25, retroceso")
-        puntuaciones["EMA 7/25"] = 0.3
+        return valor, ("alcista_leve", "EMA7 > EMA25, retroceso"), 0.3
     elif ema7 < ema25 and precio < ema7:
-        señales["EMA 7/25"] = ("bajista", "Precio < EMA7 < EMA25")
-        puntuaciones["EMA 7/25"] = -1.0
+        return valor, ("bajista", "Precio < EMA7 < EMA25"), -1.0
     elif ema7 < ema25:
-        señales["EMA 7/25"] = ("bajista_leve", "EMA7 < EMA25, rebote")
-        puntuaciones["EMA 7/25"] = -0.3
-    else:
-        señales["EMA 7/25"] = ("neutro", "EMAs entrelazadas")
-        puntuaciones["EMA 7/25"] = 0.0
+        return valor, ("bajista_leve", "EMA7 < EMA25, rebote"), -0.3
+    return valor, ("neutro", "EMAs entrelazadas"), 0.0
+
 
-    # ── 4. Bollinger %B ──
-    bb_mid   = close.rolling(20).mean()
-    bb_std   = close.rolling(20).std()
+# ── 4. Bollinger %B ──
+@registrar_indicador("Bollinger %B", lookback=20, intermedios=("bb_mid", "bb_std"))
+def _ind_bollinger(ctx):
+    precio   = ctx["precio"]
+    bb_mid   = _intermedio(ctx, "bb_mid")
+    bb_std   = _intermedio(ctx, "bb_std")
     bb_upper = (bb_mid + 2 * bb_std).iloc[-1]
     bb_lower = (bb_mid - 2 * bb_std).iloc[-1]
     bb_mid_v = bb_mid.iloc[-1]
     pct_b    = (precio - bb_lower) / (bb_upper - bb_lower) * 100 \
                if (bb_upper - bb_lower) > 0 else 50
     bw       = (bb_upper - bb_lower) / bb_mid_v * 100
-    indicadores["Bollinger %B"] = f"{pct_b:.1f}% (BW {bw:.2f}%)"
+    valor    = f"{pct_b:.1f}% (BW {bw:.2f}%)"
     if pct_b < 5:
-        señales["Bollinger %B"] = ("alcista", f"Banda inferior ({pct_b:.0f}%)")
-        puntuaciones["Bollinger %B"] = 1.0
+        return valor, ("alcista", f"Banda inferior ({pct_b:.0f}%)"), 1.0
     elif pct_b > 95:
-        señales["Bollinger %B"] = ("bajista", f"Banda superior ({pct_b:.0f}%)")
-        puntuaciones["Bollinger %B"] = -1.0
+        return valor, ("bajista", f"Banda superior ({pct_b:.0f}%)"), -1.0
     elif pct_b < 35:
-        señales["Bollinger %B"] = ("alcista_leve", f"Zona baja ({pct_b:.0f}%)")
-        puntuaciones["Bollinger %B"] = 0.4
+        return valor, ("alcista_leve", f"Zona baja ({pct_b:.0f}%)"), 0.4
     elif pct_b > 65:
-        señales["Bollinger %B"] = ("bajista_leve", f"Zona alta ({pct_b:.0f}%)")
-        puntuaciones["Bollinger %B"] = -0.4
-    else:
-        señales["Bollinger %B"] = ("neutro", f"Centro ({pct_b:.0f}%)")
-        puntuaciones["Bollinger %B"] = 0.0
-
-    # ── 5. Stochastic (5,3) ──
-    low5  = low.rolling(5).min()
-    high5 = high.rolling(5).max()
-    stoch_k = ((close - low5) / (high5 - low5) * 100).rolling(3).mean()
-    stoch_d = stoch_k.rolling(3).mean()
+        return valor, ("bajista_leve", f"Zona alta ({pct_b:.0f}%)"), -0.4
+    return valor, ("neutro", f"Centro ({pct_b:.0f}%)"), 0.0
+
+
+# ── 5. Stochastic (5,3) ──
+@registrar_indicador("Stochastic (5,3)", lookback=9)
+def _ind_stochastic(ctx):
+    stoch_k, stoch_d = ctx["cache"].stoch(ctx["df"], 5, 3)
     k, d = stoch_k.iloc[-1], stoch_d.iloc[-1]
-    indicadores["Stochastic (5,3)"] = f"K={k:.1f} D={d:.1f}"
+    valor = f"K={k:.1f} D={d:.1f}"
     if k < 20 and d < 20:
-        señales["Stochastic (5,3)"] = ("alcista", f"Sobreventa K={k:.0f}")
-        puntuaciones["Stochastic (5,3)"] = 1.0
+        return valor, ("alcista", f"Sobreventa K={k:.0f}"), 1.0
     elif k > 80 and d > 80:
-        señales["Stochastic (5,3)"] = ("bajista", f"Sobrecompra K={k:.0f}")
-        puntuaciones["Stochastic (5,3)"] = -1.0
+        return valor, ("bajista", f"Sobrecompra K={k:.0f}"), -1.0
     elif k > d and k < 50:
-        señales["Stochastic (5,3)"] = ("alcista_leve", "K cruza D desde abajo")
-        puntuaciones["Stochastic (5,3)"] = 0.5
+        return valor, ("alcista_leve", "K cruza D desde abajo"), 0.5
     elif k < d and k > 50:
-        señales["Stochastic (5,3)"] = ("bajista_leve", "K cruza D desde arriba")
-        puntuaciones["Stochastic (5,3)"] = -0.5
-    else:
-        señales["Stochastic (5,3)"] = ("neutro", f"Zona media K={k:.0f}")
-        puntuaciones["Stochastic (5,3)"] = 0.0
-
-    # ── 6. Williams %R ──
-    hh = high.rolling(14).max()
-    ll = low.rolling(14).min()
-    wr = ((hh - close) / (hh - ll) * -100).iloc[-1]
-    indicadores["Williams %R"] = f"{wr:.1f}"
+        return valor, ("bajista_leve", "K cruza D desde arriba"), -0.5
+    return valor, ("neutro", f"Zona media K={k:.0f}"), 0.0
+
+
+# ── 6. Williams %R ──
+@registrar_indicador("Williams %R", lookback=14)
+def _ind_williams(ctx):
+    df = ctx["df"]
+    hh = ctx["cache"].rolling(df, "high", 14, "max")
+    ll = ctx["cache"].rolling(df, "low",  14, "min")
+    wr = ((hh - ctx["close"]) / (hh - ll) * -100).iloc[-1]
+    valor = f"{wr:.1f}"
     if wr < -80:
-        señales["Williams %R"] = ("alcista", f"Sobreventa ({wr:.0f})")
-        puntuaciones["Williams %R"] = 1.0
+        return valor, ("alcista", f"Sobreventa ({wr:.0f})"), 1.0
     elif wr > -20:
-        señales["Williams %R"] = ("bajista", f"Sobrecompra ({wr:.0f})")
-        puntuaciones["Williams %R"] = -1.0
-    else:
-        señales["Williams %R"] = ("neutro", f"Zona media ({wr:.0f})")
-        puntuaciones["Williams %R"] = 0.0
-
-    # ── 7. ATR (9) — informativo ──
-    tr    = pd.concat([high - low,
-                       (high - close.shift()).abs(),
-                       (low  - close.shift()).abs()], axis=1).max(axis=1)
-    atr   = tr.rolling(9).mean().iloc[-1]
-    atr_pct = atr / precio * 100
-    indicadores["ATR (9)"] = f"±{atr:.4f} (±{atr_pct:.3f}%)"
-    señales["ATR (9)"]     = ("neutro", f"Volatilidad: ±{atr_pct:.3f}% por vela")
-    puntuaciones["ATR (9)"] = 0.0
-
-    # ── 8. Rate of Change ──
-    roc5 = (close.iloc[-1] / close.iloc[-6] - 1) * 100 if len(close) >= 6 else 0
-    roc3 = (close.iloc[-1] / close.iloc[-4] - 1) * 100 if len(close) >= 4 else 0
-    indicadores["Rate of Change"] = f"3m: {roc3:+.3f}% | 5m: {roc5:+.3f}%"
+        return valor, ("bajista", f"Sobrecompra ({wr:.0f})"), -1.0
+    return valor, ("neutro", f"Zona media ({wr:.0f})"), 0.0
+
+
+# ── 7. ATR (9) — informativo ──
+@registrar_indicador("ATR (9)", lookback=10, intermedios=("true_range",),
+                     contexto=("atr_pct",))
+def _ind_atr(ctx):
+    atr     = _intermedio(ctx, "true_range").rolling(9).mean().iloc[-1]
+    atr_pct = atr / ctx["precio"] * 100
+    ctx["atr_pct"] = atr_pct
+    return (f"±{atr:.4f} (±{atr_pct:.3f}%)",
+            ("neutro", f"Volatilidad: ±{atr_pct:.3f}% por vela"), 0.0)
+
+
+# ── 8. Rate of Change ──
+@registrar_indicador("Rate of Change", lookback=6, intermedios=("cambio_5m",))
+def _ind_roc(ctx):
+    close = ctx["close"]
+    roc5  = _intermedio(ctx, "cambio_5m")
+    roc3  = (close.iloc[-1] / close.iloc[-4] - 1) * 100 if len(close) >= 4 else 0
+    valor = f"3m: {roc3:+.3f}% | 5m: {roc5:+.3f}%"
     if roc5 > 0.15 and roc3 > 0:
-        señales["Rate of Change"] = ("alcista", f"Momentum +{roc5:.3f}%")
-        puntuaciones["Rate of Change"] = min(1.0, roc5 / 0.3)
+        return valor, ("alcista", f"Momentum +{roc5:.3f}%"), min(1.0, roc5 / 0.3)
     elif roc5 < -0.15 and roc3 < 0:
-        señales["Rate of Change"] = ("bajista", f"Momentum {roc5:.3f}%")
-        puntuaciones["Rate of Change"] = max(-1.0, roc5 / 0.3)
-    else:
-        señales["Rate of Change"] = ("neutro", f"Sin momentum ({roc5:+.3f}%)")
-        puntuaciones["Rate of Change"] = 0.0
+        return valor, ("bajista", f"Momentum {roc5:.3f}%"), max(-1.0, roc5 / 0.3)
+    return valor, ("neutro", f"Sin momentum ({roc5:+.3f}%)"), 0.0
+
 
-    # ── 9. OBV ──
-    obv        = (np.sign(close.diff()) * volume).fillna(0).cumsum()
+# ── 9. OBV ──
+@registrar_indicador("OBV", lookback=5, intermedios=("delta",))
+def _ind_obv(ctx):
+    obv        = (np.sign(_intermedio(ctx, "delta")) * ctx["volume"]).fillna(0).cumsum()
     obv_ema    = obv.ewm(span=10).mean()
     obv_trend  = obv.iloc[-1] - obv.iloc[-5]
-    indicadores["OBV"] = f"Δ5m: {obv_trend:+.0f}"
+    valor = f"Δ5m: {obv_trend:+.0f}"
     if obv.iloc[-1] > obv_ema.iloc[-1] and obv_trend > 0:
-        señales["OBV"] = ("alcista", "OBV > EMA y subiendo")
-        puntuaciones["OBV"] = 1.0
+        return valor, ("alcista", "OBV > EMA y subiendo"), 1.0
     elif obv.iloc[-1] < obv_ema.iloc[-1] and obv_trend < 0:
-        señales["OBV"] = ("bajista", "OBV < EMA y bajando")
-        puntuaciones["OBV"] = -1.0
-    else:
-        señales["OBV"] = ("neutro", "OBV mixto")
-        puntuaciones["OBV"] = 0.0
+        return valor, ("bajista", "OBV < EMA y bajando"), -1.0
+    return valor, ("neutro", "OBV mixto"), 0.0
 
-    # ── 10. VWAP Desviación ──
+
+# ── 10. VWAP Desviación ──
+@registrar_indicador("VWAP Desviación", lookback=1)
+def _ind_vwap(ctx):
+    close, volume = ctx["close"], ctx["volume"]
     vwap = (close * volume).cumsum() / volume.cumsum()
-    vwap_dev = (precio - vwap.iloc[-1]) / vwap.iloc[-1] * 100
-    indicadores["VWAP Desviación"] = f"VWAP={vwap.iloc[-1]:.4f} ({vwap_dev:+.3f}%)"
+    vwap_dev = (ctx["precio"] - vwap.iloc[-1]) / vwap.iloc[-1] * 100
+    valor = f"VWAP={vwap.iloc[-1]:.4f} ({vwap_dev:+.3f}%)"
     if vwap_dev > 0.1:
-        señales["VWAP Desviación"] = ("bajista_leve", f"Precio {vwap_dev:+.2f}% sobre VWAP")
-        puntuaciones["VWAP Desviación"] = -0.5
+        return valor, ("bajista_leve", f"Precio {vwap_dev:+.2f}% sobre VWAP"), -0.5
     elif vwap_dev < -0.1:
-        señales["VWAP Desviación"] = ("alcista_leve", f"Precio {vwap_dev:+.2f}% bajo VWAP")
-        puntuaciones["VWAP Desviación"] = 0.5
-    else:
-        señales["VWAP Desviación"] = ("neutro", f"≈ VWAP ({vwap_dev:+.3f}%)")
-        puntuaciones["VWAP Desviación"] = 0.0
+        return valor, ("alcista_leve", f"Precio {vwap_dev:+.2f}% bajo VWAP"), 0.5
+    return valor, ("neutro", f"≈ VWAP ({vwap_dev:+.3f}%)"), 0.0
 
-    # ── 11. Volumen Relativo ──
-    vol_ma    = volume.rolling(20).mean().iloc[-1]
+
+# ── 11. Volumen Relativo ──
+@registrar_indicador("Volumen Relativo", lookback=20, intermedios=("vol_ma20",))
+def _ind_volumen_relativo(ctx):
+    close, volume = ctx["close"], ctx["volume"]
+    vol_ma    = _intermedio(ctx, "vol_ma20").iloc[-1]
     vol_ratio = volume.iloc[-1] / vol_ma if vol_ma > 0 else 1
     cambio_1m = (close.iloc[-1] - close.iloc[-2]) / close.iloc[-2] * 100
     # Penalizar si hay indicio de wash trading
-    wash_ratio = detectar_wash_trading(df)
+    wash_ratio = detectar_wash_trading(ctx["df"])
     vol_ratio_adj = vol_ratio * (1 - wash_ratio * 0.5)
-    indicadores["Volumen Relativo"] = f"{vol_ratio_adj:.2f}x" + (" ⚠wash" if wash_ratio > 0.3 else "")
+    valor = f"{vol_ratio_adj:.2f}x" + (" ⚠wash" if wash_ratio > 0.3 else "")
     if vol_ratio_adj > 2.0 and cambio_1m > 0:
-        señales["Volumen Relativo"] = ("alcista", f"Vol {vol_ratio_adj:.1f}x alcista")
-        puntuaciones["Volumen Relativo"] = 1.0
+        return valor, ("alcista", f"Vol {vol_ratio_adj:.1f}x alcista"), 1.0
     elif vol_ratio_adj > 2.0 and cambio_1m < 0:
-        señales["Volumen Relativo"] = ("bajista", f"Vol {vol_ratio_adj:.1f}x bajista")
-        puntuaciones["Volumen Relativo"] = -1.0
+        return valor, ("bajista", f"Vol {vol_ratio_adj:.1f}x bajista"), -1.0
     elif vol_ratio_adj > 1.3 and cambio_1m > 0:
-        señales["Volumen Relativo"] = ("alcista_leve", f"Vol elevado ({vol_ratio_adj:.1f}x)")
-        puntuaciones["Volumen Relativo"] = 0.5
+        return valor, ("alcista_leve", f"Vol elevado ({vol_ratio_adj:.1f}x)"), 0.5
     elif vol_ratio_adj > 1.3 and cambio_1m < 0:
-        señales["Volumen Relativo"] = ("bajista_leve", f"Vol elevado bajista ({vol_ratio_adj:.1f}x)")
-        puntuaciones["Volumen Relativo"] = -0.5
-    else:
-        señales["Volumen Relativo"] = ("neutro", f"Normal ({vol_ratio_adj:.1f}x)")
-        puntuaciones["Volumen Relativo"] = 0.0
+        return valor, ("bajista_leve", f"Vol elevado bajista ({vol_ratio_adj:.1f}x)"), -0.5
+    return valor, ("neutro", f"Normal ({vol_ratio_adj:.1f}x)"), 0.0
+
 
-    # ── 12. Patrón Vela ──
+# ── 12. Patrón Vela ──
+@registrar_indicador("Patrón Vela 1m", lookback=1)
+def _ind_patron_vela(ctx):
+    df, close, high, low = ctx["df"], ctx["close"], ctx["high"], ctx["low"]
     o, c_, h_, l_ = df["open"].iloc[-1], close.iloc[-1], high.iloc[-1], low.iloc[-1]
     body  = abs(c_ - o); rng = h_ - l_
     ls_s  = min(o, c_) - l_; us_s = h_ - max(o, c_)
@@ -723,316 +1448,351 @@ def calcular_indicadores(df, df5, book, futures_data, info,
             patron, p_score = "Alcista", 0.5
         else:
             patron, p_score = "Bajista", -0.5
-    indicadores["Patrón Vela 1m"] = patron
     tipo_v = ("alcista" if p_score > 0.5 else
               "bajista" if p_score < -0.5 else
               "alcista_leve" if p_score > 0 else
               "bajista_leve" if p_score < 0 else "neutro")
-    señales["Patrón Vela 1m"] = (tipo_v, patron)
-    puntuaciones["Patrón Vela 1m"] = p_score
-
-    # ── 13. Order Book Imbalance (OKX preferido) ──
-    book_src = futures_data.get("book_source", "kraken")
-    if book and "bids" in book and "asks" in book:
-        bids    = book["bids"][:10]
-        asks    = book["asks"][:10]
-        bid_vol = sum(float(b[1]) for b in bids)
-        ask_vol = sum(float(a[1]) for a in asks)
-        total   = bid_vol + ask_vol
-        obi     = (bid_vol - ask_vol) / total * 100 if total > 0 else 0
-        src_tag = "OKX" if book_src == "okx" else "Kraken"
-        indicadores["Order Book Imbalance"] = f"OBI={obi:+.1f}% [{src_tag}]"
-        if obi > 15:
-            señales["Order Book Imbalance"] = ("alcista", f"Presión compradora {obi:+.0f}% [{src_tag}]")
-            puntuaciones["Order Book Imbalance"] = min(1.0, obi / 30)
-        elif obi < -15:
-            señales["Order Book Imbalance"] = ("bajista", f"Presión vendedora {obi:+.0f}% [{src_tag}]")
-            puntuaciones["Order Book Imbalance"] = max(-1.0, obi / 30)
-        else:
-            señales["Order Book Imbalance"] = ("neutro", f"Equilibrado {obi:+.0f}% [{src_tag}]")
-            puntuaciones["Order Book Imbalance"] = obi / 100
-    else:
-        indicadores["Order Book Imbalance"] = "N/A"
-        señales["Order Book Imbalance"] = ("neutro", "Sin datos")
-        puntuaciones["Order Book Imbalance"] = 0.0
-
-    # ── 14. Bid/Ask Spread ──
-    if book and book.get("bids") and book.get("asks"):
-        best_bid = float(book["bids"][0][0])
-        best_ask = float(book["asks"][0][0])
-        spread   = (best_ask - best_bid) / best_bid * 100
-        indicadores["Bid/Ask Spread"] = f"{spread:.4f}%"
-        if spread < 0.01:
-            señales["Bid/Ask Spread"] = ("alcista_leve", f"Spread ajustado ({spread:.4f}%)")
-            puntuaciones["Bid/Ask Spread"] = 0.2
-        elif spread > 0.05:
-            señales["Bid/Ask Spread"] = ("bajista_leve", f"Spread amplio ({spread:.4f}%)")
-            puntuaciones["Bid/Ask Spread"] = -0.3
-        else:
-            señales["Bid/Ask Spread"] = ("neutro", f"Spread normal ({spread:.4f}%)")
-            puntuaciones["Bid/Ask Spread"] = 0.0
-    else:
-        indicadores["Bid/Ask Spread"] = "N/A"
-        señales["Bid/Ask Spread"] = ("neutro", "Sin datos")
-        puntuaciones["Bid/Ask Spread"] = 0.0
-
-    # ── 15. Buy/Sell Ratio — REAL de OKX si disponible ──
-    okx_trades_data = futures_data.get("okx_trades")
+    return patron, (tipo_v, patron), p_score
+
+
+# ── 13. Order Book Imbalance (OKX + Kraken consolidado) — ponderado por distancia ──
+@registrar_indicador("Order Book Imbalance", entradas=("book",), intermedios=("libro",))
+def _ind_obi(ctx):
+    libro   = _intermedio(ctx, "libro")
+    obi     = imbalance_ponderado(libro)
+    fuente  = libro.fuente or ctx["futures"].get("book_source", "kraken")
+    src_tag = "+".join("OKX" if f == "okx" else "Kraken" for f in fuente.split("+"))
+    valor   = f"OBI={obi:+.1f}% [{src_tag}]"
+    if obi > 15:
+        return valor, ("alcista", f"Presión compradora {obi:+.0f}% [{src_tag}]"), min(1.0, obi / 30)
+    elif obi < -15:
+        return valor, ("bajista", f"Presión vendedora {obi:+.0f}% [{src_tag}]"), max(-1.0, obi / 30)
+    return valor, ("neutro", f"Equilibrado {obi:+.0f}% [{src_tag}]"), obi / 100
+
+
+# ── 14. Bid/Ask Spread ──
+@registrar_indicador("Bid/Ask Spread", entradas=("book",))
+def _ind_spread(ctx):
+    book     = ctx["book"]
+    best_bid = float(book["bids"][0][0])
+    best_ask = float(book["asks"][0][0])
+    spread   = (best_ask - best_bid) / best_bid * 100
+    valor    = f"{spread:.4f}%"
+    if spread < 0.01:
+        return valor, ("alcista_leve", f"Spread ajustado ({spread:.4f}%)"), 0.2
+    elif spread > 0.05:
+        return valor, ("bajista_leve", f"Spread amplio ({spread:.4f}%)"), -0.3
+    return valor, ("neutro", f"Spread normal ({spread:.4f}%)"), 0.0
+
+
+# ── 14b. Muros de Liquidez — profundidad a 25 pb y muro más cercano ──
+@registrar_indicador("Muros de Liquidez", entradas=("book",), intermedios=("libro",))
+def _ind_muros(ctx):
+    libro = _intermedio(ctx, "libro")
+    prof  = curva_profundidad(libro, (25,))
+    bid, ask = float(prof["bid"][0]), float(prof["ask"][0])
+    muros = muros_liquidez(libro)
+    valor = f"±25pb ${bid:,.0f} / ${ask:,.0f}"
+    soporte     = muros["bid"][0] if muros["bid"] else None
+    resistencia = muros["ask"][0] if muros["ask"] else None
+    if soporte and (not resistencia or soporte[2] < resistencia[2]):
+        return valor, ("alcista_leve",
+                       f"Soporte ${soporte[0]:,.4f} (×{soporte[3]:.0f}, {soporte[2]:.0f}pb)"), 0.5
+    if resistencia:
+        return valor, ("bajista_leve",
+                       f"Resistencia ${resistencia[0]:,.4f} (×{resistencia[3]:.0f}, "
+                       f"{resistencia[2]:.0f}pb)"), -0.5
+    asim = (bid - ask) / (bid + ask) if bid + ask > 0 else 0.0
+    return valor, ("neutro", f"Sin muros · asimetría {asim * 100:+.0f}%"), asim * 0.5
+
+
+# ── 15. Buy/Sell Ratio — REAL de OKX si disponible ──
+@registrar_indicador("Buy/Sell Ratio", lookback=1)
+def _ind_buy_sell(ctx):
+    df = ctx["df"]
+    okx_trades_data = ctx["futures"].get("okx_trades")
     if okx_trades_data:
         bs_ratio = okx_trades_data["buy_ratio"]
         n_trades = okx_trades_data["n_trades"]
-        indicadores["Buy/Sell Ratio"] = f"{bs_ratio:.1f}% buy (OKX {n_trades}t)"
-        src_bs = "OKX real"
+        valor    = f"{bs_ratio:.1f}% buy (OKX {n_trades}t)"
+        src_bs   = "OKX real"
     else:
         taker_buy  = df["taker_buy_quote"].tail(10).sum()
         taker_sell = (df["quote_volume"] - df["taker_buy_quote"]).tail(10).sum()
         total_t    = taker_buy + taker_sell
         bs_ratio   = taker_buy / total_t * 100 if total_t > 0 else 50
-        indicadores["Buy/Sell Ratio"] = f"{bs_ratio:.1f}% buy (Kraken est.)"
-        src_bs = "Kraken estimado"
+        valor      = f"{bs_ratio:.1f}% buy (Kraken est.)"
+        src_bs     = "Kraken estimado"
 
     if bs_ratio > 60:
-        señales["Buy/Sell Ratio"] = ("alcista", f"Compradores dominan {bs_ratio:.0f}% [{src_bs}]")
-        puntuaciones["Buy/Sell Ratio"] = min(1.0, (bs_ratio - 50) / 25)
+        return (valor, ("alcista", f"Compradores dominan {bs_ratio:.0f}% [{src_bs}]"),
+                min(1.0, (bs_ratio - 50) / 25))
     elif bs_ratio < 40:
-        señales["Buy/Sell Ratio"] = ("bajista", f"Vendedores dominan {bs_ratio:.0f}% [{src_bs}]")
-        puntuaciones["Buy/Sell Ratio"] = max(-1.0, (bs_ratio - 50) / 25)
-    else:
-        señales["Buy/Sell Ratio"] = ("neutro", f"Equilibrio {bs_ratio:.0f}% [{src_bs}]")
-        puntuaciones["Buy/Sell Ratio"] = (bs_ratio - 50) / 50
-
-    # ── 16. Actividad Trades ──
-    trades_pm  = df["trades"].tail(5).mean()
-    trades_max = df["trades"].max()
+        return (valor, ("bajista", f"Vendedores dominan {bs_ratio:.0f}% [{src_bs}]"),
+                max(-1.0, (bs_ratio - 50) / 25))
+    return (valor, ("neutro", f"Equilibrio {bs_ratio:.0f}% [{src_bs}]"),
+            (bs_ratio - 50) / 50)
+
+
+# ── 16. Actividad Trades ──
+@registrar_indicador("Actividad Trades", lookback=5, intermedios=("cambio_5m",))
+def _ind_actividad(ctx):
+    trades     = ctx["df"]["trades"]
+    trades_pm  = trades.tail(5).mean()
+    trades_max = trades.max()
     trades_pct = trades_pm / trades_max * 100 if trades_max > 0 else 50
-    indicadores["Actividad Trades"] = f"{trades_pm:.0f} t/min (media 5m)"
+    valor = f"{trades_pm:.0f} t/min (media 5m)"
     if trades_pct > 70:
-        cambio_5m = (close.iloc[-1] / close.iloc[-6] - 1) * 100 if len(close) >= 6 else 0
-        if cambio_5m > 0:
-            señales["Actividad Trades"] = ("alcista", f"Alta actividad subida ({trades_pct:.0f}%)")
-            puntuaciones["Actividad Trades"] = 0.7
-        else:
-            señales["Actividad Trades"] = ("bajista", f"Alta actividad bajada ({trades_pct:.0f}%)")
-            puntuaciones["Actividad Trades"] = -0.7
-    else:
-        señales["Actividad Trades"] = ("neutro", f"Actividad normal ({trades_pct:.0f}%)")
-        puntuaciones["Actividad Trades"] = 0.0
-
-    # ── 17. Funding Rate — OKX real ──
-    fr = futures_data.get("funding_rate")
-    if fr is not None:
-        fr_pct = fr * 100
-        next_fr = futures_data.get("next_funding_rate")
-        next_txt = f" → {next_fr*100:+.4f}%" if next_fr else ""
-        indicadores["Funding Rate"] = f"{fr_pct:+.4f}%{next_txt} [OKX]"
-        if fr_pct > 0.05:
-            señales["Funding Rate"] = ("bajista_leve", f"Longs pagando alto ({fr_pct:+.4f}%)")
-            puntuaciones["Funding Rate"] = -min(1.0, fr_pct / 0.08)
-        elif fr_pct < -0.05:
-            señales["Funding Rate"] = ("alcista_leve", f"Shorts pagando ({fr_pct:+.4f}%)")
-            puntuaciones["Funding Rate"] = min(1.0, abs(fr_pct) / 0.08)
-        else:
-            señales["Funding Rate"] = ("neutro", f"FR neutro ({fr_pct:+.4f}%)")
-            puntuaciones["Funding Rate"] = 0.0
-    else:
-        indicadores["Funding Rate"] = "N/A"
-        señales["Funding Rate"] = ("neutro", "Sin datos OKX")
-        puntuaciones["Funding Rate"] = 0.0
-
-    # ── 18. Open Interest Δ — OKX real ──
-    oi_chg = futures_data.get("oi_change_pct")
-    if oi_chg is not None:
-        cambio_precio = (close.iloc[-1] / close.iloc[-6] - 1) * 100 if len(close) >= 6 else 0
-        indicadores["Open Interest Δ"] = f"{oi_chg:+.3f}% (5m) [OKX]"
-        if oi_chg > 0.5 and cambio_precio > 0:
-            señales["Open Interest Δ"] = ("alcista", "OI↑ + precio↑ → tendencia real")
-            puntuaciones["Open Interest Δ"] = 0.8
-        elif oi_chg > 0.5 and cambio_precio < 0:
-            señales["Open Interest Δ"] = ("bajista", "OI↑ + precio↓ → más shorts")
-            puntuaciones["Open Interest Δ"] = -0.8
-        elif oi_chg < -0.5 and cambio_precio > 0:
-            señales["Open Interest Δ"] = ("alcista_leve", "OI↓ + precio↑ → shorts cerrando")
-            puntuaciones["Open Interest Δ"] = 0.5
-        else:
-            señales["Open Interest Δ"] = ("neutro", f"OI sin tendencia ({oi_chg:+.3f}%)")
-            puntuaciones["Open Interest Δ"] = 0.0
-    else:
-        indicadores["Open Interest Δ"] = "N/A"
-        señales["Open Interest Δ"] = ("neutro", "Sin datos OKX")
-        puntuaciones["Open Interest Δ"] = 0.0
-
-    # ── 19. Long/Short Ratio — OKX real ──
-    lr = futures_data.get("long_ratio")
-    sr = futures_data.get("short_ratio")
-    if lr is not None and sr is not None:
-        lr_pct, sr_pct = lr * 100, sr * 100
-        indicadores["Long/Short Ratio"] = f"L={lr_pct:.1f}% / S={sr_pct:.1f}% [OKX]"
-        if lr_pct > 60:
-            señales["Long/Short Ratio"] = ("bajista_leve", f"Exceso longs ({lr_pct:.0f}%) → contrarian")
-            puntuaciones["Long/Short Ratio"] = -0.4
-        elif sr_pct > 60:
-            señales["Long/Short Ratio"] = ("alcista_leve", f"Exceso shorts ({sr_pct:.0f}%) → contrarian")
-            puntuaciones["Long/Short Ratio"] = 0.4
-        else:
-            señales["Long/Short Ratio"] = ("neutro", f"Ratio equilibrado ({lr_pct:.0f}/{sr_pct:.0f})")
-            puntuaciones["Long/Short Ratio"] = 0.0
-    else:
-        indicadores["Long/Short Ratio"] = "N/A"
-        señales["Long/Short Ratio"] = ("neutro", "Sin datos OKX")
-        puntuaciones["Long/Short Ratio"] = 0.0
-
-    # ── 20. Tendencia 5m TF ──
-    if df5 is not None and len(df5) >= 5:
-        close5  = df5["close"]
-        ema7_5  = close5.ewm(span=7).mean().iloc[-1]
-        trend5  = (close5.iloc[-1] / close5.iloc[-5] - 1) * 100
-        indicadores["Tendencia 5m TF"] = f"EMA7={ema7_5:.4f} Δ={trend5:+.3f}%"
-        if close5.iloc[-1] > ema7_5 and trend5 > 0.1:
-            señales["Tendencia 5m TF"] = ("alcista", f"5m alcista ({trend5:+.3f}%)")
-            puntuaciones["Tendencia 5m TF"] = 0.8
-        elif close5.iloc[-1] < ema7_5 and trend5 < -0.1:
-            señales["Tendencia 5m TF"] = ("bajista", f"5m bajista ({trend5:+.3f}%)")
-            puntuaciones["Tendencia 5m TF"] = -0.8
-        else:
-            señales["Tendencia 5m TF"] = ("neutro", f"5m lateral ({trend5:+.3f}%)")
-            puntuaciones["Tendencia 5m TF"] = 0.0
-    else:
-        indicadores["Tendencia 5m TF"] = "N/A"
-        señales["Tendencia 5m TF"] = ("neutro", "Sin datos")
-        puntuaciones["Tendencia 5m TF"] = 0.0
-
-    # ════════════════════════════════════════════
-    # NUEVOS INDICADORES — NIVEL 1 Y 2
-    # ════════════════════════════════════════════
-
-    # ── N1. Fear & Greed Index ──
-    fng_val = futures_data.get("fng_value")
-    fng_cls = futures_data.get("fng_class", "")
-    fng_trn = futures_data.get("fng_trend", 0)
-    if fng_val is not None:
-        indicadores["Fear & Greed"] = f"{fng_val} — {fng_cls} (Δ{fng_trn:+d})"
-        if fng_val <= 20:
-            señales["Fear & Greed"] = ("alcista", f"Miedo extremo ({fng_val}) → oportunidad")
-            puntuaciones["Fear & Greed"] = 0.8
-        elif fng_val <= 40:
-            señales["Fear & Greed"] = ("alcista_leve", f"Miedo ({fng_val}) → sesgo alcista")
-            puntuaciones["Fear & Greed"] = 0.3
-        elif fng_val >= 80:
-            señales["Fear & Greed"] = ("bajista", f"Codicia extrema ({fng_val}) → precaución")
-            puntuaciones["Fear & Greed"] = -0.8
-        elif fng_val >= 60:
-            señales["Fear & Greed"] = ("bajista_leve", f"Codicia ({fng_val}) → sesgo bajista")
-            puntuaciones["Fear & Greed"] = -0.3
-        else:
-            señales["Fear & Greed"] = ("neutro", f"Neutro ({fng_val})")
-            puntuaciones["Fear & Greed"] = 0.0
-    else:
-        indicadores["Fear & Greed"] = "N/A"
-        señales["Fear & Greed"] = ("neutro", "Sin datos")
-        puntuaciones["Fear & Greed"] = 0.0
-
-    # ── N2. Tendencia 15m TF ──
-    if df15 is not None and len(df15) >= 8:
-        c15     = df15["close"]
-        ema9_15 = c15.ewm(span=9).mean()
-        ema21_15 = c15.ewm(span=21).mean()
-        t15     = (c15.iloc[-1] / c15.iloc[-5] - 1) * 100
-        e9, e21 = ema9_15.iloc[-1], ema21_15.iloc[-1]
-        indicadores["Tendencia 15m TF"] = f"EMA9={e9:.4f} EMA21={e21:.4f} Δ={t15:+.3f}%"
-        if c15.iloc[-1] > e9 > e21 and t15 > 0.15:
-            señales["Tendencia 15m TF"] = ("alcista", f"15m alcista fuerte ({t15:+.3f}%)")
-            puntuaciones["Tendencia 15m TF"] = 1.0
-        elif c15.iloc[-1] > e9 and t15 > 0:
-            señales["Tendencia 15m TF"] = ("alcista_leve", f"15m alcista ({t15:+.3f}%)")
-            puntuaciones["Tendencia 15m TF"] = 0.5
-        elif c15.iloc[-1] < e9 < e21 and t15 < -0.15:
-            señales["Tendencia 15m TF"] = ("bajista", f"15m bajista fuerte ({t15:+.3f}%)")
-            puntuaciones["Tendencia 15m TF"] = -1.0
-        elif c15.iloc[-1] < e9 and t15 < 0:
-            señales["Tendencia 15m TF"] = ("bajista_leve", f"15m bajista ({t15:+.3f}%)")
-            puntuaciones["Tendencia 15m TF"] = -0.5
-        else:
-            señales["Tendencia 15m TF"] = ("neutro", f"15m lateral ({t15:+.3f}%)")
-            puntuaciones["Tendencia 15m TF"] = 0.0
-    else:
-        indicadores["Tendencia 15m TF"] = "N/A"
-        señales["Tendencia 15m TF"] = ("neutro", "Sin datos")
-        puntuaciones["Tendencia 15m TF"] = 0.0
-
-    # ── N3. Tendencia 1h TF ──
-    if df1h is not None and len(df1h) >= 8:
-        c1h     = df1h["close"]
-        ema9_1h = c1h.ewm(span=9).mean()
-        ema21_1h = c1h.ewm(span=21).mean()
-        t1h     = (c1h.iloc[-1] / c1h.iloc[-4] - 1) * 100
-        e9h, e21h = ema9_1h.iloc[-1], ema21_1h.iloc[-1]
-        indicadores["Tendencia 1h TF"] = f"EMA9={e9h:.4f} EMA21={e21h:.4f} Δ={t1h:+.3f}%"
-        if c1h.iloc[-1] > e9h > e21h and t1h > 0.3:
-            señales["Tendencia 1h TF"] = ("alcista", f"1h alcista fuerte ({t1h:+.3f}%)")
-            puntuaciones["Tendencia 1h TF"] = 1.0
-        elif c1h.iloc[-1] > e9h and t1h > 0:
-            señales["Tendencia 1h TF"] = ("alcista_leve", f"1h alcista ({t1h:+.3f}%)")
-            puntuaciones["Tendencia 1h TF"] = 0.5
-        elif c1h.iloc[-1] < e9h < e21h and t1h < -0.3:
-            señales["Tendencia 1h TF"] = ("bajista", f"1h bajista fuerte ({t1h:+.3f}%)")
-            puntuaciones["Tendencia 1h TF"] = -1.0
-        elif c1h.iloc[-1] < e9h and t1h < 0:
-            señales["Tendencia 1h TF"] = ("bajista_leve", f"1h bajista ({t1h:+.3f}%)")
-            puntuaciones["Tendencia 1h TF"] = -0.5
-        else:
-            señales["Tendencia 1h TF"] = ("neutro", f"1h lateral ({t1h:+.3f}%)")
-            puntuaciones["Tendencia 1h TF"] = 0.0
-    else:
-        indicadores["Tendencia 1h TF"] = "N/A"
-        señales["Tendencia 1h TF"] = ("neutro", "Sin datos")
-        puntuaciones["Tendencia 1h TF"] = 0.0
+        if _intermedio(ctx, "cambio_5m") > 0:
+            return valor, ("alcista", f"Alta actividad subida ({trades_pct:.0f}%)"), 0.7
+        return valor, ("bajista", f"Alta actividad bajada ({trades_pct:.0f}%)"), -0.7
+    return valor, ("neutro", f"Actividad normal ({trades_pct:.0f}%)"), 0.0
+
+
+def _ventanas_txt(cambios: dict, z=None) -> str:
+    """Sufijo ' · Δ1h +0.42% Δ24h -3.10% z+1.2' con lo que haya en el historial."""
+    partes = [f"Δ{k} {v:+.2f}%" for k, v in (cambios or {}).items()
+              if k != "5m" and v is not None]
+    if z is not None:
+        partes.append(f"z{z:+.1f}")
+    return " · " + " ".join(partes) if partes else ""
+
+
+# ── 17. Funding Rate — OKX real ──
+@registrar_indicador("Funding Rate", entradas=("funding_rate",),
+                     na=("N/A", "Sin datos OKX"))
+def _ind_funding(ctx):
+    fr_pct   = ctx["futures"]["funding_rate"] * 100
+    next_fr  = ctx["futures"].get("next_funding_rate")
+    next_txt = f" → {next_fr*100:+.4f}%" if next_fr else ""
+    deriv    = ctx["futures"].get("derivados") or {}
+    valor    = f"{fr_pct:+.4f}%{next_txt} [OKX]{_ventanas_txt(None, deriv.get('funding_z'))}"
+    if fr_pct > 0.05:
+        return valor, ("bajista_leve", f"Longs pagando alto ({fr_pct:+.4f}%)"), -min(1.0, fr_pct / 0.08)
+    elif fr_pct < -0.05:
+        return valor, ("alcista_leve", f"Shorts pagando ({fr_pct:+.4f}%)"), min(1.0, abs(fr_pct) / 0.08)
+    return valor, ("neutro", f"FR neutro ({fr_pct:+.4f}%)"), 0.0
+
+
+# ── 18. Open Interest Δ — OKX real ──
+@registrar_indicador("Open Interest Δ", entradas=("oi_change_pct",),
+                     intermedios=("cambio_5m",), na=("N/A", "Sin datos OKX"))
+def _ind_oi(ctx):
+    oi_chg        = ctx["futures"]["oi_change_pct"]
+    cambio_precio = _intermedio(ctx, "cambio_5m")
+    deriv = ctx["futures"].get("derivados") or {}
+    valor = f"{oi_chg:+.3f}% (5m) [OKX]{_ventanas_txt(deriv.get('oi'), deriv.get('oi_z'))}"
+    if oi_chg > 0.5 and cambio_precio > 0:
+        return valor, ("alcista", "OI↑ + precio↑ → tendencia real"), 0.8
+    elif oi_chg > 0.5 and cambio_precio < 0:
+        return valor, ("bajista", "OI↑ + precio↓ → más shorts"), -0.8
+    elif oi_chg < -0.5 and cambio_precio > 0:
+        return valor, ("alcista_leve", "OI↓ + precio↑ → shorts cerrando"), 0.5
+    return valor, ("neutro", f"OI sin tendencia ({oi_chg:+.3f}%)"), 0.0
+
+
+# ── 19. Long/Short Ratio — OKX real ──
+@registrar_indicador("Long/Short Ratio", entradas=("long_ratio", "short_ratio"),
+                     na=("N/A", "Sin datos OKX"))
+def _ind_long_short(ctx):
+    lr_pct = ctx["futures"]["long_ratio"] * 100
+    sr_pct = ctx["futures"]["short_ratio"] * 100
+    deriv  = ctx["futures"].get("derivados") or {}
+    valor  = f"L={lr_pct:.1f}% / S={sr_pct:.1f}% [OKX]{_ventanas_txt(deriv.get('ls'), deriv.get('ls_z'))}"
+    if lr_pct > 60:
+        return valor, ("bajista_leve", f"Exceso longs ({lr_pct:.0f}%) → contrarian"), -0.4
+    elif sr_pct > 60:
+        return valor, ("alcista_leve", f"Exceso shorts ({sr_pct:.0f}%) → contrarian"), 0.4
+    return valor, ("neutro", f"Ratio equilibrado ({lr_pct:.0f}/{sr_pct:.0f})"), 0.0
+
+
+# ── 20. Tendencia 5m TF ──
+@registrar_indicador("Tendencia 5m TF", entradas=("df5",), lookback=5)
+def _ind_tendencia_5m(ctx):
+    close5  = ctx["df5"]["close"]
+    ema7_5  = ctx["cache"].ewm(ctx["df5"], "close", 7).iloc[-1]
+    trend5  = (close5.iloc[-1] / close5.iloc[-5] - 1) * 100
+    valor   = f"EMA7={ema7_5:.4f} Δ={trend5:+.3f}%"
+    if close5.iloc[-1] > ema7_5 and trend5 > 0.1:
+        return valor, ("alcista", f"5m alcista ({trend5:+.3f}%)"), 0.8
+    elif close5.iloc[-1] < ema7_5 and trend5 < -0.1:
+        return valor, ("bajista", f"5m bajista ({trend5:+.3f}%)"), -0.8
+    return valor, ("neutro", f"5m lateral ({trend5:+.3f}%)"), 0.0
+
+
+# ════════════════════════════════════════════
+# NUEVOS INDICADORES — NIVEL 1 Y 2
+# ════════════════════════════════════════════
+
+# ── N1. Fear & Greed Index ──
+@registrar_indicador("Fear & Greed", entradas=("fng_value",))
+def _ind_fear_greed(ctx):
+    fng_val = ctx["futures"]["fng_value"]
+    fng_cls = ctx["futures"].get("fng_class", "")
+    fng_trn = ctx["futures"].get("fng_trend", 0)
+    valor = f"{fng_val} — {fng_cls} (Δ{fng_trn:+d})"
+    if fng_val <= 20:
+        return valor, ("alcista", f"Miedo extremo ({fng_val}) → oportunidad"), 0.8
+    elif fng_val <= 40:
+        return valor, ("alcista_leve", f"Miedo ({fng_val}) → sesgo alcista"), 0.3
+    elif fng_val >= 80:
+        return valor, ("bajista", f"Codicia extrema ({fng_val}) → precaución"), -0.8
+    elif fng_val >= 60:
+        return valor, ("bajista_leve", f"Codicia ({fng_val}) → sesgo bajista"), -0.3
+    return valor, ("neutro", f"Neutro ({fng_val})"), 0.0
+
+
+def _tendencia_tf(cache, frame, tf, n_delta, umbral):
+    """Regla común de 15m/1h: precio vs EMA9/EMA21 + Δ de las últimas velas."""
+    close_tf = frame["close"]
+    ema9  = cache.ewm(frame, "close", 9).iloc[-1]
+    ema21 = cache.ewm(frame, "close", 21).iloc[-1]
+    delta = (close_tf.iloc[-1] / close_tf.iloc[-n_delta] - 1) * 100
+    ult   = close_tf.iloc[-1]
+    valor = f"EMA9={ema9:.4f} EMA21={ema21:.4f} Δ={delta:+.3f}%"
+    if ult > ema9 > ema21 and delta > umbral:
+        return valor, ("alcista", f"{tf} alcista fuerte ({delta:+.3f}%)"), 1.0
+    elif ult > ema9 and delta > 0:
+        return valor, ("alcista_leve", f"{tf} alcista ({delta:+.3f}%)"), 0.5
+    elif ult < ema9 < ema21 and delta < -umbral:
+        return valor, ("bajista", f"{tf} bajista fuerte ({delta:+.3f}%)"), -1.0
+    elif ult < ema9 and delta < 0:
+        return valor, ("bajista_leve", f"{tf} bajista ({delta:+.3f}%)"), -0.5
+    return valor, ("neutro", f"{tf} lateral ({delta:+.3f}%)"), 0.0
+
+
+# ── N2. Tendencia 15m TF ──
+@registrar_indicador("Tendencia 15m TF", entradas=("df15",), lookback=8)
+def _ind_tendencia_15m(ctx):
+    return _tendencia_tf(ctx["cache"], ctx["df15"], "15m", 5, 0.15)
+
+
+# ── N3. Tendencia 1h TF ──
+@registrar_indicador("Tendencia 1h TF", entradas=("df1h",), lookback=8)
+def _ind_tendencia_1h(ctx):
+    return _tendencia_tf(ctx["cache"], ctx["df1h"], "1h", 4, 0.3)
+
+
+# ── N4. Hurst Exponent — régimen de mercado ──
+_REGIMEN_LABELS = {
+    "trending":       "TENDENCIA",
+    "mean_reverting": "REVERSIÓN",
+    "noise":          "RUIDO/LATERAL",
+}
+_REGIMEN_COLORS = {
+    "trending":       "alcista_leve",
+    "mean_reverting": "bajista_leve",
+    "noise":          "neutro",
+}
 
-    # ── N4. Hurst Exponent — régimen de mercado ──
+
+@registrar_indicador("Hurst / Régimen", lookback=1, contexto=("regimen", "hurst"))
+def _ind_hurst(ctx):
+    close = ctx["close"]
     h_val = hurst_exponent(close, max_lag=min(20, len(close) // 4))
     regimen = clasificar_regimen(h_val)
-    regimen_labels = {
-        "trending":       "TENDENCIA",
-        "mean_reverting": "REVERSIÓN",
-        "noise":          "RUIDO/LATERAL",
-    }
-    regimen_colors = {
-        "trending":       "alcista_leve",
-        "mean_reverting": "bajista_leve",
-        "noise":          "neutro",
+    ctx["hurst"], ctx["regimen"] = h_val, regimen
+    # solo contexto, no puntúa directamente
+    return (f"H={h_val:.3f} → {_REGIMEN_LABELS[regimen]}",
+            (_REGIMEN_COLORS[regimen], f"H={h_val:.3f}: mercado en {_REGIMEN_LABELS[regimen]}"),
+            0.0)
+
+
+# ── N5. Divergencia de precio multi-exchange ──
+@registrar_indicador("Divergencia Exchange", entradas=("price_diverge",),
+                     na=("N/A (OKX no disponible)", "Sin datos OKX"))
+def _ind_divergencia(ctx):
+    # Con el motor multi-venue: desviación de Kraken frente a la mediana de
+    # venues y su z-score móvil (una base USD/USDT persistente no cuenta)
+    div = ctx["futures"].get("divergencia")
+    krk = div["venues"].get("kraken") if div else None
+    if krk and krk["z"] is not None:
+        z     = krk["z"]
+        valor = f"Kraken vs {len(div['venues'])} venues: {krk['bps']:+.1f}pb (z={z:+.1f})"
+        if z > 2:
+            return valor, ("bajista_leve", f"Kraken caro vs mercado (z={z:+.1f}) → posible corrección"), -0.3
+        if z < -2:
+            return valor, ("alcista_leve", f"Kraken barato vs mercado (z={z:+.1f}) → posible rebote"), 0.3
+        return valor, ("neutro", f"Precios alineados (z={z:+.1f})"), 0.0
+
+    price_div = ctx["futures"]["price_diverge"]
+    okx_p = ctx["info"].get("okx_price", 0)
+    valor = f"Kraken vs OKX: {price_div:+.4f}% (OKX=${okx_p:,.4f})"
+    if abs(price_div) > 0.05:
+        # Precio de Kraken por encima de OKX → probablemente corrija a la baja
+        if price_div > 0.05:
+            return valor, ("bajista_leve", f"Kraken {price_div:+.4f}% sobre OKX → posible corrección"), -0.3
+        return valor, ("alcista_leve", f"Kraken {price_div:+.4f}% bajo OKX → posible rebote"), 0.3
+    return valor, ("neutro", f"Precios alineados ({price_div:+.4f}%)"), 0.0
+
+
+# ── N6. Liderazgo BTC — correlación y beta frente a BTC (altcoins) ──
+@registrar_indicador("Liderazgo BTC", entradas=("btc_lead",),
+                     na=("N/A (BTC o sin matriz)", "Sin datos de correlación BTC"))
+def _ind_liderazgo_btc(ctx):
+    # Si el par sigue a BTC con una vela de retraso, el último movimiento
+    # de BTC anticipa el suyo; el peso crece con esa correlación adelantada
+    c = ctx["futures"]["btc_lead"]
+    btc, lag = c["ref_1m"], c["corr_lag"]
+    valor = f"ρ={c['corr']:+.2f} β={c['beta']:.2f} ρ(t−1)={lag:+.2f} · BTC 1m {btc:+.3f}%"
+    if lag > 0.15 and abs(btc) > 0.05:
+        punt = float(np.clip(btc / 0.3, -1, 1)) * min(1.0, lag / 0.4)
+        tipo = "alcista" if punt > 0.5 else "alcista_leve" if punt > 0 else \
+               "bajista" if punt < -0.5 else "bajista_leve"
+        return valor, (tipo, f"BTC lidera (ρ={lag:+.2f}) y se movió {btc:+.3f}%"), punt
+    if c["corr"] > 0.7:
+        return valor, ("neutro", f"Muy ligado a BTC (β={c['beta']:.2f}), sin impulso previo"), 0.0
+    return valor, ("neutro", f"BTC no anticipa este par (ρ(t−1)={lag:+.2f})"), 0.0
+
+
+# ─────────────────────────────────────────────
+# MOTOR — ejecuta el plan del perfil pedido
+# ─────────────────────────────────────────────
+@medido("indicadores")
+def calcular_indicadores(df, df5, book, futures_data, info,
+                         df15=None, df1h=None, perfil: str = "full",
+                         cache: CacheIntermedios = None):
+    """
+    Evalúa los indicadores del perfil ("full" | "scan") con los datos
+    disponibles. En "full" los que no tienen entradas salen como N/A
+    (puntuación 0); en "scan" se omiten, igual que los que no puntúan.
+    Si se pasa `cache`, las series intermedias quedan disponibles para
+    reutilizarlas después (gráficos) sin recalcularlas.
+    Devuelve (indicadores, señales, puntuaciones, atr_pct, regimen, hurst).
+    """
+    indicadores  = {}
+    señales      = {}
+    puntuaciones = {}
+
+    futures_data = futures_data or {}
+    disp = datos_disponibles(df, df5, book, futures_data, df15, df1h)
+    plan = plan_evaluacion(salidas_perfil(perfil), disp, incluir_na=perfil != "scan")
+
+    ctx = {
+        "df": df, "df5": df5, "df15": df15, "df1h": df1h,
+        "book": book, "futures": futures_data, "info": info,
+        "precio": info["precio_actual"],
+        "close": df["close"], "high": df["high"],
+        "low": df["low"], "volume": df["volume"],
+        "cache": cache if cache is not None else CacheIntermedios(),
     }
-    indicadores["Hurst / Régimen"] = f"H={h_val:.3f} → {regimen_labels[regimen]}"
-    señales["Hurst / Régimen"] = (regimen_colors[regimen],
-                                   f"H={h_val:.3f}: mercado en {regimen_labels[regimen]}")
-    puntuaciones["Hurst / Régimen"] = 0.0  # solo contexto, no puntúa directamente
-
-    # ── N5. Divergencia de precio multi-exchange ──
-    price_div = futures_data.get("price_diverge")
-    if price_div is not None:
-        okx_p = info.get("okx_price", 0)
-        indicadores["Divergencia Exchange"] = (
-            f"Kraken vs OKX: {price_div:+.4f}% "
-            f"(OKX=${okx_p:,.4f})"
-        )
-        if abs(price_div) > 0.05:
-            # Precio de Kraken por encima de OKX → probablemente corrija a la baja
-            if price_div > 0.05:
-                señales["Divergencia Exchange"] = ("bajista_leve",
-                    f"Kraken {price_div:+.4f}% sobre OKX → posible corrección")
-                puntuaciones["Divergencia Exchange"] = -0.3
-            else:
-                señales["Divergencia Exchange"] = ("alcista_leve",
-                    f"Kraken {price_div:+.4f}% bajo OKX → posible rebote")
-                puntuaciones["Divergencia Exchange"] = 0.3
+
+    calcular, na = set(plan["calcular"]), set(plan["na"])
+    for nombre, spec in _INDICADORES.items():
+        if nombre in calcular:
+            with tramo(f"indicador.{nombre}"):
+                valor, señal, punt = spec["fn"](ctx)
+        elif nombre in na:
+            valor, texto = spec["na"]
+            señal, punt  = ("neutro", texto), 0.0
         else:
-            señales["Divergencia Exchange"] = ("neutro",
-                f"Precios alineados ({price_div:+.4f}%)")
-            puntuaciones["Divergencia Exchange"] = 0.0
-    else:
-        indicadores["Divergencia Exchange"] = "N/A (OKX no disponible)"
-        señales["Divergencia Exchange"] = ("neutro", "Sin datos OKX")
-        puntuaciones["Divergencia Exchange"] = 0.0
+            continue
+        indicadores[nombre]  = valor
+        señales[nombre]      = señal
+        puntuaciones[nombre] = punt
 
-    return indicadores, señales, puntuaciones, atr_pct, regimen, h_val
+    return (indicadores, señales, puntuaciones,
+            ctx.get("atr_pct", 0.0), ctx.get("regimen", "noise"), ctx.get("hurst", 0.5))
 
 
 # ─────────────────────────────────────────────
@@ -1054,6 +1814,7 @@ PESOS_BASE = PESOS_CRYPTO = {
     "Patrón Vela 1m":       0.7,
     "Order Book Imbalance": 2.0,
     "Bid/Ask Spread":       0.5,
+    "Muros de Liquidez":    0.8,
     "Buy/Sell Ratio":       2.0,
     "Actividad Trades":     0.8,
     "Funding Rate":         1.0,
@@ -1066,8 +1827,21 @@ PESOS_BASE = PESOS_CRYPTO = {
     "Tendencia 1h TF":      2.0,
     "Hurst / Régimen":      0.0,   # informativo
     "Divergencia Exchange": 0.8,
+    "Liderazgo BTC":        1.0,
 }
 
+# Indicadores que no existen para todos los símbolos o perfiles (el scan no
+# tiene book; BTC y los pares fuera del scanner no tienen lectura frente a
+# BTC): su peso solo entra en el total cuando se han podido calcular, para
+# no diluir la puntuación del resto.
+_PESO_SI_APLICA = ("Muros de Liquidez", "Liderazgo BTC")
+
+
+def _peso_total(pesos: dict, aplican) -> float:
+    """Suma de pesos positivos, sin los de _PESO_SI_APLICA que no están en `aplican`."""
+    return sum(w for k, w in pesos.items()
+               if w > 0 and (k not in _PESO_SI_APLICA or k in aplican))
+
 # Pesos por régimen — amplificadores sobre PESOS_BASE
 _REGIME_MULT = {
     # En tendencia: momentum y continuación tienen más peso
@@ -1110,10 +1884,10 @@ BLOQUES_CRYPTO = {
     "📦 Volumen y Flujo":      ["OBV", "Volumen Relativo", "Buy/Sell Ratio",
                                 "Actividad Trades"],
     "🏦 Microestructura":      ["Order Book Imbalance", "Bid/Ask Spread",
-                                "Divergencia Exchange"],
+                                "Muros de Liquidez", "Divergencia Exchange"],
     "🔮 Futuros / Derivados":  ["Funding Rate", "Open Interest Δ", "Long/Short Ratio"],
     "🌐 Contexto Multi-TF":    ["Tendencia 5m TF", "Tendencia 15m TF",
-                                "Tendencia 1h TF", "Hurst / Régimen"],
+                                "Tendencia 1h TF", "Hurst / Régimen", "Liderazgo BTC"],
     "🧠 Sentimiento Macro":    ["Fear & Greed"],
 }
 
@@ -1121,6 +1895,7 @@ BLOQUES_CRYPTO = {
 # ─────────────────────────────────────────────
 # PREDICCIÓN — CON MODULADORES
 # ─────────────────────────────────────────────
+@medido("prediccion")
 def calcular_prediccion(puntuaciones, precio_actual, indicadores,
                         regimen: str = "noise", fng_data: dict = None):
     # ATR
@@ -1142,7 +1917,9 @@ def calcular_prediccion(puntuaciones, precio_actual, indicadores,
         puntuaciones.get(k, 0) * pesos_efectivos.get(k, 1.0)
         for k in puntuaciones
     )
-    peso_total = sum(v for v in pesos_efectivos.values() if v > 0)
+    aplican    = [k for k in _PESO_SI_APLICA
+                  if k in indicadores and indicadores[k] != _INDICADORES[k]["na"][0]]
+    peso_total = _peso_total(pesos_efectivos, aplican)
     score_norm = max(-1.0, min(1.0, score_pond / peso_total)) if peso_total else 0
 
     # ── Consenso — penalizar cuando los indicadores se contradicen ──
@@ -1264,6 +2041,235 @@ def calcular_prediccion(puntuaciones, precio_actual, indicadores,
     }
 
 
+# ─────────────────────────────────────────────
+# MOTOR VECTORIZADO — score 1m de muchos símbolos a la vez
+# Mismas reglas que el perfil "scan" de calcular_indicadores +
+# calcular_prediccion, pero sobre matrices (símbolos × velas).
+# ─────────────────────────────────────────────
+_PESOS_EWM = {}
+
+
+def _ewm_matriz(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    EWM (adjust=True, como pandas) de cada fila de x en una sola
+    multiplicación por una matriz triangular de pesos cacheada por (n, span).
+    """
+    n = x.shape[1]
+    clave = (n, span)
+    if clave not in _PESOS_EWM:
+        alfa  = 2 / (span + 1)
+        expo  = np.arange(n)[:, None] - np.arange(n)[None, :]
+        w     = np.where(expo >= 0, (1 - alfa) ** np.maximum(expo, 0), 0.0)
+        _PESOS_EWM[clave] = (w / w.sum(axis=1, keepdims=True)).T
+    return x @ _PESOS_EWM[clave]
+
+
+def _umbral(condiciones, valores, defecto=0.0):
+    """np.select (gana la primera condición cierta) con np.where encadenados: sin su coste fijo."""
+    res = np.where(condiciones[-1], valores[-1], defecto)
+    for cond, val in zip(condiciones[-2::-1], valores[-2::-1]):
+        res = np.where(cond, val, res)
+    return res.astype(float)
+
+
+def matrices_velas(velas: dict, n_velas: int = 60):
+    """
+    Alinea {symbol: df OHLC 1m} en matrices de las últimas `n_velas` velas.
+    Los símbolos con menos velas se descartan. Devuelve (symbols, dict de
+    matrices open/high/low/close/volume/count).
+    """
+    symbols = [s for s, df in velas.items() if df is not None and len(df) >= n_velas]
+    cols = {}
+    for col in ("open", "high", "low", "close", "volume", "count"):
+        cols[col] = (np.vstack([velas[s][col].values[-n_velas:].astype(float)
+                                for s in symbols])
+                     if symbols else np.empty((0, n_velas)))
+    return symbols, cols
+
+
+def puntuar_matrices(m: dict) -> dict:
+    """
+    Puntuaciones de los indicadores 1m + régimen + predicción para cada
+    fila de las matrices de matrices_velas. Devuelve arrays por símbolo:
+    "puntuaciones" {indicador: array}, "score", "prob_subida", "regimen",
+    "hurst".
+    """
+    o, h, l, c, v, cnt = (m["open"], m["high"], m["low"],
+                          m["close"], m["volume"], m["count"])
+    filas, n = c.shape
+    precio = c[:, -1]
+    p = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # RSI (9)
+        delta = np.diff(c, axis=1)[:, -9:]
+        rsi = 100 - 100 / (1 + np.clip(delta, 0, None).mean(axis=1)
+                           / (-np.clip(delta, None, 0)).mean(axis=1))
+        p["RSI (9)"] = _umbral([rsi < 30, rsi > 70, rsi < 45, rsi > 55],
+                               [1.0, -1.0, 0.4, -0.4])
+
+        # MACD (5,13,3)
+        macd_l = _ewm_matriz(c, 5) - _ewm_matriz(c, 13)
+        hist   = macd_l - _ewm_matriz(macd_l, 3)
+        hv, hp = hist[:, -1], hist[:, -2]
+        p["MACD (5,13,3)"] = _umbral(
+            [(hv > 0) & (hv > hp), (hv > 0) & (hv <= hp),
+             (hv < 0) & (hv < hp), (hv < 0) & (hv >= hp)],
+            [1.0, 0.3, -1.0, -0.3])
+
+        # EMA 7/25
+        e7, e25 = _ewm_matriz(c, 7)[:, -1], _ewm_matriz(c, 25)[:, -1]
+        p["EMA 7/25"] = _umbral(
+            [(e7 > e25) & (precio > e7), e7 > e25,
+             (e7 < e25) & (precio < e7), e7 < e25],
+            [1.0, 0.3, -1.0, -0.3])
+
+        # Bollinger %B
+        ult20 = c[:, -20:]
+        bb_mid, bb_std = ult20.mean(axis=1), ult20.std(axis=1, ddof=1)
+        ancho = 4 * bb_std
+        pct_b = np.where(ancho > 0, (precio - (bb_mid - 2 * bb_std)) / ancho * 100, 50)
+        p["Bollinger %B"] = _umbral([pct_b < 5, pct_b > 95, pct_b < 35, pct_b > 65],
+                                    [1.0, -1.0, 0.4, -0.4])
+
+        # Stochastic (5,3): %K crudo de las 5 últimas velas → K y D
+        vl = np.lib.stride_tricks.sliding_window_view(l[:, -9:], 5, axis=1).min(axis=2)
+        vh = np.lib.stride_tricks.sliding_window_view(h[:, -9:], 5, axis=1).max(axis=2)
+        crudo = (c[:, -5:] - vl) / (vh - vl) * 100
+        k3 = np.lib.stride_tricks.sliding_window_view(crudo, 3, axis=1).mean(axis=2)
+        k, d = k3[:, -1], k3.mean(axis=1)
+        p["Stochastic (5,3)"] = _umbral(
+            [(k < 20) & (d < 20), (k > 80) & (d > 80),
+             (k > d) & (k < 50), (k < d) & (k > 50)],
+            [1.0, -1.0, 0.5, -0.5])
+
+        # Williams %R
+        hh, ll = h[:, -14:].max(axis=1), l[:, -14:].min(axis=1)
+        wr = (hh - precio) / (hh - ll) * -100
+        p["Williams %R"] = _umbral([wr < -80, wr > -20], [1.0, -1.0])
+
+        # Rate of Change
+        roc5 = (precio / c[:, -6] - 1) * 100
+        roc3 = (precio / c[:, -4] - 1) * 100
+        p["Rate of Change"] = _umbral(
+            [(roc5 > 0.15) & (roc3 > 0), (roc5 < -0.15) & (roc3 < 0)],
+            [np.minimum(1.0, roc5 / 0.3), np.maximum(-1.0, roc5 / 0.3)])
+
+        # OBV
+        obv = np.concatenate([np.zeros((filas, 1)),
+                              np.cumsum(np.sign(np.diff(c, axis=1)) * v[:, 1:], axis=1)],
+                             axis=1)
+        obv_ema   = _ewm_matriz(obv, 10)[:, -1]
+        obv_trend = obv[:, -1] - obv[:, -5]
+        p["OBV"] = _umbral(
+            [(obv[:, -1] > obv_ema) & (obv_trend > 0),
+             (obv[:, -1] < obv_ema) & (obv_trend < 0)],
+            [1.0, -1.0])
+
+        # VWAP Desviación
+        vwap = (c * v).sum(axis=1) / v.sum(axis=1)
+        vwap_dev = (precio - vwap) / vwap * 100
+        p["VWAP Desviación"] = _umbral([vwap_dev > 0.1, vwap_dev < -0.1], [-0.5, 0.5])
+
+        # Volumen Relativo (con filtro de wash trading)
+        vol_ma    = v[:, -20:].mean(axis=1)
+        vol_ratio = np.where(vol_ma > 0, v[:, -1] / vol_ma, 1)
+        cambio_1m = (precio - c[:, -2]) / c[:, -2] * 100
+        vol_z     = (v - v.mean(axis=1, keepdims=True)) / v.std(axis=1, ddof=1, keepdims=True)
+        body_pct  = np.abs(c - o) / c * 100
+        wash      = ((vol_z > 2.0) & (body_pct < 0.02)).sum(axis=1) / n
+        adj = vol_ratio * (1 - wash * 0.5)
+        p["Volumen Relativo"] = _umbral(
+            [(adj > 2.0) & (cambio_1m > 0), (adj > 2.0) & (cambio_1m < 0),
+             (adj > 1.3) & (cambio_1m > 0), (adj > 1.3) & (cambio_1m < 0)],
+            [1.0, -1.0, 0.5, -0.5])
+
+        # Patrón Vela 1m
+        o1, h1, l1 = o[:, -1], h[:, -1], l[:, -1]
+        body, rng = np.abs(precio - o1), h1 - l1
+        ls_s = np.minimum(o1, precio) - l1
+        us_s = h1 - np.maximum(o1, precio)
+        p["Patrón Vela 1m"] = np.where(rng > 0, _umbral(
+            [(body > rng * 0.8) & (precio > o1), (body > rng * 0.8) & (precio < o1),
+             (ls_s > body * 2) & (us_s < body * 0.5),
+             (us_s > body * 2) & (ls_s < body * 0.5),
+             body < rng * 0.1, precio > o1],
+            [1.0, -1.0, 1.0, -1.0, 0.0, 0.5], -0.5), 0.0)
+
+        # Buy/Sell Ratio — taker estimado 60/40 según color de la vela
+        qv  = (v * c)[:, -10:]
+        tbq = np.where(c[:, -10:] >= o[:, -10:], qv * 0.6, qv * 0.4)
+        tb, ts = tbq.sum(axis=1), (qv - tbq).sum(axis=1)
+        bs = np.where(tb + ts > 0, tb / (tb + ts) * 100, 50)
+        p["Buy/Sell Ratio"] = _umbral(
+            [bs > 60, bs < 40],
+            [np.minimum(1.0, (bs - 50) / 25), np.maximum(-1.0, (bs - 50) / 25)],
+            (bs - 50) / 50)
+
+        # Actividad Trades
+        t_max = cnt.max(axis=1)
+        t_pct = np.where(t_max > 0, cnt[:, -5:].mean(axis=1) / t_max * 100, 50)
+        p["Actividad Trades"] = np.where(t_pct > 70, np.where(roc5 > 0, 0.7, -0.7), 0.0)
+
+    # Hurst / Régimen — mismo estimador que hurst_exponent, todas las filas juntas
+    max_lag = min(20, n // 4)
+    if n >= max_lag * 2 and max_lag - 2 >= 3 and filas:
+        hurst = _pendiente_loglog(_tau_lags(c, np.arange(2, max_lag)), 2)
+    else:
+        hurst = np.full(filas, 0.5)
+    regimen = np.select([hurst > 0.62, hurst < 0.40], ["trending", "mean_reverting"], "noise")
+    p["Hurst / Régimen"] = np.zeros(filas)
+
+    # ── Predicción (sin F&G ni multi-TF, como scan_rapido) ──
+    nombres = list(p)
+    punt    = np.column_stack([p[k] for k in nombres]) if filas else np.empty((0, len(nombres)))
+    score   = np.zeros(filas)
+    for reg in ("trending", "mean_reverting", "noise"):
+        sel = regimen == reg
+        if not sel.any():
+            continue
+        mults = _REGIME_MULT.get(reg, {})
+        efectivos  = {k: w * mults.get(k, 1.0) for k, w in PESOS_BASE.items()}
+        pesos      = np.array([efectivos.get(k, 1.0) for k in nombres])
+        peso_total = _peso_total(efectivos, nombres)
+        norm = np.clip(punt[sel] @ pesos / peso_total, -1.0, 1.0)
+        no_cero = punt[sel] != 0
+        n_tot   = no_cero.sum(axis=1)
+        mayoria = np.maximum((punt[sel] > 0).sum(axis=1), (punt[sel] < 0).sum(axis=1))
+        consenso = np.where(n_tot > 0,
+                            np.maximum(0.0, (mayoria / np.maximum(n_tot, 1) - 0.5) * 2), 0.0)
+        norm = np.clip(norm * (0.5 + consenso * 0.7), -1.0, 1.0)
+        regime_mod = {"trending": 1.05, "mean_reverting": 1.0, "noise": 0.92}[reg]
+        score[sel] = np.clip(norm * regime_mod, -1.0, 1.0)
+
+    prob = np.clip(50.0 + 45.0 * np.tanh(score * 2.5), 5.0, 95.0)
+    return {"puntuaciones": p, "score": score, "prob_subida": prob,
+            "regimen": regimen, "hurst": hurst}
+
+
+def puntuar_lote(velas: dict, n_velas: int = 60) -> dict:
+    """
+    Scan vectorizado de muchos símbolos: {symbol: df 1m} → {symbol: dict}
+    con el mismo formato que scan_rapido (prob_subida, color, direccion, score)
+    más "regimen". Todas las filas se puntúan en una sola pasada.
+    """
+    symbols, m = matrices_velas(velas, n_velas)
+    if not symbols:
+        return {}
+    r = puntuar_matrices(m)
+    res = {}
+    for i, sym in enumerate(symbols):
+        prob = float(r["prob_subida"][i])
+        res[sym] = {
+            "prob_subida": prob,
+            "color":       "alcista" if prob > 55 else ("bajista" if prob < 45 else "neutro"),
+            "direccion":   "↑ SUBE" if r["score"][i] > 0 else "↓ BAJA",
+            "score":       float(r["score"][i]),
+            "regimen":     str(r["regimen"][i]),
+        }
+    return res
+
+
 # ─────────────────────────────────────────────
 # SCAN RÁPIDO — score de todas las criptos
 # Solo OHLC 1m de Kraken, sin fuentes externas
@@ -1273,49 +2279,239 @@ def scan_rapido(symbol: str) -> dict:
     Descarga solo OHLC 1m y calcula score básico (sin OKX, sin F&G).
     Devuelve {"prob_subida": float, "color": str, "direccion": str}
     donde color es "alcista"|"bajista"|"neutro".
+    Puntúa con el motor vectorizado (puntuar_lote): mismas reglas que el
+    perfil "scan" de calcular_indicadores + calcular_prediccion, sin
+    construir los indicadores uno a uno.
     """
     try:
         pair, _ = normalizar_symbol(symbol)
-        df = _safe_call(_kraken_ohlc, pair, 1, 60)
+        df = _safe_call(_velas, pair, 1, 60)
         if df is None or len(df) < 20:
             return {"prob_subida": 50, "color": "neutro", "direccion": "?"}
+        with tramo("scan.puntuar"):
+            res = puntuar_lote({symbol: df}, n_velas=len(df))[symbol]
+        del res["regimen"]
+        return res
+    except Exception:
+        return {"prob_subida": 50, "color": "neutro", "direccion": "?"}
 
-        # Columnas mínimas necesarias
-        df["quote_volume"]    = df["volume"] * df["close"]
-        df["taker_buy_quote"] = df.apply(
-            lambda r: r["quote_volume"] * 0.6 if r["close"] >= r["open"]
-                      else r["quote_volume"] * 0.4, axis=1)
-        df["taker_buy_base"]  = df.apply(
-            lambda r: r["volume"] * 0.6 if r["close"] >= r["open"]
-                      else r["volume"] * 0.4, axis=1)
-        df["trades"] = df["count"]
-
-        precio = float(df["close"].iloc[-1])
-        info_min = {
-            "symbol": pair, "nombre": symbol + "/USD",
-            "precio_actual": precio, "precio_prev": float(df["close"].iloc[-2]),
-            "cambio_pct": 0.0, "vol_24h": 0.0, "high_24h": precio, "low_24h": precio,
-            "okx_price": None, "base": symbol,
-        }
-        futures_min = {}
 
-        inds, _, punts, _, reg, _ = calcular_indicadores(
-            df, None, None, futures_min, info_min, None, None)
-        pred_r = calcular_prediccion(punts, precio, inds, regimen=reg, fng_data={})
+# ─────────────────────────────────────────────
+# ANÁLISIS COMPLETO — cache compartida por todo el proceso
+# Clave (par, minuto): todas las sesiones y el auto-refresh que piden el
+# mismo símbolo dentro de la misma vela de 1m comparten un único cálculo
+# ─────────────────────────────────────────────
+class CacheLRU:
+    """
+    Cache acotada a `max_items` entradas con expulsión LRU, segura entre
+    hilos. obtener() calcula cada clave una sola vez aunque la pidan varios
+    hilos a la vez: el resto espera al primero (single-flight).
+    """
 
-        prob = pred_r["prob_subida"]
-        if prob > 55:
-            color = "alcista"
-        elif prob < 45:
-            color = "bajista"
-        else:
-            color = "neutro"
+    def __init__(self, max_items: int = 64):
+        self.max_items = max_items
+        self._datos    = OrderedDict()
+        self._lock     = threading.Lock()
+        self._en_curso = {}          # clave → Event de quien la está calculando
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def get(self, clave, defecto=None):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave]
+            self.misses += 1
+            return defecto
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def obtener(self, clave, fn, cachear=lambda v: True):
+        """Valor de `clave`; si falta lo calcula con fn() (una vez por clave)."""
+        while True:
+            with self._lock:
+                if clave in self._datos:
+                    self._datos.move_to_end(clave)
+                    self.hits += 1
+                    return self._datos[clave]
+                evento = self._en_curso.get(clave)
+                if evento is None:
+                    self.misses += 1
+                    evento = self._en_curso[clave] = threading.Event()
+                    propio = True
+                else:
+                    propio = False
+            if not propio:
+                evento.wait()
+                with self._lock:
+                    if clave in self._datos:
+                        continue
+                # El cálculo del otro hilo falló o no se cacheó: calcular aquí
+                return fn()
+            try:
+                valor = fn()
+                if cachear(valor):
+                    self.put(clave, valor)
+                return valor
+            finally:
+                with self._lock:
+                    self._en_curso.pop(clave, None)
+                evento.set()
+
+
+_CACHE_ANALISIS = CacheLRU(max_items=64)
+METRICAS.registrar_cache("analisis", _CACHE_ANALISIS)
+
+
+def _analizar_sin_cache(symbol: str) -> dict:
+    with informe() as inf:
+        res = _analizar_medido(symbol)
+    res["tiempos"] = inf.resumen()
+    return res
+
+
+def _analizar_medido(symbol: str) -> dict:
+    df, df5, book, futures_data, info, error, df15, df1h = descargar_datos(symbol)
+    res = {"df": df, "df5": df5, "book": book, "futures_data": futures_data,
+           "info": info, "error": error, "df15": df15, "df1h": df1h}
+    if error or df is None:
+        return res
+    cache = CacheIntermedios()
+    indicadores, señales, puntuaciones, atr_pct, regimen, h_val = calcular_indicadores(
+        df, df5, book, futures_data, info, df15, df1h, cache=cache)
+    pred = calcular_prediccion(puntuaciones, info["precio_actual"], indicadores,
+                               regimen=regimen, fng_data=futures_data)
+    res.update({
+        "indicadores": indicadores, "señales": señales, "puntuaciones": puntuaciones,
+        "atr_pct": atr_pct, "regimen": regimen, "hurst": h_val, "pred": pred,
+        "cache_series": cache, "ts": time.time(),
+    })
+    return res
+
+
+def analizar(symbol: str, cache: CacheLRU = None) -> dict:
+    """
+    descargar_datos + calcular_indicadores + calcular_prediccion, cacheado
+    por (par, vela de 1m en curso) en una cache compartida por el proceso.
+    Devuelve un dict con los datos, los indicadores, "pred", la
+    CacheIntermedios usada ("cache_series") para reutilizarla en gráficos
+    y el informe de tiempos por etapa del cálculo ("tiempos").
+    Los errores de descarga no se cachean. El resultado es compartido:
+    tratarlo como solo lectura.
+    """
+    cache = cache if cache is not None else _CACHE_ANALISIS
+    pair, _ = normalizar_symbol(symbol)
+    clave = (pair, int(time.time() // 60))
+    return cache.obtener(clave, lambda: _analizar_sin_cache(symbol),
+                         cachear=lambda r: r.get("error") is None)
 
-        return {
-            "prob_subida": prob,
-            "color":       color,
-            "direccion":   pred_r["direccion"],
-            "score":       pred_r["score"],
+
+# ─────────────────────────────────────────────
+# SEGUIMIENTO EN VIVO — refresco incremental de un símbolo
+# ─────────────────────────────────────────────
+class SeguimientoVivo:
+    """
+    Análisis de un símbolo que se refresca en el sitio. La primera llamada
+    a actualizar() descarga todo; las siguientes piden solo:
+      • las velas cerradas desde la última de cada marco (1m/5m/15m/1h),
+        y solo en los marcos donde ya cerró alguna,
+      • las fuentes de _FUENTES cuya vigencia expiró (book y ticker en
+        cada tick, F&G cada hora…).
+    Devuelve el mismo dict que analizar(). `pedidas` lista lo que se pidió
+    en el último tick.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol   = symbol
+        self.pair, self.display = normalizar_symbol(symbol)
+        self.base     = _base_from_kraken(self.pair)
+        self.marcos   = None
+        self.fuentes  = {}
+        self._ts      = {}       # fuente → time.time() de la última petición
+        self.pedidas  = []
+        self.ultimo   = None
+
+    def _completa(self) -> dict:
+        self.pair, self.display, self.base, marcos, fuentes, error = \
+            _descargar_fuentes(self.symbol)
+        if error:
+            return {"df": None, "error": error}
+        self.marcos, self.fuentes = marcos, fuentes
+        self._ts     = {k: time.time() for k in fuentes}
+        self.pedidas = list(marcos) + list(fuentes)
+        return None
+
+    def _velas_nuevas(self, clave: str) -> bool:
+        intervalo, n = _MARCOS[clave]
+        frame = self.marcos.get(clave)
+        if frame is None or not len(frame):
+            self.marcos[clave] = _safe_call(_velas, self.pair, intervalo, n)
+            return True
+        ultima = frame.index[-1].timestamp()
+        # La vela siguiente a la última guardada cierra a ultima + 2·intervalo
+        if time.time() < ultima + 2 * intervalo * 60:
+            return False
+        if _INSTANTANEAS is not None:
+            # Otra sesión o el scanner pueden haber traído ya la vela nueva
+            nuevas = _safe_call(_velas, self.pair, intervalo, n)
+            if nuevas is None or nuevas.index[-1] <= frame.index[-1]:
+                return False
+            self.marcos[clave] = nuevas
+            return True
+        res = _safe_call(_kraken_ohlc_desde, self.pair, intervalo, int(ultima))
+        nuevas = res[0] if res else None
+        if nuevas is None:
+            return False
+        nuevas = nuevas[nuevas.index > frame.index[-1]]
+        if nuevas.empty:
+            return False
+        self.marcos[clave] = pd.concat([frame, nuevas]).iloc[-n:]
+        return True
+
+    def actualizar(self) -> dict:
+        """Un tick; el dict lleva en "tiempos" el informe de tramos del tick."""
+        with informe() as inf:
+            res = self._actualizar()
+        res["tiempos"] = inf.resumen()
+        return res
+
+    def _actualizar(self) -> dict:
+        if self.marcos is None:
+            fallo = self._completa()
+            if fallo:
+                return fallo
+        else:
+            self.pedidas = [k for k in _MARCOS if self._velas_nuevas(k)]
+            ahora = time.time()
+            for k, (_, vigencia) in _FUENTES.items():
+                if ahora - self._ts.get(k, 0) >= vigencia:
+                    self.fuentes[k] = _fuente(k, self.pair, self.base)
+                    self._ts[k] = ahora
+                    self.pedidas.append(k)
+
+        m  = self.marcos
+        df = _enriquecer_taker(m["df"].copy(), self.fuentes.get("okx_trades"))
+        book, futures_data, info = _ensamblar(self.pair, self.display, self.base,
+                                              df, self.fuentes)
+        cache = CacheIntermedios()
+        indicadores, señales, puntuaciones, atr_pct, regimen, h_val = calcular_indicadores(
+            df, m["df5"], book, futures_data, info, m["df15"], m["df1h"], cache=cache)
+        pred = calcular_prediccion(puntuaciones, info["precio_actual"], indicadores,
+                                   regimen=regimen, fng_data=futures_data)
+        self.ultimo = {
+            "df": df, "df5": m["df5"], "book": book, "futures_data": futures_data,
+            "info": info, "error": None, "df15": m["df15"], "df1h": m["df1h"],
+            "indicadores": indicadores, "señales": señales, "puntuaciones": puntuaciones,
+            "atr_pct": atr_pct, "regimen": regimen, "hurst": h_val, "pred": pred,
+            "cache_series": cache, "ts": time.time(),
         }
-    except Exception:
-        return {"prob_subida": 50, "color": "neutro", "direccion": "?"}
+        return self.ultimo
@@ -0,0 +1,285 @@
+"""
+Derivados — Crypto Predictor 5min
+══════════════════════════════════
+Historial en memoria de open interest, funding y ratio long/short por
+activo base (perpetuos de OKX). Tras la primera descarga cada refresco
+solo pide los puntos posteriores al último guardado y los añade a un
+buffer acotado; los cambios por ventana (5m / 1h / 24h) y los z-scores
+salen de memoria, así que los indicadores de derivados no cuestan
+peticiones extra por análisis.
+
+Un hilo de fondo refresca los activos seguidos; un activo nuevo se
+descarga la primera vez que se lee y deja de seguirse si nadie lo
+consulta en `olvidar` segundos.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import crypto_predictor as cp
+
+# Ventanas de los cambios servidos: nombre → segundos
+VENTANAS = {"5m": 300, "1h": 3600, "24h": 86400}
+
+
+class Serie:
+    """
+    Puntos (timestamp en s, valor) ordenados por tiempo, como mucho
+    `max_puntos` (se descartan los más antiguos).
+    """
+
+    __slots__ = ("ts", "valor", "max_puntos")
+
+    def __init__(self, max_puntos: int):
+        self.ts    = np.empty(0)
+        self.valor = np.empty(0)
+        self.max_puntos = max_puntos
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def ultimo_ts(self):
+        return float(self.ts[-1]) if len(self.ts) else None
+
+    def añadir(self, puntos) -> int:
+        """Añade los (ts, valor) posteriores al último; devuelve cuántos entraron."""
+        if not puntos:
+            return 0
+        p = np.asarray(puntos, dtype=float).reshape(-1, 2)
+        p = p[np.argsort(p[:, 0], kind="stable")]
+        if len(self.ts):
+            p = p[p[:, 0] > self.ts[-1]]
+        if not len(p):
+            return 0
+        self.ts    = np.concatenate([self.ts, p[:, 0]])[-self.max_puntos:]
+        self.valor = np.concatenate([self.valor, p[:, 1]])[-self.max_puntos:]
+        return len(p)
+
+    def cambio_pct(self, segundos: float):
+        """% entre el último valor y el de hace `segundos` (None si no llega)."""
+        if len(self.ts) < 2:
+            return None
+        i = np.searchsorted(self.ts, self.ts[-1] - segundos, side="right") - 1
+        if i < 0 or i == len(self.ts) - 1 or self.valor[i] == 0:
+            return None
+        return float((self.valor[-1] / self.valor[i] - 1) * 100)
+
+    def cambio_puntos(self, n: int):
+        """% entre el último valor y el de n puntos antes."""
+        if len(self.ts) <= n or self.valor[-1 - n] == 0:
+            return None
+        return float((self.valor[-1] / self.valor[-1 - n] - 1) * 100)
+
+    def zscore(self, valor=None, diferencias: bool = False, minimo: int = 12):
+        """
+        z del último valor (o de `valor`) frente al historial; con
+        diferencias=True, z del último cambio frente a los cambios previos.
+        """
+        x = np.diff(self.valor) / self.valor[:-1] * 100 if diferencias else self.valor
+        if diferencias and len(x):
+            valor, x = x[-1], x[:-1]
+        elif valor is None and len(x):
+            valor = x[-1]
+        if len(x) < minimo:
+            return None
+        std = x.std(ddof=1)
+        return float((valor - x.mean()) / std) if std > 0 else None
+
+
+class _Activo:
+    """Estado de un activo base: sus series y el funding actual."""
+
+    def __init__(self, max_puntos: int):
+        self.lock     = threading.Lock()
+        self.oi       = Serie(max_puntos)
+        self.ls       = Serie(max_puntos)
+        self.funding  = Serie(max_puntos)      # funding liquidado (cada 8 h)
+        self.actual   = None                   # {"funding_rate", "next_funding_rate"}
+        self.proximo  = None                   # próxima liquidación (s)
+        self.ts       = 0.0                    # último refresco
+        self.leido    = time.time()            # última lectura
+
+
+# ─────────────────────────────────────────────
+# DESCARGAS INCREMENTALES
+# ─────────────────────────────────────────────
+def _filas_rubik(raw):
+    if raw and raw.get("code") == "0" and raw.get("data"):
+        return raw["data"]
+    return None
+
+
+def _puntos_oi(base: str, desde=None):
+    """
+    OI en USD (ts, valor) de rubik cada 5 min; si falla, open-interest-history.
+    Ese endpoint da [ts, contratos, oiCcy, oiUsd]: se toma oiUsd para no
+    mezclar unidades en la misma Serie, y si no viene no se usa.
+    """
+    params = {"ccy": base, "period": "5m"}
+    if desde:
+        params["begin"] = str(int(desde * 1000))
+    filas = _filas_rubik(cp._get(f"{cp.OKX_BASE}/rubik/stat/contracts/open-interest-volume",
+                                 params))
+    if filas is not None:
+        return [(float(d[0]) / 1000, float(d[1])) for d in filas]
+    params = {"instId": cp._OKX_SWAP[base], "period": "5m", "limit": "100"}
+    filas = _filas_rubik(cp._get(f"{cp.OKX_BASE}/public/open-interest-history", params))
+    if filas is None:
+        return None
+    puntos = [(float(d[0]) / 1000, float(d[3])) for d in filas
+              if isinstance(d, list) and len(d) > 3 and d[3]]
+    return puntos or None
+
+
+def _puntos_ls(base: str, desde=None):
+    params = {"ccy": base, "period": "5m"}
+    if desde:
+        params["begin"] = str(int(desde * 1000))
+    filas = _filas_rubik(cp._get(f"{cp.OKX_BASE}/rubik/stat/contracts/long-short-account-ratio",
+                                 params))
+    if filas is None:
+        return None
+    return [(float(d[0]) / 1000, float(d[1])) for d in filas]
+
+
+def _puntos_funding(inst: str, desde=None):
+    """Funding liquidado; con `desde`, solo los posteriores."""
+    params = {"instId": inst, "limit": "100"}
+    if desde:
+        params["before"] = str(int(desde * 1000))
+    filas = _filas_rubik(cp._get(f"{cp.OKX_BASE}/public/funding-rate-history", params))
+    if filas is None:
+        return None
+    return [(float(d["fundingTime"]) / 1000, float(d.get("realizedRate") or d["fundingRate"]))
+            for d in filas]
+
+
+# ─────────────────────────────────────────────
+# HISTORIAL
+# ─────────────────────────────────────────────
+class HistorialDerivados:
+    """
+    lectura(base) devuelve, desde memoria, lo que antes pedían
+    _okx_funding / _okx_oi_history / _okx_long_short en cada análisis
+    ("funding", "oi_chg", "ls") más "ventanas": Δ por ventana y z-scores.
+    Los activos seguidos se refrescan en un hilo cada `intervalo` s.
+    """
+
+    def __init__(self, max_puntos: int = 400, intervalo: float = 60.0,
+                 olvidar: float = 3600.0, workers: int = 4):
+        self.max_puntos = max_puntos
+        self.intervalo  = intervalo
+        self.olvidar    = olvidar
+        self._activos   = {}
+        self._lock      = threading.Lock()
+        self._pool      = ThreadPoolExecutor(max_workers=workers,
+                                             thread_name_prefix="derivados")
+        self.peticiones = 0
+        self._parar     = threading.Event()
+        self._hilo      = None
+
+    def _get(self, fn, *args):
+        self.peticiones += 1
+        try:
+            return fn(*args)
+        except Exception:
+            return None
+
+    def refrescar(self, base: str, vigencia: float = 0.0):
+        """
+        Añade los puntos nuevos de un activo (una petición por serie), salvo
+        que se refrescara hace menos de `vigencia` s.
+        """
+        a = self._activos.get(base)
+        if a is None:
+            return
+        with a.lock:
+            if time.time() - a.ts < vigencia:
+                return
+            oi = self._get(_puntos_oi, base, a.oi.ultimo_ts)
+            if oi:
+                a.oi.añadir(oi)
+            ls = self._get(_puntos_ls, base, a.ls.ultimo_ts)
+            if ls:
+                a.ls.añadir(ls)
+            actual = self._get(cp._okx_funding, base)
+            if actual:
+                a.actual = actual
+            # El historial de funding solo cambia en cada liquidación
+            if not len(a.funding) or (a.proximo and time.time() >= a.proximo):
+                fh = self._get(_puntos_funding, cp._OKX_SWAP[base], a.funding.ultimo_ts)
+                if fh:
+                    a.funding.añadir(fh)
+                    a.proximo = a.funding.ultimo_ts + 8 * 3600
+            a.ts = time.time()
+
+    def ciclo(self):
+        """Refresca en paralelo los activos leídos en los últimos `olvidar` s."""
+        ahora = time.time()
+        with self._lock:
+            for base in [b for b, a in self._activos.items() if ahora - a.leido > self.olvidar]:
+                del self._activos[base]
+            bases = list(self._activos)
+        list(self._pool.map(self.refrescar, bases))
+
+    def lectura(self, base: str):
+        """
+        {"funding", "oi_chg", "ls", "ventanas"} de `base`, o None si no
+        tiene perpetuo en OKX. La primera lectura de un activo lo descarga.
+        """
+        if base not in cp._OKX_SWAP:
+            return None
+        with self._lock:
+            a = self._activos.get(base)
+            if a is None:
+                a = self._activos[base] = _Activo(self.max_puntos)
+        a.leido = time.time()
+        self.refrescar(base, vigencia=3 * self.intervalo)
+        with a.lock:
+            return self._resumen(a)
+
+    @staticmethod
+    def _resumen(a: _Activo) -> dict:
+        ls = None
+        if len(a.ls):
+            r = float(a.ls.valor[-1])
+            ls = {"long_ratio": r / (1 + r), "short_ratio": 1 / (1 + r), "ls_raw": r}
+        fr = (a.actual or {}).get("funding_rate")
+        ventanas = {
+            "oi":      {k: a.oi.cambio_pct(s) for k, s in VENTANAS.items()},
+            "oi_z":    a.oi.zscore(diferencias=True),
+            "ls":      {k: a.ls.cambio_pct(s) for k, s in VENTANAS.items()},
+            "ls_z":    a.ls.zscore(),
+            "funding_z": a.funding.zscore(fr) if fr is not None else None,
+            "puntos":  {"oi": len(a.oi), "ls": len(a.ls), "funding": len(a.funding)},
+            "ts":      a.ts,
+        }
+        return {
+            "funding":  a.actual,
+            # Mismo cálculo que _okx_oi_history: último punto vs 7 antes
+            "oi_chg":   a.oi.cambio_puntos(7),
+            "ls":       ls,
+            "ventanas": ventanas,
+        }
+
+    # ── Hilo de refresco ──
+    def _bucle(self):
+        while not self._parar.is_set():
+            self.ciclo()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        """Arranca el hilo de refresco (idempotente)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="derivados-bucle",
+                                          daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
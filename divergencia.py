@@ -0,0 +1,253 @@
+"""
+Divergencia — Crypto Predictor 5min
+════════════════════════════════════
+Motor de divergencia de precio entre venues. En cada ciclo pide a todos
+los venues sus tickers en bloque (una petición por venue, en paralelo),
+alinea los precios en una matriz símbolos × venues y calcula, para cada
+celda, la desviación frente a la mediana entre venues (pb) y su z-score
+sobre una ventana móvil de ciclos.
+
+Los venues son adaptadores enchufables (registrar_venue). Kraken y OKX
+consultan sus APIs; AdaptadorLocal sirve de sustituto local (simulador,
+fixtures o un venue sin API pública) a partir de una función o un dict.
+"""
+
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import crypto_predictor as cp
+
+_ADAPTADORES = {}
+
+
+def registrar_venue(nombre):
+    """Decorador de clase: añade un adaptador de venue al registro."""
+    def deco(cls):
+        cls.nombre = nombre
+        _ADAPTADORES[nombre] = cls
+        return cls
+    return deco
+
+
+class AdaptadorVenue:
+    """Interfaz: tickers() → {base: último precio} de todo el venue."""
+
+    nombre = ""
+
+    def tickers(self) -> dict:
+        raise NotImplementedError
+
+
+@registrar_venue("kraken")
+class AdaptadorKraken(AdaptadorVenue):
+    """Ticker de todos los pares USD de Kraken (AssetPairs cacheado una hora)."""
+
+    def __init__(self, ttl_pares: float = 3600.0):
+        self._ttl = ttl_pares
+        self._pares, self._pares_ts = {}, 0.0
+
+    def _mapa_pares(self) -> dict:
+        if self._pares and time.time() - self._pares_ts < self._ttl:
+            return self._pares
+        raw = cp._get(f"{cp.KRAKEN_BASE}/AssetPairs", timeout=15)
+        if raw and "result" in raw:
+            pares = {}
+            for clave, info in raw["result"].items():
+                alt = info.get("altname", "")
+                if info.get("quote") not in ("ZUSD", "USD") or alt.endswith(".d"):
+                    continue
+                base = info.get("wsname", alt).split("/")[0]
+                pares[clave] = {"XBT": "BTC", "XDG": "DOGE"}.get(base, base)
+            if pares:
+                self._pares, self._pares_ts = pares, time.time()
+        return self._pares
+
+    def tickers(self) -> dict:
+        pares = self._mapa_pares()
+        raw = cp._get(f"{cp.KRAKEN_BASE}/Ticker", timeout=15)
+        if not pares or not raw or "result" not in raw:
+            return {}
+        return {pares[k]: float(t["c"][0]) for k, t in raw["result"].items()
+                if k in pares}
+
+
+@registrar_venue("okx")
+class AdaptadorOKX(AdaptadorVenue):
+    """Tickers spot USDT de OKX en una sola petición."""
+
+    def tickers(self) -> dict:
+        raw = cp._get(f"{cp.OKX_BASE}/market/tickers", {"instType": "SPOT"}, timeout=15)
+        if not raw or raw.get("code") != "0":
+            return {}
+        res = {}
+        for d in raw.get("data", []):
+            base, _, quote = d.get("instId", "").partition("-")
+            if quote == "USDT" and d.get("last"):
+                res[base] = float(d["last"])
+        return res
+
+
+class AdaptadorLocal(AdaptadorVenue):
+    """
+    Venue sustituto: `fuente` es un dict {base: precio} o una función que
+    lo devuelve. Sirve para simuladores, fixtures o venues sin API.
+    """
+
+    def __init__(self, nombre: str, fuente):
+        self.nombre = nombre
+        self._fuente = fuente
+
+    def tickers(self) -> dict:
+        return dict(self._fuente() if callable(self._fuente) else self._fuente)
+
+
+def adaptadores_por_defecto() -> list:
+    return [_ADAPTADORES["kraken"](), _ADAPTADORES["okx"]()]
+
+
+# ─────────────────────────────────────────────
+# MOTOR
+# ─────────────────────────────────────────────
+class MotorDivergencia:
+    """
+    Matriz de desviaciones entre venues para todo el universo.
+      ciclo()      — un refresco: tickers de todos los venues en paralelo
+      desviacion() — {venue: precio, pb, z} de un símbolo
+      matriz()     — DataFrames símbolos × venues de pb y z-score
+    Las desviaciones de los últimos `ventana` ciclos viven en un buffer
+    circular (ventana × símbolos × venues); la media y desviación típica
+    de cada celda salen de él en una sola operación, así que una base
+    persistente (p. ej. USD vs USDT) no dispara el z-score.
+    """
+
+    def __init__(self, adaptadores=None, ventana: int = 120, intervalo: float = 15.0,
+                 min_ciclos: int = 10):
+        self.adaptadores = list(adaptadores) if adaptadores else adaptadores_por_defecto()
+        self.venues      = [a.nombre for a in self.adaptadores]
+        self.ventana     = ventana
+        self.intervalo   = intervalo
+        self.min_ciclos  = min_ciclos
+        self._pool  = ThreadPoolExecutor(max_workers=len(self.adaptadores),
+                                         thread_name_prefix="divergencia")
+        self._lock  = threading.Lock()
+        self._filas = {}                                  # base → fila
+        self._hist  = np.full((ventana, 0, len(self.venues)), np.nan)
+        self._pos   = 0
+        self.ciclos = 0
+        self._precios = self._dev = self._z = np.full((0, len(self.venues)), np.nan)
+        self.ts     = 0.0
+        self.duracion = 0.0
+        self._parar = threading.Event()
+        self._hilo  = None
+
+    def _tickers(self, adaptador) -> dict:
+        try:
+            return adaptador.tickers()
+        except Exception:
+            return {}
+
+    def ciclo(self):
+        t0 = time.time()
+        por_venue = list(self._pool.map(self._tickers, self.adaptadores))
+
+        # Solo interesan los símbolos que cotizan en al menos dos venues
+        cuenta = {}
+        for tk in por_venue:
+            for base in tk:
+                cuenta[base] = cuenta.get(base, 0) + 1
+        nuevos = [b for b, n in cuenta.items() if n >= 2 and b not in self._filas]
+        with self._lock:
+            filas = dict(self._filas)
+            for b in nuevos:
+                filas[b] = len(filas)
+            hist = self._hist
+            if nuevos:
+                hist = np.concatenate(
+                    [hist, np.full((self.ventana, len(nuevos), len(self.venues)), np.nan)],
+                    axis=1)
+
+        precios = np.full((len(filas), len(self.venues)), np.nan)
+        for j, tk in enumerate(por_venue):
+            for base, px in tk.items():
+                i = filas.get(base)
+                if i is not None and px > 0:
+                    precios[i, j] = px
+
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mediana = np.nanmedian(precios, axis=1, keepdims=True)
+            dev = (precios / mediana - 1) * 1e4
+            dev[(~np.isnan(precios)).sum(axis=1) < 2] = np.nan
+            hist[self._pos] = dev
+            media = np.nanmean(hist, axis=0)
+            std   = np.nanstd(hist, axis=0, ddof=1)
+            z = np.where(std > 0, (dev - media) / std, np.nan)
+            z[(~np.isnan(hist)).sum(axis=0) < self.min_ciclos] = np.nan
+
+        with self._lock:
+            self._filas, self._hist = filas, hist
+            self._pos = (self._pos + 1) % self.ventana
+            self._precios, self._dev, self._z = precios, dev, z
+            self.ciclos  += 1
+            self.ts       = time.time()
+            self.duracion = self.ts - t0
+
+    # ── Lecturas ──
+    def fresco(self) -> bool:
+        return time.time() - self.ts < 3 * self.intervalo
+
+    def precio(self, base: str, venue: str):
+        """Último precio de `base` en `venue` (None si no hay o está viejo)."""
+        with self._lock:
+            i = self._filas.get(base)
+            if i is None or venue not in self.venues or not self.fresco():
+                return None
+            px = self._precios[i, self.venues.index(venue)]
+        return None if np.isnan(px) else float(px)
+
+    def desviacion(self, base: str):
+        """
+        {"venues": {venue: {"precio", "bps", "z"}}, "ts"} de un símbolo, con
+        solo los venues que lo cotizan; None si no hay datos frescos.
+        """
+        with self._lock:
+            i = self._filas.get(base)
+            if i is None or not self.fresco():
+                return None
+            px, dev, z = self._precios[i], self._dev[i], self._z[i]
+            ts = self.ts
+        venues = {v: {"precio": float(px[j]), "bps": float(dev[j]),
+                      "z": None if np.isnan(z[j]) else float(z[j])}
+                  for j, v in enumerate(self.venues) if not np.isnan(px[j])}
+        return {"venues": venues, "ts": ts} if len(venues) >= 2 else None
+
+    def matriz(self):
+        """(desviaciones en pb, z-scores) como DataFrames símbolos × venues."""
+        with self._lock:
+            symbols = sorted(self._filas, key=self._filas.get)
+            dev, z = self._dev.copy(), self._z.copy()
+        return (pd.DataFrame(dev, index=symbols, columns=self.venues),
+                pd.DataFrame(z, index=symbols, columns=self.venues))
+
+    # ── Hilo de refresco ──
+    def _bucle(self):
+        while not self._parar.is_set():
+            self.ciclo()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        """Arranca el hilo de refresco (idempotente)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="divergencia-bucle",
+                                          daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
@@ -0,0 +1,342 @@
+"""
+Fixturas — Crypto Predictor 5min
+═════════════════════════════════
+Mercado sintético determinista que responde como las APIs públicas que
+usa crypto_predictor (Kraken, OKX y alternative.me), sin red:
+
+  mercado = MercadoSintetico(n_symbols=200, reloj=1.8e9)
+  usar_transporte(mercado.transporte)    # _get pasa a leer de aquí
+
+Precios por minuto = factor común (mercado, con algo de retraso en las
+altcoins) + componente propia + ruido de tablas aleatorias con semilla,
+así que velas, books, trades, funding, OI y long/short son coherentes
+entre sí y entre llamadas, y se pueden pedir para cualquier instante.
+Con `reloj=None` sigue la hora real (útil para el simulador HTTP).
+
+FixturasGrabadas reproduce respuestas reales grabadas con grabar().
+"""
+
+import gzip
+import hashlib
+import json
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+import crypto_predictor as cp
+
+_TABLA = 4096          # minutos de las tablas de ruido (se repiten)
+_BASES_REALES = list(cp._OKX_SPOT)
+_PAR_DE_BASE = {b: p for p, b in cp._KRAKEN_TO_BASE.items()}
+_CT_VAL = 0.01         # valor de un contrato de los swaps sintéticos (en la base)
+
+
+def _semilla(*partes) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(partes).encode(), digest_size=8).digest(), "little")
+
+
+def _ruta(url: str) -> str:
+    return urlsplit(url).path
+
+
+class _Activo:
+    """Tablas deterministas de un símbolo: ruido de precio, volumen y book."""
+
+    def __init__(self, base: str, i: int, seed: int):
+        rng = np.random.default_rng(_semilla(seed, base))
+        paseo = np.cumsum(rng.normal(0, 1, _TABLA))
+        # Quitar la deriva para que la tabla enlace consigo misma al repetirse
+        paseo -= np.linspace(0, paseo[-1], _TABLA)
+        self.base   = base
+        self.precio = 100.0 * np.exp(rng.uniform(-4, 6)) if base != "BTC" else 60_000.0
+        self.vol    = rng.uniform(0.0006, 0.002)          # volatilidad por minuto
+        self.beta   = 0.0 if base == "BTC" else rng.uniform(0.4, 1.4)
+        self.retraso = 0 if base == "BTC" else int(rng.integers(0, 3))
+        self.paseo  = paseo
+        self.volumen = rng.lognormal(0, 0.8, _TABLA)
+        self.tamaños = rng.lognormal(0, 1, (2, 400))
+        self.fase   = rng.uniform(0, 2 * np.pi, 3)
+
+
+class MercadoSintetico:
+    """
+    Responde (url, params) → JSON como Kraken / OKX / alternative.me.
+    `symbols` son bases ("BTC", "ETH"…); por defecto las 18 conocidas y,
+    hasta `n_symbols`, bases sintéticas "S001", "S002"…
+    """
+
+    def __init__(self, symbols=None, n_symbols: int = 18, seed: int = 7, reloj: float = None):
+        if symbols is None:
+            symbols = _BASES_REALES[:n_symbols] + [f"S{i:03d}" for i in
+                                                   range(1, max(0, n_symbols - len(_BASES_REALES)) + 1)]
+        self.symbols = list(symbols)
+        self.seed    = seed
+        self.reloj   = reloj
+        self._activos = {b: _Activo(b, i, seed) for i, b in enumerate(self.symbols)}
+        self._mercado = _Activo("·mercado·", -1, seed)
+        self._par = {_PAR_DE_BASE.get(b, f"{b}USD"): b for b in self.symbols}
+        self.peticiones = 0
+
+    # ── Reloj y series ──
+    def ahora(self) -> float:
+        return self.reloj if self.reloj is not None else time.time()
+
+    def precios(self, base: str, minutos: np.ndarray) -> np.ndarray:
+        """Precio al inicio de cada minuto (array de minutos desde epoch)."""
+        a = self._activos[base]
+        m = np.asarray(minutos, dtype=np.int64)
+        comun  = self._mercado.paseo[(m - a.retraso) % _TABLA]
+        propio = a.paseo[m % _TABLA]
+        ciclo  = np.sin(2 * np.pi * m / 97 + a.fase[0]) * 0.3
+        log_p  = (a.beta * comun + propio + ciclo) * a.vol * 6
+        return a.precio * np.exp(log_p)
+
+    def precio(self, base: str, t: float = None) -> float:
+        return float(self.precios(base, [int((t or self.ahora()) // 60)])[0])
+
+    def velas(self, base: str, intervalo: int, n: int, desde: float = None):
+        """
+        Filas OHLC [t, o, h, l, c, vwap, vol, count] de las últimas `n` velas
+        de `intervalo` minutos (la última, en curso), o desde `desde`.
+        """
+        paso = intervalo * 60
+        actual = int(self.ahora() // paso) * paso
+        inicio = actual - (n - 1) * paso
+        if desde:
+            inicio = max(inicio, int(desde) // paso * paso)
+        ts = np.arange(inicio, actual + paso, paso)
+        m0 = ts // 60
+        mins = m0[:, None] + np.arange(intervalo + 1)[None, :]
+        p = self.precios(base, mins)
+        a = self._activos[base]
+        o, c = p[:, 0], p[:, -1]
+        h = p.max(axis=1) * (1 + a.vol * 0.3)
+        l = p.min(axis=1) * (1 - a.vol * 0.3)
+        vol = a.volumen[m0 % _TABLA] * intervalo * 1e5 / a.precio
+        cuenta = np.maximum(1, (vol * a.precio / 2000).astype(int))
+        return [[int(t), f"{oo:.8g}", f"{hh:.8g}", f"{ll:.8g}", f"{cc:.8g}",
+                 f"{(oo + cc) / 2:.8g}", f"{vv:.8g}", int(k)]
+                for t, oo, hh, ll, cc, vv, k in zip(ts, o, h, l, c, vol, cuenta)], actual
+
+    def book(self, base: str, niveles: int):
+        a = self._activos[base]
+        mid = self.precio(base)
+        paso = mid * 1e-4
+        k = np.arange(1, niveles + 1)
+        mov = int(self.ahora() // 5)          # el book cambia cada 5 s
+        bids = mid - paso * k * (1 + 0.2 * np.sin(k + mov))
+        asks = mid + paso * k * (1 + 0.2 * np.cos(k + mov))
+        tb = np.roll(a.tamaños[0], mov % 400)[:niveles] * 1e4 / mid
+        ta = np.roll(a.tamaños[1], mov % 400)[:niveles] * 1e4 / mid
+        return ([[f"{p:.8g}", f"{s:.6g}"] for p, s in zip(bids, tb)],
+                [[f"{p:.8g}", f"{s:.6g}"] for p, s in zip(asks, ta)])
+
+    def _ciclo(self, base: str, periodo: float, t: float = None) -> float:
+        a = self._activos[base]
+        return float(np.sin(2 * np.pi * (t or self.ahora()) / periodo + a.fase[1]))
+
+    def _serie5m(self, base: str, fn, n: int = 288, desde_ms=None):
+        actual = int(self.ahora() // 300) * 300
+        ts = [actual - 300 * i for i in range(n)]          # más reciente primero
+        if desde_ms:
+            ts = [t for t in ts if t * 1000 >= int(desde_ms)]
+        return [[str(t * 1000), f"{fn(t):.8g}", "0"] for t in ts]
+
+    # ── Endpoints ──
+    def transporte(self, url: str, params=None, timeout=10):
+        """Transporte para crypto_predictor.usar_transporte()."""
+        self.peticiones += 1
+        return self.responder(url, params or {})
+
+    def responder(self, url: str, q: dict):
+        ruta = _ruta(url)
+        if "alternative.me" in url or ruta.startswith("/fng"):
+            return self._fng()
+        if "/0/public/" in ruta:
+            return self._kraken(ruta.rsplit("/", 1)[-1], q)
+        if "/api/v5/" in ruta:
+            return self._okx(ruta.split("/api/v5/", 1)[1], q)
+        return None
+
+    def _kraken(self, ep: str, q: dict):
+        if ep == "AssetPairs":
+            pares = [q["pair"]] if q.get("pair") else list(self._par)
+            res = {}
+            for p in pares:
+                b = self._par.get(p)
+                if b:
+                    alias = {"BTC": "XBT", "DOGE": "XDG"}.get(b, b)
+                    res[p] = {"altname": p, "wsname": f"{alias}/USD", "quote": "ZUSD",
+                              "status": "online"}
+            return {"error": [] if res else ["EQuery:Unknown asset pair"], "result": res}
+        if ep == "Ticker" and not q.get("pair"):
+            return {"error": [], "result": {p: self._ticker_krk(b) for p, b in self._par.items()}}
+        base = self._par.get(q.get("pair"))
+        if base is None:
+            return {"error": ["EQuery:Unknown asset pair"]}
+        if ep == "OHLC":
+            filas, last = self.velas(base, int(q.get("interval", 1)), 720, q.get("since"))
+            return {"error": [], "result": {q["pair"]: filas, "last": last}}
+        if ep == "Depth":
+            bids, asks = self.book(base, min(int(q.get("count", 100)), 500))
+            t = int(self.ahora())
+            return {"error": [], "result": {q["pair"]: {
+                "bids": [b + [t] for b in bids], "asks": [a + [t] for a in asks]}}}
+        if ep == "Ticker":
+            return {"error": [], "result": {q["pair"]: self._ticker_krk(base)}}
+        return {"error": [f"EGeneral:Unknown method {ep}"]}
+
+    def _ticker_krk(self, base: str) -> dict:
+        p = self.precio(base)
+        p24 = self.precio(base, self.ahora() - 86400)
+        filas, _ = self.velas(base, 60, 24)
+        vol = sum(float(f[6]) for f in filas)
+        hi = max(float(f[2]) for f in filas)
+        lo = min(float(f[3]) for f in filas)
+        return {"c": [f"{p:.8g}", "1"], "o": f"{p24:.8g}", "v": [f"{vol:.8g}"] * 2,
+                "h": [f"{hi:.8g}"] * 2, "l": [f"{lo:.8g}"] * 2}
+
+    def _okx(self, ep: str, q: dict):
+        ok = lambda data: {"code": "0", "msg": "", "data": data}
+        if ep == "market/tickers":
+            return ok([{"instId": f"{b}-USDT",
+                        "last": f"{self.precio(b) * (1 + 2e-4 * self._ciclo(b, 900)):.8g}"}
+                       for b in self.symbols])
+        if ep == "public/instruments":
+            return ok([{"instId": f"{b}-USDT", "baseCcy": b, "quoteCcy": "USDT", "state": "live"}
+                       for b in self.symbols])
+        inst = q.get("instId", "")
+        base = q.get("ccy") or inst.split("-")[0]
+        if base not in self._activos:
+            return {"code": "51001", "msg": "Instrument ID does not exist", "data": []}
+        t = self.ahora()
+        if ep == "market/books":
+            bids, asks = self.book(base, min(int(q.get("sz", 400)), 400))
+            return ok([{"bids": [b + ["0", "1"] for b in bids],
+                        "asks": [a + ["0", "1"] for a in asks], "ts": str(int(t * 1000))}])
+        if ep == "market/trades":
+            m = int(t // 60)
+            ret = self.precios(base, [m - 1, m])
+            sesgo = 0.5 + np.clip((ret[1] / ret[0] - 1) * 200, -0.3, 0.3)
+            rng = np.random.default_rng(_semilla(self.seed, base, int(t // 5)))
+            lados = rng.random(int(q.get("limit", 100))) < sesgo
+            p = self.precio(base)
+            return ok([{"instId": inst, "px": f"{p:.8g}", "sz": f"{s:.6g}",
+                        "side": "buy" if c else "sell", "ts": str(int(t * 1000))}
+                       for c, s in zip(lados, rng.lognormal(0, 1, len(lados)) * 100 / p)])
+        if ep == "market/ticker":
+            tk = self._ticker_krk(base)
+            return ok([{"instId": inst,
+                        "last": f"{self.precio(base) * (1 + 2e-4 * self._ciclo(base, 900)):.8g}",
+                        "open24h": tk["o"], "high24h": tk["h"][1], "low24h": tk["l"][1],
+                        "vol24h": tk["v"][1]}])
+        if ep == "market/candles":
+            filas, _ = self.velas(base, 1, min(int(q.get("limit", 100)), 300))
+            return ok([[str(f[0] * 1000), f[1], f[2], f[3], f[4], f[6], "0", "0",
+                        "0" if i == len(filas) - 1 else "1"]
+                       for i, f in enumerate(filas)][::-1])
+        if ep == "public/funding-rate":
+            fr = 1e-4 * (1 + 2 * self._ciclo(base, 8 * 3600))
+            return ok([{"instId": inst, "fundingRate": f"{fr:.6g}",
+                        "nextFundingRate": f"{fr * 0.8:.6g}",
+                        "fundingTime": str(int((t // 28800 + 1) * 28800 * 1000))}])
+        if ep == "public/funding-rate-history":
+            ultimo = int(t // 28800) * 28800
+            tiempos = [ultimo - 28800 * i for i in range(int(q.get("limit", 100)))]
+            if q.get("before"):
+                tiempos = [s for s in tiempos if s * 1000 > int(q["before"])]
+            return ok([{"instId": inst, "fundingTime": str(s * 1000),
+                        "fundingRate": f"{1e-4 * (1 + 2 * self._ciclo(base, 8 * 3600, s)):.6g}",
+                        "realizedRate": f"{1e-4 * (1 + 2 * self._ciclo(base, 8 * 3600, s)):.6g}"}
+                       for s in tiempos])
+        oi = lambda s: self._activos[base].precio * 1e4 * (1 + 0.05 * self._ciclo(base, 7200, s))
+        if ep == "public/open-interest":
+            return ok([{"instId": inst, "oiCcy": f"{oi(t) / self.precio(base):.8g}",
+                        "ts": str(int(t * 1000))}])
+        if ep == "rubik/stat/contracts/open-interest-volume":
+            return ok(self._serie5m(base, oi, desde_ms=q.get("begin")))
+        if ep == "public/open-interest-history":
+            # Como OKX: [ts, oi en contratos, oiCcy, oiUsd] (rubik da el OI en USD)
+            px = self._activos[base].precio
+            return ok([[ts, f"{float(usd) / px / _CT_VAL:.8g}", f"{float(usd) / px:.8g}", usd]
+                       for ts, usd, _ in self._serie5m(base, oi, int(q.get("limit", 100)))])
+        if ep == "rubik/stat/contracts/long-short-account-ratio":
+            return ok(self._serie5m(base, lambda s: 1.2 + 0.6 * self._ciclo(base, 5400, s),
+                                    desde_ms=q.get("begin")))
+        return {"code": "50000", "msg": f"unknown endpoint {ep}", "data": []}
+
+    def _fng(self):
+        dia = int(self.ahora() // 86400)
+        valores = [int(50 + 40 * np.sin(d / 5)) for d in (dia, dia - 1, dia - 2)]
+        clases = lambda v: ("Extreme Fear" if v <= 20 else "Fear" if v <= 40 else "Neutral"
+                            if v < 60 else "Greed" if v < 80 else "Extreme Greed")
+        return {"data": [{"value": str(v), "value_classification": clases(v)} for v in valores]}
+
+
+# ─────────────────────────────────────────────
+# RESPUESTAS GRABADAS
+# ─────────────────────────────────────────────
+def _clave(url: str, params) -> str:
+    return url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+
+
+def _red(url: str, params=None, timeout=10):
+    r = requests.get(url, params=params, verify=False, timeout=timeout)
+    return r.json() if r.status_code == 200 else None
+
+
+class Grabadora:
+    """Transporte que pasa las peticiones a `transporte` (la red real por defecto) y guarda cada respuesta."""
+
+    def __init__(self, transporte=None):
+        self._transporte = transporte or _red
+        self.respuestas  = {}
+
+    def transporte(self, url: str, params=None, timeout=10):
+        data = self._transporte(url, params, timeout)
+        self.respuestas[_clave(url, params)] = data
+        return data
+
+    def guardar(self, ruta: str):
+        """Escribe lo grabado en `ruta` (JSON gzip) para FixturasGrabadas."""
+        with gzip.open(ruta, "wt", encoding="utf-8") as f:
+            json.dump({"grabado": time.time(), "respuestas": self.respuestas}, f)
+        return len(self.respuestas)
+
+
+def grabar(ruta: str, fn, transporte=None) -> int:
+    """Ejecuta fn() grabando cada respuesta de _get y la guarda en `ruta`."""
+    grabadora, original = Grabadora(transporte), cp._TRANSPORTE
+    cp.usar_transporte(grabadora.transporte)
+    try:
+        fn()
+    finally:
+        cp.usar_transporte(original)
+    return grabadora.guardar(ruta)
+
+
+class FixturasGrabadas:
+    """
+    Transporte que devuelve respuestas grabadas: las de un fichero de
+    grabar() o un dict {clave: JSON} (Grabadora.respuestas). Las
+    peticiones que no están grabadas devuelven None y se cuentan en `fallos`.
+    """
+
+    def __init__(self, ruta: str = None, respuestas: dict = None):
+        self.grabado = time.time()
+        if ruta is not None:
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                datos = json.load(f)
+            self.grabado, respuestas = datos["grabado"], datos["respuestas"]
+        self.respuestas = respuestas or {}
+        self.peticiones = 0
+        self.fallos     = 0
+
+    def transporte(self, url: str, params=None, timeout=10):
+        self.peticiones += 1
+        r = self.respuestas.get(_clave(url, params))
+        if r is None:
+            self.fallos += 1
+        return r
@@ -0,0 +1,330 @@
+"""
+Gráficos — Crypto Predictor 5min
+═════════════════════════════════
+Panel de 8 gráficos del análisis (precio, volumen, buy/sell, RSI, MACD,
+estocástico, gauge y scores) renderizado a PNG.
+
+  • datos_graficos() reduce el análisis a los arrays que se dibujan.
+  • La figura y sus artistas se crean una sola vez; en cada refresco solo
+    se cambian los datos de líneas y barras (set_data / set_height).
+  • Los PNG se cachean por huella (hash de datos + tema): si los datos no
+    cambiaron, no se vuelve a renderizar.
+"""
+
+import hashlib
+import io
+import threading
+import time
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+import matplotlib.gridspec as gridspec
+
+from crypto_predictor import CacheLRU
+from metricas import METRICAS
+from tiempos import tramo
+
+TEMA = {
+    "bg": "#08090c", "pan": "#0c0e15", "grid": "#141820",
+    "a": "#00e87a", "b": "#ff4f6a", "p": "#f5a623",
+    "blue": "#4e9eff", "purple": "#a29bfe",
+}
+
+
+# ─────────────────────────────────────────────
+# DATOS → ARRAYS
+# ─────────────────────────────────────────────
+def datos_graficos(df, cache_series, puntuaciones: dict, precio: float,
+                   prob_up: float, direccion: str, sym_display: str) -> dict:
+    """
+    Arrays y textos que dibuja el panel. Las series salen de la
+    CacheIntermedios del análisis (no se recalculan). El subtítulo usa la
+    hora de la última vela, no la del reloj, para que la huella solo
+    cambie cuando cambian los datos.
+    """
+    bm, bs = cache_series.bollinger(df, 20)
+    ml, sl, hl = cache_series.macd(df, 5, 13, 3)
+    sk, sd = cache_series.stoch(df, 5, 3)
+    tbq = df["taker_buy_quote"].tail(30)
+    tsq = (df["quote_volume"] - df["taker_buy_quote"]).tail(30)
+    inds = sorted(puntuaciones.items(), key=lambda x: x[1])
+    return {
+        "close":    df["close"].tail(80).values,
+        "ema7":     cache_series.ewm(df, "close", 7).tail(80).values,
+        "ema25":    cache_series.ewm(df, "close", 25).tail(80).values,
+        "bb_sup":   (bm + 2 * bs).tail(80).values,
+        "bb_inf":   (bm - 2 * bs).tail(80).values,
+        "vol":      df["volume"].tail(50).values,
+        "vol_ma":   cache_series.rolling(df, "volume", 20, "mean").tail(50).values,
+        "taker":    df["taker_buy_base"].tail(50).values,
+        "ratio":    (tbq / (tbq + tsq) * 100).values,
+        "rsi":      cache_series.rsi(df, 9).tail(60).values,
+        "macd":     ml.tail(60).values,
+        "signal":   sl.tail(60).values,
+        "hist":     hl.tail(60).values,
+        "stoch_k":  sk.tail(60).values,
+        "stoch_d":  sd.tail(60).values,
+        "nombres":  tuple(k[:24] for k, _ in inds),
+        "scores":   np.array([v for _, v in inds], dtype=float),
+        "precio":   float(precio),
+        "prob_up":  float(prob_up),
+        "direccion": direccion,
+        "titulo":   f"{sym_display}  ·  ANÁLISIS 5MIN  ·  "
+                    f"{df.index[-1].strftime('%H:%M')} UTC",
+        "sym":      sym_display,
+    }
+
+
+def huella(datos: dict, tema: dict = TEMA) -> str:
+    """Hash estable de los datos del panel y del tema."""
+    h = hashlib.blake2b(digest_size=16)
+    for k in sorted(datos):
+        v = datos[k]
+        h.update(k.encode())
+        if isinstance(v, np.ndarray):
+            h.update(np.ascontiguousarray(v, dtype=float).tobytes())
+        else:
+            h.update(repr(v).encode())
+    h.update(repr(sorted(tema.items())).encode())
+    return h.hexdigest()
+
+
+def _forma(datos: dict) -> tuple:
+    """Lo que obliga a reconstruir la figura si cambia (longitudes y nombres)."""
+    return tuple(len(datos[k]) for k in ("close", "vol", "ratio", "rsi", "hist",
+                                         "stoch_k")) + (datos["nombres"],)
+
+
+# ─────────────────────────────────────────────
+# LIENZO REUTILIZABLE
+# ─────────────────────────────────────────────
+class LienzoAnalisis:
+    """
+    Figura 18×16 de 8 paneles construida una vez. actualizar() cambia solo
+    los datos de los artistas; si cambian las longitudes o los nombres de
+    los indicadores, se reconstruye.
+    """
+
+    def __init__(self, tema: dict = TEMA):
+        self.tema  = tema
+        self.fig   = None
+        self._art  = {}
+        self._forma = None
+
+    def _style_ax(self, ax, title=""):
+        t = self.tema
+        ax.set_facecolor(t["pan"])
+        ax.tick_params(colors="#4a5568", labelsize=7.5)
+        for sp in ax.spines.values():
+            sp.set_color(t["grid"])
+        ax.grid(color=t["grid"], linewidth=0.5, alpha=0.6)
+        if title:
+            ax.set_title(title, color="#6b7894", fontsize=9,
+                         fontfamily="monospace", pad=5, fontweight="bold")
+
+    def _construir(self, d: dict):
+        t, a = self.tema, {}
+        fig = Figure(figsize=(18, 16), facecolor=t["bg"])
+        gs  = gridspec.GridSpec(4, 3, figure=fig, hspace=0.48, wspace=0.3)
+        leyenda = dict(facecolor=t["pan"], labelcolor="#8892a4", edgecolor=t["grid"])
+
+        # 1. Precio + EMA + BB
+        ax1 = a["ax1"] = fig.add_subplot(gs[0, :])
+        x = np.arange(len(d["close"]))
+        a["bb_sup"], = ax1.plot(x, d["bb_sup"], color=t["p"], lw=0.5, alpha=0.4)
+        a["bb_inf"], = ax1.plot(x, d["bb_inf"], color=t["p"], lw=0.5, alpha=0.4)
+        a["close"],  = ax1.plot(x, d["close"], color=t["blue"], lw=1.8, zorder=5, label="Precio")
+        a["ema7"],   = ax1.plot(x, d["ema7"],  color=t["a"], lw=1.2, alpha=0.9, label="EMA7")
+        a["ema25"],  = ax1.plot(x, d["ema25"], color=t["purple"], lw=1.2, alpha=0.9, label="EMA25")
+        a["precio"]  = ax1.axhline(d["precio"], color="yellow", lw=0.8, ls="--", alpha=0.4)
+        ax1.legend(loc="upper left", fontsize=7.5, framealpha=0.9, **leyenda)
+        self._style_ax(ax1)
+
+        # 2. Volumen
+        ax2 = a["ax2"] = fig.add_subplot(gs[1, :2])
+        a["vol"]    = ax2.bar(np.arange(len(d["vol"])), d["vol"], alpha=0.8, width=0.85)
+        a["vol_ma"], = ax2.plot(np.arange(len(d["vol_ma"])), d["vol_ma"],
+                                color="white", lw=1.2, alpha=0.5, label="MA20")
+        ax2.set_xticks([]); ax2.legend(fontsize=7.5, **leyenda)
+        self._style_ax(ax2, "VOLUMEN  (verde=buy / rojo=sell)")
+
+        # 3. Buy/Sell ratio
+        ax3 = a["ax3"] = fig.add_subplot(gs[1, 2])
+        a["ratio"] = ax3.bar(np.arange(len(d["ratio"])), d["ratio"] - 50, alpha=0.8, width=0.85)
+        ax3.axhline(0, color="#3a4055", lw=0.8); ax3.set_xticks([])
+        ax3.set_ylabel("Buy% − 50", color="#6b7894", fontsize=7)
+        self._style_ax(ax3, "BUY/SELL RATIO")
+
+        # 4. RSI
+        ax4 = a["ax4"] = fig.add_subplot(gs[2, 0])
+        a["rsi"], = ax4.plot(np.arange(len(d["rsi"])), d["rsi"], color=t["blue"], lw=1.5)
+        ax4.axhline(70, color=t["b"], ls="--", lw=0.8, alpha=0.6)
+        ax4.axhline(30, color=t["a"], ls="--", lw=0.8, alpha=0.6)
+        ax4.set_ylim(0, 100); ax4.set_xticks([])
+        self._style_ax(ax4, "RSI (9)")
+
+        # 5. MACD
+        ax5 = a["ax5"] = fig.add_subplot(gs[2, 1])
+        a["hist"]   = ax5.bar(np.arange(len(d["hist"])), d["hist"], alpha=0.8, width=0.85)
+        a["macd"],  = ax5.plot(np.arange(len(d["macd"])), d["macd"], color=t["p"], lw=1.4, label="MACD")
+        a["signal"], = ax5.plot(np.arange(len(d["signal"])), d["signal"], color=t["purple"],
+                                lw=1.4, label="Signal")
+        ax5.axhline(0, color="#3a4055", lw=0.5); ax5.set_xticks([])
+        ax5.legend(fontsize=7, **leyenda)
+        self._style_ax(ax5, "MACD (5,13,3)")
+
+        # 6. Stochastic
+        ax6 = a["ax6"] = fig.add_subplot(gs[2, 2])
+        a["stoch_k"], = ax6.plot(np.arange(len(d["stoch_k"])), d["stoch_k"], color=t["a"],
+                                 lw=1.4, label="%K")
+        a["stoch_d"], = ax6.plot(np.arange(len(d["stoch_d"])), d["stoch_d"], color=t["b"],
+                                 lw=1.4, label="%D")
+        ax6.axhline(80, color=t["b"], ls="--", lw=0.7, alpha=0.5)
+        ax6.axhline(20, color=t["a"], ls="--", lw=0.7, alpha=0.5)
+        ax6.set_ylim(0, 100); ax6.set_xticks([])
+        ax6.legend(fontsize=7, **leyenda)
+        self._style_ax(ax6, "STOCHASTIC (5,3)")
+
+        # 7. Gauge
+        ax7 = a["ax7"] = fig.add_subplot(gs[3, 0])
+        ax7.set_facecolor(t["pan"]); ax7.set_aspect("equal")
+        theta = np.linspace(np.pi, 0, 300)
+        ax7.plot(np.cos(theta), np.sin(theta), color="#141820", lw=22, solid_capstyle="round")
+        a["arco"], = ax7.plot([], [], lw=22, solid_capstyle="round")
+        a["prob"]  = ax7.text(0, 0.2, "", ha="center", va="center",
+                              fontsize=26, fontweight="bold", fontfamily="monospace")
+        ax7.text(0, -0.05, "PROB SUBIDA", ha="center", va="center",
+                 fontsize=7.5, color="#8892a4", fontfamily="monospace")
+        ax7.text(-1.05, -0.18, "0%",   color="#3a4055", fontsize=7, fontfamily="monospace")
+        ax7.text(0.75,  -0.18, "100%", color="#3a4055", fontsize=7, fontfamily="monospace")
+        ax7.set_xlim(-1.3, 1.3); ax7.set_ylim(-0.3, 1.2); ax7.axis("off")
+        for sp in ax7.spines.values():
+            sp.set_color(t["grid"])
+
+        # 8. Scores
+        ax8 = a["ax8"] = fig.add_subplot(gs[3, 1:])
+        n = len(d["nombres"])
+        a["scores"] = ax8.barh(np.arange(n), d["scores"], alpha=0.85, height=0.65)
+        ax8.set_yticks(np.arange(n))
+        ax8.set_yticklabels(d["nombres"], fontsize=7, color="#8892a4", fontfamily="monospace")
+        ax8.axvline(0, color="#2a3040", lw=0.8); ax8.set_xlim(-1.2, 1.2)
+        ax8.set_xlabel("← BAJISTA  ·  ALCISTA →", color="#4a5568", fontsize=7.5,
+                       fontfamily="monospace")
+        self._style_ax(ax8, "SCORE POR INDICADOR")
+
+        a["titulo"] = fig.suptitle("", color="#4a5568", fontsize=9, fontfamily="monospace",
+                                   y=1.01, fontweight="bold")
+        a["rellenos"] = []
+        self.fig, self._art, self._forma = fig, a, _forma(d)
+
+    def actualizar(self, d: dict):
+        """Vuelca `d` (de datos_graficos) en la figura, reconstruyéndola si hace falta."""
+        if self.fig is None or _forma(d) != self._forma:
+            self._construir(d)
+        t, a = self.tema, self._art
+
+        for r in a["rellenos"]:
+            r.remove()
+        x80, x60 = np.arange(len(d["close"])), np.arange(len(d["rsi"]))
+        rsi = d["rsi"]
+        a["rellenos"] = [
+            a["ax1"].fill_between(x80, d["bb_sup"], d["bb_inf"], alpha=0.06, color=t["p"]),
+            a["ax4"].fill_between(x60, rsi, 70, where=rsi > 70, alpha=0.12, color=t["b"]),
+            a["ax4"].fill_between(x60, rsi, 30, where=rsi < 30, alpha=0.12, color=t["a"]),
+        ]
+
+        for k in ("bb_sup", "bb_inf", "close", "ema7", "ema25", "vol_ma",
+                  "rsi", "macd", "signal", "stoch_k", "stoch_d"):
+            a[k].set_ydata(d[k])
+        a["precio"].set_ydata([d["precio"], d["precio"]])
+
+        def _barras(cont, valores, colores, horizontal=False):
+            for rect, v, c in zip(cont.patches, valores, colores):
+                (rect.set_width if horizontal else rect.set_height)(v)
+                rect.set_color(c)
+
+        _barras(a["vol"], d["vol"],
+                [t["a"] if tb >= v * 0.5 else t["b"] for tb, v in zip(d["taker"], d["vol"])])
+        _barras(a["ratio"], d["ratio"] - 50,
+                [t["a"] if v > 50 else t["b"] for v in d["ratio"]])
+        _barras(a["hist"], d["hist"], [t["a"] if v >= 0 else t["b"] for v in d["hist"]])
+        _barras(a["scores"], d["scores"],
+                [t["a"] if v > 0 else (t["b"] if v < 0 else "#2a3040") for v in d["scores"]],
+                horizontal=True)
+
+        for ax in (a["ax1"], a["ax2"], a["ax3"], a["ax5"]):
+            ax.relim()
+            ax.autoscale_view()
+
+        # Gauge
+        prob = d["prob_up"]
+        gc = t["a"] if prob > 55 else (t["b"] if prob < 45 else t["p"])
+        theta2 = np.linspace(np.pi, np.pi - (prob / 100) * np.pi, 300)
+        a["arco"].set_data(np.cos(theta2), np.sin(theta2))
+        a["arco"].set_color(gc)
+        a["prob"].set_text(f"{prob:.1f}%")
+        a["prob"].set_color(gc)
+        a["ax7"].set_title(f"SEÑAL: {d['direccion']}", color="#6b7894",
+                           fontsize=9, fontfamily="monospace", pad=5, fontweight="bold")
+
+        a["ax1"].set_title(f"PRECIO 1M — {d['sym']}  |  EMA7 · EMA25 · BOLLINGER (20)",
+                           color="#6b7894", fontsize=9, fontfamily="monospace",
+                           pad=5, fontweight="bold")
+        a["titulo"].set_text(d["titulo"])
+
+    def png(self, dpi: int = 200) -> bytes:
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+        return buf.getvalue()
+
+
+# ─────────────────────────────────────────────
+# RENDER CACHEADO
+# ─────────────────────────────────────────────
+class RenderizadorGraficos:
+    """
+    PNG del panel por huella de datos + tema, con cache LRU compartida.
+    Un solo lienzo (protegido por lock) se reutiliza entre renders.
+    Tiempos: `ultimo_render` (s), `tiempo_total` (s) y `renders`.
+    """
+
+    def __init__(self, tema: dict = TEMA, max_items: int = 32, dpi: int = 200):
+        self.tema   = tema
+        self.dpi    = dpi
+        self.cache  = CacheLRU(max_items)
+        METRICAS.registrar_cache("graficos", self.cache)
+        self._lienzo = LienzoAnalisis(tema)
+        self._lock   = threading.Lock()
+        self.renders = 0
+        self.ultimo_render = 0.0
+        self.tiempo_total  = 0.0
+
+    def _render(self, datos: dict) -> bytes:
+        with self._lock:
+            t0 = time.perf_counter()
+            with tramo("graficos.dibujar"):
+                self._lienzo.actualizar(datos)
+            with tramo("graficos.png"):
+                png = self._lienzo.png(self.dpi)
+            dt = time.perf_counter() - t0
+            self.renders      += 1
+            self.ultimo_render = dt
+            self.tiempo_total += dt
+        return png
+
+    def render(self, datos: dict) -> bytes:
+        """PNG del panel; solo se dibuja si la huella no está en cache."""
+        with tramo("graficos.huella"):
+            clave = huella(datos, self.tema)
+        return self.cache.obtener(clave, lambda: self._render(datos))
+
+    def estadisticas(self) -> dict:
+        return {
+            "renders":       self.renders,
+            "hits":          self.cache.hits,
+            "misses":        self.cache.misses,
+            "ultimo_render": self.ultimo_render,
+            "medio_render":  self.tiempo_total / self.renders if self.renders else 0.0,
+        }
@@ -0,0 +1,172 @@
+"""
+Instantánea — Crypto Predictor 5min
+════════════════════════════════════
+Capa única de datos de mercado del proceso: las últimas velas cerradas
+por (par, intervalo) y el ticker 24h por par. El scan rápido, el scanner
+incremental, el análisis completo, el seguimiento en vivo y los gráficos
+(que pintan lo que devuelve el análisis) leen de aquí, así que lo que
+descarga un camino lo aprovechan los demás mientras siga fresco.
+
+  inst = Instantaneas()
+  usar_instantaneas(inst)          # crypto_predictor lee a través de ella
+  ServicioScan(..., instantaneas=inst)   # el scanner publica sus velas
+
+Vigencia:
+  • velas  — hasta que puede haber cerrado la vela siguiente a la última
+             guardada (última + 2·intervalo, la misma regla que
+             SeguimientoVivo); después se vuelven a pedir.
+  • ticker — `vigencia_ticker` segundos (el precio sí cambia entre velas).
+
+Con un scan reciente, pulsar un chip ya no vuelve a pedir las velas 1m:
+solo los marcos 5m/15m/1h que falten, el ticker y la microestructura
+(book, trades, derivados).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from crypto_predictor import _kraken_ohlc
+from metricas import METRICAS
+
+_PETICIONES = METRICAS.contador(
+    "crypto_instantanea_total",
+    "Lecturas de la instantánea de mercado por tipo (velas, ticker) y resultado "
+    "(fresca, descarga, publicada)", ("tipo", "resultado"))
+
+
+class Instantaneas:
+    """
+    Velas y tickers compartidos entre hilos, acotados a `max_items`
+    entradas con expulsión LRU. Las velas 1m se descargan siempre con al
+    menos `min_velas` filas para que el scan (60) y el análisis (100) se
+    sirvan de la misma descarga. Cada clave se descarga una sola vez
+    aunque la pidan varios hilos a la vez (single-flight).
+
+    Expone hits/misses/evictions y len() como CacheLRU, para
+    METRICAS.registrar_cache.
+    """
+
+    def __init__(self, vigencia_ticker: float = 5.0, min_velas: int = 100,
+                 max_items: int = 2048):
+        self.vigencia_ticker = vigencia_ticker
+        self.min_velas = min_velas
+        self.max_items = max_items
+        self._velas    = OrderedDict()     # (pair, intervalo) → DataFrame
+        self._tickers  = OrderedDict()     # pair → (raw, time.time())
+        self._lock     = threading.Lock()
+        self._descargas = {}               # clave → Lock de la descarga en curso
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._velas) + len(self._tickers)
+
+    # ── Internos ──
+    @staticmethod
+    def _fresca(df, intervalo: int, ahora: float) -> bool:
+        return ahora < df.index[-1].timestamp() + 2 * intervalo * 60
+
+    def _guardar(self, tabla: OrderedDict, clave, valor):
+        with self._lock:
+            tabla[clave] = valor
+            tabla.move_to_end(clave)
+            while len(tabla) > self.max_items:
+                tabla.popitem(last=False)
+                self.evictions += 1
+
+    def _leer(self, tabla: OrderedDict, clave):
+        with self._lock:
+            valor = tabla.get(clave)
+            if valor is not None:
+                tabla.move_to_end(clave)
+            return valor
+
+    @contextmanager
+    def _descarga(self, clave):
+        """
+        Turno exclusivo para descargar `clave`. El candado se retira al
+        terminar (quien ya esperaba en él encuentra el dato guardado), así
+        que solo hay uno por descarga en curso.
+        """
+        with self._lock:
+            candado = self._descargas.setdefault(clave, threading.Lock())
+        with candado:
+            try:
+                yield
+            finally:
+                with self._lock:
+                    if self._descargas.get(clave) is candado:
+                        del self._descargas[clave]
+
+    def _acierto(self, tipo: str, acierto: bool):
+        with self._lock:
+            if acierto:
+                self.hits += 1
+            else:
+                self.misses += 1
+        _PETICIONES.inc(tipo=tipo, resultado="fresca" if acierto else "descarga")
+
+    # ── Velas ──
+    def _velas_frescas(self, pair: str, intervalo: int, n: int):
+        df = self._leer(self._velas, (pair, intervalo))
+        if df is not None and len(df) >= n and self._fresca(df, intervalo, time.time()):
+            return df
+        return None
+
+    def velas(self, pair: str, intervalo: int, n: int):
+        """Últimas `n` velas cerradas (copia) o None si Kraken no las da."""
+        df = self._velas_frescas(pair, intervalo, n)
+        if df is None:
+            with self._descarga(("velas", pair, intervalo)):
+                df = self._velas_frescas(pair, intervalo, n)
+                if df is None:
+                    self._acierto("velas", False)
+                    pedir = max(n, self.min_velas) if intervalo == 1 else n
+                    df = _kraken_ohlc(pair, intervalo, pedir)
+                    if df is None:
+                        return None
+                    self._guardar(self._velas, (pair, intervalo), df)
+                    return df.iloc[-n:].copy()
+        self._acierto("velas", True)
+        return df.iloc[-n:].copy()
+
+    def publicar_velas(self, pair: str, intervalo: int, df):
+        """Guarda velas descargadas por otro camino (p. ej. el scanner incremental)."""
+        if df is None or not len(df):
+            return
+        previa = self._leer(self._velas, (pair, intervalo))
+        # No sustituir una ventana más larga e igual de reciente por una más corta
+        if previa is not None and previa.index[-1] >= df.index[-1] and len(previa) >= len(df):
+            return
+        self._guardar(self._velas, (pair, intervalo), df)
+        _PETICIONES.inc(tipo="velas", resultado="publicada")
+
+    # ── Ticker ──
+    def _ticker_fresco(self, pair: str):
+        ent = self._leer(self._tickers, pair)
+        if ent is not None and time.time() - ent[1] < self.vigencia_ticker:
+            return ent[0]
+        return None
+
+    def ticker(self, pair: str, pedir):
+        """Ticker 24h del par; `pedir()` lo descarga si el guardado caducó."""
+        raw = self._ticker_fresco(pair)
+        if raw is None:
+            with self._descarga(("ticker", pair)):
+                raw = self._ticker_fresco(pair)
+                if raw is None:
+                    self._acierto("ticker", False)
+                    raw = pedir()
+                    if raw:
+                        self._guardar(self._tickers, pair, (raw, time.time()))
+                    return raw
+        self._acierto("ticker", True)
+        return raw
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"velas": len(self._velas), "tickers": len(self._tickers),
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
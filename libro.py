@@ -0,0 +1,260 @@
+"""
+Libro — Crypto Predictor 5min
+══════════════════════════════
+Analítica de order book sobre arrays numpy (precio / tamaño por lado):
+imbalance ponderado por distancia al mid, curvas de profundidad
+acumulada, muros de liquidez y slippage para un nocional dado.
+Los books de varios venues se fusionan en un book consolidado con el
+venue de cada nivel (mejor bid/ask cruzado, spread de arbitraje).
+Todo vectorizado; sin llamadas de red (los books los descarga
+crypto_predictor).
+"""
+
+import numpy as np
+
+
+class Libro:
+    """
+    Book en arrays: bids de mejor a peor (precio decreciente), asks de
+    mejor a peor (precio creciente). `fuente` indica el venue.
+    """
+
+    __slots__ = ("bid_px", "bid_sz", "ask_px", "ask_sz", "fuente")
+
+    def __init__(self, bid_px, bid_sz, ask_px, ask_sz, fuente: str = ""):
+        self.bid_px = np.asarray(bid_px, dtype=float)
+        self.bid_sz = np.asarray(bid_sz, dtype=float)
+        self.ask_px = np.asarray(ask_px, dtype=float)
+        self.ask_sz = np.asarray(ask_sz, dtype=float)
+        self.fuente = fuente
+
+    @classmethod
+    def desde_dict(cls, book: dict) -> "Libro":
+        """{"bids": [[px, sz], …], "asks": […], "source"} → Libro."""
+        bids = np.array([b[:2] for b in book.get("bids", [])], dtype=float).reshape(-1, 2)
+        asks = np.array([a[:2] for a in book.get("asks", [])], dtype=float).reshape(-1, 2)
+        return cls(bids[:, 0], bids[:, 1], asks[:, 0], asks[:, 1], book.get("source", ""))
+
+    @property
+    def vacio(self) -> bool:
+        return not (len(self.bid_px) and len(self.ask_px))
+
+    @property
+    def mid(self) -> float:
+        return (self.bid_px[0] + self.ask_px[0]) / 2
+
+    @property
+    def spread_bps(self) -> float:
+        return (self.ask_px[0] - self.bid_px[0]) / self.mid * 1e4
+
+    def distancias_bps(self):
+        """Distancia de cada nivel al mid en puntos básicos: (bids, asks)."""
+        m = self.mid
+        return (m - self.bid_px) / m * 1e4, (self.ask_px - m) / m * 1e4
+
+
+# ─────────────────────────────────────────────
+# BOOK CONSOLIDADO MULTI-VENUE
+# ─────────────────────────────────────────────
+class LibroConsolidado(Libro):
+    """
+    Libro con los niveles de varios venues fusionados. bid_venue/ask_venue
+    dan, por nivel, el índice en `venues` del venue que lo aporta.
+    """
+
+    __slots__ = ("bid_venue", "ask_venue", "venues")
+
+
+def _fusionar(px_lados, sz_lados, descendente: bool):
+    """
+    K-way merge de lados ya ordenados: concatenados, un argsort estable
+    (timsort) recorre los k tramos ordenados fusionándolos en O(n log k).
+    Devuelve (precios, tamaños, índice de venue por nivel).
+    """
+    px  = np.concatenate(px_lados)
+    sz  = np.concatenate(sz_lados)
+    ven = np.concatenate([np.full(len(p), i) for i, p in enumerate(px_lados)])
+    orden = np.argsort(-px if descendente else px, kind="stable")
+    return px[orden], sz[orden], ven[orden]
+
+
+def consolidar(libros: dict) -> LibroConsolidado:
+    """{venue: Libro} → LibroConsolidado (vacíos descartados)."""
+    libros = {v: l for v, l in libros.items() if not l.vacio}
+    venues = list(libros)
+    bid_px, bid_sz, bid_v = _fusionar([l.bid_px for l in libros.values()],
+                                      [l.bid_sz for l in libros.values()], True)
+    ask_px, ask_sz, ask_v = _fusionar([l.ask_px for l in libros.values()],
+                                      [l.ask_sz for l in libros.values()], False)
+    lc = LibroConsolidado(bid_px, bid_sz, ask_px, ask_sz, "+".join(venues))
+    lc.bid_venue, lc.ask_venue, lc.venues = bid_v, ask_v, venues
+    return lc
+
+
+def desde_book(book: dict) -> Libro:
+    """
+    Libro de un book de descargar_datos: consolidado si trae los books de
+    más de un venue en "venues", si no el del venue principal.
+    """
+    venues = book.get("venues") or {}
+    if len(venues) > 1:
+        return consolidar({v: Libro.desde_dict(b) for v, b in venues.items()})
+    return Libro.desde_dict(book)
+
+
+def cruce_venues(lc: LibroConsolidado) -> dict:
+    """
+    Mejor bid y mejor ask entre venues y spread de arbitraje
+    (mejor bid − mejor ask, en pb del mid): positivo = book cruzado entre
+    venues, se podría comprar en uno y vender en otro.
+    """
+    if lc.vacio:
+        return {}
+    arb = (lc.bid_px[0] - lc.ask_px[0]) / lc.mid * 1e4
+    return {
+        "best_bid":      float(lc.bid_px[0]),
+        "venue_bid":     lc.venues[lc.bid_venue[0]],
+        "best_ask":      float(lc.ask_px[0]),
+        "venue_ask":     lc.venues[lc.ask_venue[0]],
+        "arbitraje_bps": float(arb),
+        "cruzado":       bool(arb > 0),
+    }
+
+
+def reparto_venues(lc: LibroConsolidado, max_bps: float = 25.0) -> dict:
+    """Cuota de cada venue en el nocional a ±max_bps del mid: {venue: (bid %, ask %)}."""
+    if lc.vacio:
+        return {}
+    d_bid, d_ask = lc.distancias_bps()
+    res = {}
+    for lado, d, px, sz, ven in (("bid", d_bid, lc.bid_px, lc.bid_sz, lc.bid_venue),
+                                 ("ask", d_ask, lc.ask_px, lc.ask_sz, lc.ask_venue)):
+        banda = d <= max_bps
+        por_venue = np.bincount(ven[banda], weights=(px * sz)[banda],
+                                minlength=len(lc.venues))
+        total = por_venue.sum()
+        res[lado] = por_venue / total * 100 if total > 0 else por_venue
+    return {v: (float(res["bid"][i]), float(res["ask"][i])) for i, v in enumerate(lc.venues)}
+
+
+# ─────────────────────────────────────────────
+# IMBALANCE PONDERADO
+# ─────────────────────────────────────────────
+def imbalance_ponderado(libro: Libro, escala_bps: float = 25.0,
+                        max_bps: float = 100.0) -> float:
+    """
+    (bid − ask) / (bid + ask) × 100 con cada nivel pesado por
+    exp(−distancia / escala_bps); los niveles a más de max_bps del mid no
+    cuentan. Un muro lejano pesa menos que la misma liquidez en el top.
+    """
+    if libro.vacio:
+        return 0.0
+    d_bid, d_ask = libro.distancias_bps()
+    w_bid = np.where(d_bid <= max_bps, np.exp(-d_bid / escala_bps), 0.0)
+    w_ask = np.where(d_ask <= max_bps, np.exp(-d_ask / escala_bps), 0.0)
+    bid = (libro.bid_sz * w_bid).sum()
+    ask = (libro.ask_sz * w_ask).sum()
+    total = bid + ask
+    return float((bid - ask) / total * 100) if total > 0 else 0.0
+
+
+# ─────────────────────────────────────────────
+# PROFUNDIDAD ACUMULADA
+# ─────────────────────────────────────────────
+def curva_profundidad(libro: Libro, bps=(5, 10, 25, 50, 100)) -> dict:
+    """
+    Nocional (en moneda cotizada) acumulado a cada distancia del mid.
+    {"bps": array, "bid": array, "ask": array}. Si el book no llega a una
+    distancia, el valor es el total visible de ese lado.
+    """
+    bps = np.asarray(bps, dtype=float)
+    if libro.vacio:
+        return {"bps": bps, "bid": np.zeros_like(bps), "ask": np.zeros_like(bps)}
+    d_bid, d_ask = libro.distancias_bps()
+    res = {"bps": bps}
+    for lado, d, px, sz in (("bid", d_bid, libro.bid_px, libro.bid_sz),
+                            ("ask", d_ask, libro.ask_px, libro.ask_sz)):
+        acum = np.concatenate([[0.0], np.cumsum(px * sz)])
+        res[lado] = acum[np.searchsorted(d, bps, side="right")]
+    return res
+
+
+# ─────────────────────────────────────────────
+# MUROS DE LIQUIDEZ
+# ─────────────────────────────────────────────
+def muros_liquidez(libro: Libro, factor: float = 4.0, max_bps: float = 200.0,
+                   max_muros: int = 3) -> dict:
+    """
+    Niveles con tamaño ≥ factor × mediana de su lado dentro de max_bps.
+    {"bid": [(precio, tamaño, dist_bps, veces_mediana)], "ask": […]},
+    cada lado ordenado del muro más cercano al más lejano.
+    """
+    res = {"bid": [], "ask": []}
+    if libro.vacio:
+        return res
+    d_bid, d_ask = libro.distancias_bps()
+    for lado, d, px, sz in (("bid", d_bid, libro.bid_px, libro.bid_sz),
+                            ("ask", d_ask, libro.ask_px, libro.ask_sz)):
+        banda = d <= max_bps
+        if banda.sum() < 5:
+            continue
+        mediana = np.median(sz[banda])
+        if mediana <= 0:
+            continue
+        idx = np.flatnonzero(banda & (sz >= factor * mediana))[:max_muros]
+        res[lado] = [(float(px[i]), float(sz[i]), float(d[i]), float(sz[i] / mediana))
+                     for i in idx]
+    return res
+
+
+# ─────────────────────────────────────────────
+# SLIPPAGE
+# ─────────────────────────────────────────────
+def slippage(libro: Libro, nocional, lado: str = "compra") -> dict:
+    """
+    Ejecución a mercado de `nocional` (escalar o array, moneda cotizada)
+    contra el book visible. "compra" consume asks, "venta" bids.
+    Devuelve arrays: "precio_medio", "slippage_bps" (frente al mid) y
+    "lleno" (False si el book visible no alcanza; el precio medio es
+    entonces el de lo que sí se llenaría).
+    """
+    nocional = np.atleast_1d(np.asarray(nocional, dtype=float))
+    px, sz = (libro.ask_px, libro.ask_sz) if lado == "compra" else (libro.bid_px, libro.bid_sz)
+    if libro.vacio or not len(px):
+        nan = np.full_like(nocional, np.nan)
+        return {"precio_medio": nan, "slippage_bps": nan, "lleno": np.zeros(len(nocional), bool)}
+    acum_not = np.cumsum(px * sz)
+    acum_sz  = np.cumsum(sz)
+    lleno = nocional <= acum_not[-1]
+    n_ok  = np.minimum(nocional, acum_not[-1])
+    # Nivel donde se completa cada nocional y parte ejecutada en él
+    i = np.minimum(np.searchsorted(acum_not, n_ok, side="left"), len(px) - 1)
+    previo_not = np.where(i > 0, acum_not[i - 1], 0.0)
+    previo_sz  = np.where(i > 0, acum_sz[i - 1], 0.0)
+    base = previo_sz + (n_ok - previo_not) / px[i]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        medio = np.where(base > 0, n_ok / base, np.nan)
+    signo = 1 if lado == "compra" else -1
+    return {"precio_medio": medio,
+            "slippage_bps": signo * (medio - libro.mid) / libro.mid * 1e4,
+            "lleno": lleno}
+
+
+def resumen_libro(libro: Libro, nocionales=(10_000, 50_000, 250_000)) -> dict:
+    """Todo lo anterior para un book, listo para indicadores y la pestaña Order Book."""
+    res = {
+        "fuente":     libro.fuente,
+        "niveles":    (len(libro.bid_px), len(libro.ask_px)),
+        "mid":        libro.mid if not libro.vacio else None,
+        "spread_bps": libro.spread_bps if not libro.vacio else None,
+        "obi_pond":   imbalance_ponderado(libro),
+        "profundidad": curva_profundidad(libro),
+        "muros":      muros_liquidez(libro),
+        "nocionales": np.asarray(nocionales, dtype=float),
+        "slip_compra": slippage(libro, nocionales, "compra"),
+        "slip_venta":  slippage(libro, nocionales, "venta"),
+    }
+    if isinstance(libro, LibroConsolidado):
+        res["cruce"]   = cruce_venues(libro)
+        res["reparto"] = reparto_venues(libro)
+    return res
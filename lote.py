@@ -0,0 +1,116 @@
+"""
+Lote — Crypto Predictor 5min
+═════════════════════════════
+Análisis completo (descargar_datos → calcular_indicadores →
+calcular_prediccion) de muchos símbolos en un solo proceso, en paralelo.
+Salida: una línea NDJSON por símbolo según termina, o un fichero
+Arrow/Parquet (requiere pyarrow).
+
+  python lote.py BTC ETH SOL
+  python lote.py all --workers 16 > snapshot.ndjson
+  python lote.py all --salida snapshot.parquet
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from crypto_predictor import (
+    descargar_datos, calcular_indicadores, calcular_prediccion, CacheIntermedios,
+    _kraken_pares_usd,
+)
+from api import _json_seguro
+
+
+def analizar_symbol(symbol: str) -> dict:
+    """Fila plana con la predicción de un símbolo (o su error)."""
+    t0 = time.time()
+    df, df5, book, futures_data, info, error, df15, df1h = descargar_datos(symbol)
+    if error or df is None:
+        return {"symbol": symbol, "ts": t0, "error": error or "sin datos"}
+    indicadores, _, puntuaciones, atr_pct, regimen, h_val = calcular_indicadores(
+        df, df5, book, futures_data, info, df15, df1h, cache=CacheIntermedios())
+    pred = calcular_prediccion(puntuaciones, info["precio_actual"], indicadores,
+                               regimen=regimen, fng_data=futures_data)
+    return {
+        "symbol":       symbol,
+        "par":          info["nombre"],
+        "ts":           t0,
+        "error":        None,
+        "precio":       info["precio_actual"],
+        "cambio_pct":   info["cambio_pct"],
+        "prob_subida":  pred["prob_subida"],
+        "score":        pred["score"],
+        "direccion":    pred["direccion"],
+        "señal":        pred["señal_texto"],
+        "precio_objetivo": pred["precio_objetivo"],
+        "mov_estimado": pred["mov_estimado"],
+        "atr_pct":      atr_pct,
+        "regimen":      regimen,
+        "hurst":        h_val,
+        "puntuaciones": puntuaciones,
+        "duracion":     time.time() - t0,
+    }
+
+
+def _seguro(symbol: str) -> dict:
+    try:
+        return analizar_symbol(symbol)
+    except Exception as e:
+        return {"symbol": symbol, "ts": time.time(), "error": str(e)}
+
+
+def ejecutar(symbols, workers: int = 8):
+    """Genera las filas según terminan (orden de llegada, no de entrada)."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lote") as pool:
+        for fut in as_completed([pool.submit(_seguro, s) for s in symbols]):
+            yield fut.result()
+
+
+def _escribir_arrow(filas: list, ruta: str):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        sys.exit("Para --salida .parquet/.arrow hace falta pyarrow (pip install pyarrow)")
+    # Las filas con error no tienen todas las columnas: unión de claves
+    claves = list(dict.fromkeys(k for f in filas for k in f))
+    tabla = pa.Table.from_pylist([_json_seguro({k: f.get(k) for k in claves})
+                                  for f in filas])
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pq.write_table(tabla, ruta)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(tabla, ruta)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Predicción por lotes (NDJSON / Arrow / Parquet)")
+    ap.add_argument("symbols", nargs="+", help='símbolos (BTC ETH …) o "all"')
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--salida", help="fichero .parquet o .arrow (por defecto NDJSON a stdout)")
+    args = ap.parse_args(argv)
+
+    symbols = args.symbols
+    if [s.lower() for s in symbols] == ["all"]:
+        symbols = [base for _, base in _kraken_pares_usd()]
+        if not symbols:
+            sys.exit("No se pudo obtener la lista de pares de Kraken")
+
+    t0, filas, errores = time.time(), [], 0
+    for fila in ejecutar(symbols, args.workers):
+        errores += fila["error"] is not None
+        if args.salida:
+            filas.append(fila)
+        else:
+            print(json.dumps(_json_seguro(fila), ensure_ascii=False), flush=True)
+    if args.salida:
+        _escribir_arrow(filas, args.salida)
+    print(f"{len(symbols)} símbolos · {errores} errores · {time.time() - t0:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Métricas — Crypto Predictor 5min
+═════════════════════════════════
+Registro de métricas del proceso en formato de texto de Prometheus:
+contadores e histogramas con etiquetas, más recolectores que se leen al
+hacer scrape (las caches exponen sus hits / misses / evictions sin coste
+en el camino caliente).
+
+  METRICAS.contador("x_total", "ayuda", ("endpoint",)).inc(endpoint="…")
+  METRICAS.histograma("x_segundos", "ayuda", ("endpoint",)).observar(0.2, endpoint="…")
+  METRICAS.registrar_cache("analisis", cache)
+  ServidorMetricas(9108).iniciar()      # GET /metrics en 127.0.0.1:9108
+
+crypto_predictor lo usa en _get (latencia y estado por endpoint,
+timeouts, respuestas que no son JSON) y en _safe_call (excepciones al
+interpretar una fuente).
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cubos de latencia por defecto (s)
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador:
+    """Contador monótono por combinación de etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._lock    = threading.Lock()
+        self._valores = {}
+
+    def inc(self, n: float = 1, **etiquetas):
+        clave = tuple(etiquetas.get(e, "") for e in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + n
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(tuple(etiquetas.get(e, "") for e in self.etiquetas), 0)
+
+    def exponer(self) -> list:
+        with self._lock:
+            valores = dict(self._valores)
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {v}"
+                for k, v in sorted(valores.items())]
+
+
+class Histograma:
+    """Histograma de cubos fijos (acumulados al exponer) por combinación de etiquetas."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), limites=LIMITES_LATENCIA):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._lock   = threading.Lock()
+        self._series = {}                # etiquetas → [cuentas por cubo…, suma]
+
+    def observar(self, valor: float, **etiquetas):
+        clave = tuple(etiquetas.get(e, "") for e in self.etiquetas)
+        i = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            s = self._series.get(clave)
+            if s is None:
+                s = self._series[clave] = [0] * (len(self.limites) + 2)
+            s[i] += 1
+            s[-1] += valor
+
+    def exponer(self) -> list:
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        lineas = []
+        for clave, s in sorted(series.items()):
+            acum = 0
+            for lim, n in zip(self.limites + ("+Inf",), s[:-1]):
+                acum += n
+                le = 'le="+Inf"' if lim == "+Inf" else f'le="{lim}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acum}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {s[-1]}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acum}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Métricas con nombre del proceso; contador()/histograma() son idempotentes."""
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._metricas = {}
+        self._caches   = {}
+
+    def _obtener(self, cls, nombre, ayuda, etiquetas, **kw):
+        with self._lock:
+            m = self._metricas.get(nombre)
+            if m is None:
+                m = self._metricas[nombre] = cls(nombre, ayuda, etiquetas, **kw)
+            return m
+
+    def contador(self, nombre: str, ayuda: str = "", etiquetas=()) -> Contador:
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre: str, ayuda: str = "", etiquetas=(),
+                   limites=LIMITES_LATENCIA) -> Histograma:
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, limites=limites)
+
+    def registrar_cache(self, nombre: str, cache):
+        """Expone hits/misses/evictions/items de una CacheLRU (se leen al exponer)."""
+        with self._lock:
+            self._caches[nombre] = cache
+
+    def _exponer_caches(self) -> list:
+        with self._lock:
+            caches = dict(self._caches)
+        if not caches:
+            return []
+        lineas = []
+        for campo, tipo, ayuda in (("hits", "counter", "Aciertos de cache"),
+                                   ("misses", "counter", "Fallos de cache"),
+                                   ("evictions", "counter", "Expulsiones LRU"),
+                                   ("items", "gauge", "Entradas en cache")):
+            nombre = f"crypto_cache_{campo}" + ("_total" if tipo == "counter" else "")
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+            for n, c in sorted(caches.items()):
+                v = len(c) if campo == "items" else getattr(c, campo)
+                lineas.append(f'{nombre}{{cache="{_escapar(n)}"}} {v}')
+        return lineas
+
+    def exponer(self) -> str:
+        """Todo el registro en formato de texto de Prometheus (0.0.4)."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for m in metricas:
+            lineas += [f"# HELP {m.nombre} {m.ayuda}", f"# TYPE {m.nombre} {m.tipo}"]
+            lineas += m.exponer()
+        lineas += self._exponer_caches()
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = RegistroMetricas()
+
+
+class ServidorMetricas:
+    """GET /metrics con METRICAS en un hilo daemon (solo local por defecto)."""
+
+    def __init__(self, puerto: int = 9108, host: str = "127.0.0.1",
+                 registro: RegistroMetricas = METRICAS):
+        self.host, self.puerto = host, puerto
+        self.registro = registro
+        self.httpd = None
+
+    def _manejador(self):
+        registro = self.registro
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0].rstrip("/") not in ("/metrics", ""):
+                    self.send_error(404)
+                    return
+                datos = registro.exponer().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return _Manejador
+
+    def iniciar(self):
+        """Arranca el servidor (idempotente); OSError si el puerto está ocupado."""
+        if self.httpd is None:
+            self.httpd = ThreadingHTTPServer((self.host, self.puerto), self._manejador())
+            self.httpd.daemon_threads = True
+            threading.Thread(target=self.httpd.serve_forever, name="metricas-http",
+                             daemon=True).start()
+        return self
+
+    def detener(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,196 @@
+"""
+Registro de predicciones — Crypto Predictor 5min
+═════════════════════════════════════════════════
+Guarda cada predicción emitida (hora, precio, prob_subida, score, régimen
+y el vector de puntuaciones de los indicadores) en ficheros columnares
+de solo añadir, para cruzarlas después con el precio realizado.
+
+registrar() solo encola una tupla (cola acotada, sin bloquear: si está
+llena la fila se descarta y se cuenta); un hilo escritor agrupa las filas
+en bloques y las escribe:
+  • Parquet (si hay pyarrow) — un row group por bloque; el fichero se
+    rota por número de filas o por tiempo y mientras está abierto lleva
+    la extensión .parquet.tmp, así que los lectores solo ven ficheros
+    completos.
+  • .npz — sin pyarrow, cada bloque es un np.savez_compressed de columnas.
+
+leer_registro(directorio) junta todo en un DataFrame.
+"""
+
+import atexit
+import glob
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from crypto_predictor import _INDICADORES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Columnas fijas; las puntuaciones van en "punt.<indicador>"
+_COLUMNAS = (("ts", float), ("symbol", str), ("precio", float), ("prob_subida", float),
+             ("score", float), ("direccion", str), ("regimen", str), ("hurst", float),
+             ("atr_pct", float), ("precio_objetivo", float), ("mov_estimado", float))
+
+
+class RegistroPredicciones:
+    """
+    Escritor asíncrono de predicciones en `directorio`.
+      registrar(symbol, analisis) — encola (no bloquea nunca)
+      vaciar()                    — espera a que lo encolado esté escrito
+      detener()                   — escribe lo pendiente y cierra el fichero
+    `formato` es "parquet" o "npz"; por defecto parquet si hay pyarrow.
+    """
+
+    def __init__(self, directorio: str = "predicciones", max_cola: int = 10_000,
+                 filas_bloque: int = 512, espera: float = 5.0,
+                 filas_fichero: int = 200_000, rotar_cada: float = 3600.0,
+                 formato: str = None):
+        self.directorio    = directorio
+        self.filas_bloque  = filas_bloque
+        self.espera        = espera
+        self.filas_fichero = filas_fichero
+        self.rotar_cada    = rotar_cada
+        self.formato       = formato or ("parquet" if pa is not None else "npz")
+        self.indicadores   = list(_INDICADORES)
+        self._cola     = queue.Queue(maxsize=max_cola)
+        self._ultimo   = {}                  # symbol → ts de la última predicción encolada
+        self._escritor = None
+        self._ruta     = None
+        self._filas_abiertas = 0
+        self._abierto_ts     = 0.0
+        self._bloques  = 0
+        self.escritas  = 0
+        self.descartadas = 0
+        self._parar    = threading.Event()
+        self._hilo     = None
+
+    # ── Lado de la app: encolar ──
+    def registrar(self, symbol: str, analisis: dict) -> bool:
+        """
+        Encola la predicción de un análisis. Un mismo análisis (mismo "ts")
+        solo se registra una vez aunque se vuelva a pintar.
+        """
+        ts = analisis.get("ts")
+        if analisis.get("pred") is None or self._ultimo.get(symbol) == ts:
+            return False
+        self._ultimo[symbol] = ts
+        try:
+            self._cola.put_nowait((ts, symbol, analisis["pred"],
+                                   analisis["info"]["precio_actual"], analisis["regimen"],
+                                   analisis["hurst"], analisis["atr_pct"],
+                                   analisis["puntuaciones"]))
+            return True
+        except queue.Full:
+            self.descartadas += 1
+            return False
+
+    def vaciar(self):
+        self._cola.join()
+
+    # ── Hilo escritor ──
+    def _columnas(self, filas: list) -> dict:
+        cols = {n: [] for n, _ in _COLUMNAS}
+        for ts, symbol, pred, precio, regimen, hurst, atr_pct, punt in filas:
+            for n, v in (("ts", ts), ("symbol", symbol), ("precio", precio),
+                         ("prob_subida", pred["prob_subida"]), ("score", pred["score"]),
+                         ("direccion", pred["direccion"]), ("regimen", regimen),
+                         ("hurst", hurst), ("atr_pct", atr_pct),
+                         ("precio_objetivo", pred["precio_objetivo"]),
+                         ("mov_estimado", pred["mov_estimado"])):
+                cols[n].append(v)
+        res = {n: np.asarray(cols[n], dtype=float if t is float else object)
+               for n, t in _COLUMNAS}
+        for nombre in self.indicadores:
+            res[f"punt.{nombre}"] = np.array([f[7].get(nombre, np.nan) for f in filas],
+                                             dtype=float)
+        return res
+
+    def _nombre(self, extension: str) -> str:
+        sello = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.directorio, f"predicciones-{sello}-{self._bloques:05d}{extension}")
+
+    def _cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            os.replace(self._ruta, self._ruta[:-len(".tmp")])
+            self._escritor, self._ruta = None, None
+
+    def _escribir(self, filas: list):
+        cols = self._columnas(filas)
+        os.makedirs(self.directorio, exist_ok=True)
+        if self.formato == "npz":
+            ruta = self._nombre(".npz")
+            np.savez_compressed(ruta, **{k: (v.astype(str) if v.dtype == object else v)
+                                         for k, v in cols.items()})
+        else:
+            tabla = pa.table({k: (pa.array(v.tolist(), pa.string()) if v.dtype == object
+                                  else pa.array(v)) for k, v in cols.items()})
+            if self._escritor is not None and (
+                    self._filas_abiertas >= self.filas_fichero
+                    or time.time() - self._abierto_ts >= self.rotar_cada):
+                self._cerrar()
+            if self._escritor is None:
+                self._ruta = self._nombre(".parquet.tmp")
+                self._escritor = pq.ParquetWriter(self._ruta, tabla.schema, compression="zstd")
+                self._filas_abiertas, self._abierto_ts = 0, time.time()
+            self._escritor.write_table(tabla)
+            self._filas_abiertas += len(filas)
+        self._bloques += 1
+        self.escritas += len(filas)
+
+    def _bucle(self):
+        pendientes, ultimo = [], time.time()
+        while not (self._parar.is_set() and self._cola.empty()):
+            try:
+                pendientes.append(self._cola.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            if pendientes and (len(pendientes) >= self.filas_bloque or self._parar.is_set()
+                               or time.time() - ultimo >= self.espera):
+                try:
+                    self._escribir(pendientes)
+                except Exception:
+                    self.descartadas += len(pendientes)
+                for _ in pendientes:
+                    self._cola.task_done()
+                pendientes, ultimo = [], time.time()
+        self._cerrar()
+
+    def iniciar(self):
+        """Arranca el hilo escritor (idempotente)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="registro-escritor",
+                                          daemon=True)
+            self._hilo.start()
+            # Al salir del proceso, lo encolado se escribe y el parquet se cierra
+            atexit.register(self.detener)
+        return self
+
+    def detener(self):
+        """Escribe lo pendiente y cierra el fichero abierto."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+
+def leer_registro(directorio: str = "predicciones") -> pd.DataFrame:
+    """Todas las predicciones registradas (parquet y npz), ordenadas por ts."""
+    partes = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, "predicciones-*.parquet"))):
+        partes.append(pd.read_parquet(ruta))
+    for ruta in sorted(glob.glob(os.path.join(directorio, "predicciones-*.npz"))):
+        with np.load(ruta, allow_pickle=False) as z:
+            partes.append(pd.DataFrame({k: z[k] for k in z.files}))
+    if not partes:
+        return pd.DataFrame(columns=[n for n, _ in _COLUMNAS])
+    return pd.concat(partes, ignore_index=True).sort_values("ts", ignore_index=True)
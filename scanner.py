@@ -0,0 +1,455 @@
+"""
+Scanner de fondo — Crypto Predictor 5min
+═════════════════════════════════════════
+Lanza scan_rapido para todos los símbolos en un pool de hilos, refresca
+en segundo plano cada `intervalo` segundos y publica cada resultado en un
+almacén compartido. La app solo lee del almacén: nunca espera a la red.
+
+EscanerUniverso amplía el scan a todos los pares USDT de OKX (+ USD de
+Kraken que OKX no lista): velas en lotes concurrentes, score vectorizado
+por lote y top-K de señales alcistas y bajistas.
+"""
+
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from crypto_predictor import (
+    scan_rapido, puntuar_lote, normalizar_symbol,
+    _kraken_ohlc, _kraken_ohlc_desde, _okx_ohlc, _kraken_pares_usd, _okx_pares_usdt,
+)
+
+_SCAN_VACIO = {"prob_subida": 50, "color": "neutro", "direccion": "?"}
+
+
+# ─────────────────────────────────────────────
+# ALMACÉN COMPARTIDO
+# ─────────────────────────────────────────────
+class AlmacenScan:
+    """Resultados del último scan por símbolo, seguros entre hilos."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._datos  = {}
+        self._ts     = {}
+        self.version = 0   # sube con cada publicación (útil para detectar cambios)
+
+    def publicar(self, symbol: str, resultado: dict):
+        with self._lock:
+            self._datos[symbol] = resultado
+            self._ts[symbol]    = time.time()
+            self.version       += 1
+
+    def leer(self) -> dict:
+        """Copia instantánea {symbol: resultado} — no bloquea a los escritores."""
+        with self._lock:
+            return dict(self._datos)
+
+    def antiguedad(self, symbol: str) -> float:
+        """Segundos desde la última publicación del símbolo (inf si nunca)."""
+        with self._lock:
+            ts = self._ts.get(symbol)
+        return time.time() - ts if ts else float("inf")
+
+
+# ─────────────────────────────────────────────
+# ESTADO INCREMENTAL POR SÍMBOLO
+# ─────────────────────────────────────────────
+class EstadoVelas:
+    """
+    Ventana de las últimas `n_velas` velas 1m cerradas de un par. Tras la
+    primera descarga solo pide a Kraken lo posterior al último id ("since"),
+    así que cada sondeo trae 0-1 velas en vez del histórico completo.
+    """
+
+    def __init__(self, pair: str, n_velas: int = 60):
+        self.pair    = pair
+        self.n_velas = n_velas
+        self.df      = None
+        self._since  = None
+
+    @property
+    def ultimo_cierre(self):
+        """Timestamp de la última vela cerrada (None si aún no hay datos)."""
+        return self.df.index[-1] if self.df is not None and len(self.df) else None
+
+    def actualizar(self) -> bool:
+        """Incorpora las velas nuevas; True si cerró alguna desde la última vez."""
+        nuevas, self._since = _kraken_ohlc_desde(self.pair, 1, self._since)
+        if nuevas is None:
+            return False
+        if self.df is not None:
+            nuevas = nuevas[nuevas.index > self.df.index[-1]]
+        if nuevas.empty:
+            return False
+        previas = [self.df] if self.df is not None else []
+        self.df = pd.concat(previas + [nuevas]).iloc[-self.n_velas:]
+        return True
+
+
+# ─────────────────────────────────────────────
+# SERVICIO DE SCAN
+# ─────────────────────────────────────────────
+class ServicioScan:
+    """
+    Scans concurrentes en un pool de `workers` hilos, repetidos por un hilo
+    daemon. Dos modos:
+      • completo    — cada `intervalo` s relanza `fn_scan` (scan_rapido)
+                      para todos los símbolos.
+      • incremental — tras cada cierre de minuto sondea (con "since": solo
+                      velas nuevas) los símbolos observados en los últimos
+                      `olvidar` s y, cada `intervalo` s, el resto. Solo los
+                      que cerraron vela se vuelven a puntuar, recalculando su
+                      ventana de `n_velas` en un lote vectorizado (no hay
+                      estado de indicadores en streaming). Sin nadie
+                      observando, las peticiones son las del modo completo.
+    observar(symbol) marca un símbolo como mirado (su análisis está en
+    pantalla) para seguirlo minuto a minuto.
+    `al_refrescar`, si se da, recibe {symbol: df 1m} de todos los símbolos
+    tras cada pasada incremental con velas nuevas (p. ej. la matriz de
+    correlación), reutilizando las velas ya descargadas.
+    Con `instantaneas` (instantanea.Instantaneas) el modo incremental
+    publica allí sus velas 1m, con las filas que necesita el análisis
+    completo, para que abrir un símbolo recién escaneado no las vuelva a
+    pedir; el modo completo ya lee y escribe en ella vía scan_rapido.
+    """
+
+    def __init__(self, symbols, intervalo: float = 300, workers: int = 6,
+                 almacen: AlmacenScan = None, fn_scan=scan_rapido,
+                 incremental: bool = False, n_velas: int = 60, al_refrescar=None,
+                 instantaneas=None, olvidar: float = 300):
+        self.symbols   = list(symbols)
+        self.intervalo = intervalo
+        self.almacen   = almacen or AlmacenScan()
+        self.incremental = incremental
+        self.n_velas   = n_velas
+        self._fn_scan  = fn_scan
+        self._al_refrescar = al_refrescar
+        self._instantaneas = instantaneas
+        self.olvidar   = olvidar
+        self._observados = {}       # symbol → time.time() de la última observación
+        self._sondeos  = {}         # symbol → time.time() del último sondeo
+        self._pool     = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="scan")
+        guardar = max(n_velas, instantaneas.min_velas) if instantaneas else n_velas
+        self._estados  = {s: EstadoVelas(normalizar_symbol(s)[0], guardar)
+                          for s in self.symbols}
+        self._parar    = threading.Event()
+        self._hilo     = None
+        self.ultima_pasada = 0.0    # duración (s) de la última pasada completa
+        self.recalculados  = 0      # símbolos re-puntuados (modo incremental)
+        self.sondeados     = 0      # peticiones de velas (modo incremental)
+
+    def refrescar(self):
+        """Una pasada: todos los símbolos en paralelo, publicando según terminan."""
+        if self.incremental:
+            return self.refrescar_incremental()
+        t0 = time.time()
+        futuros = {self._pool.submit(self._fn_scan, s): s for s in self.symbols}
+        for fut in as_completed(futuros):
+            try:
+                self.almacen.publicar(futuros[fut], fut.result())
+            except Exception:
+                pass
+        self.ultima_pasada = time.time() - t0
+
+    def observar(self, symbol: str):
+        """Sigue `symbol` minuto a minuto durante los próximos `olvidar` s."""
+        pair = normalizar_symbol(symbol)[0]
+        for s, estado in self._estados.items():
+            if estado.pair == pair:
+                self._observados[s] = time.time()
+
+    def _pendientes(self, ahora: float) -> list:
+        """Símbolos a sondear: los observados y los que llevan `intervalo` s sin sondeo."""
+        # (con 5 s de margen: el bucle despierta en cada minuto y no exactamente)
+        return [s for s in self.symbols
+                if ahora - self._observados.get(s, -1e18) < self.olvidar
+                or ahora - self._sondeos.get(s, -1e18) >= self.intervalo - 5]
+
+    def refrescar_incremental(self) -> list:
+        """
+        Sondea en paralelo los símbolos pendientes y re-puntúa solo los que
+        cerraron vela. Devuelve la lista de símbolos actualizados.
+        """
+        t0 = time.time()
+        pendientes = self._pendientes(t0)
+        for sym in pendientes:
+            self._sondeos[sym] = t0
+        self.sondeados += len(pendientes)
+
+        def _sondear(sym):
+            try:
+                return self._estados[sym].actualizar()
+            except Exception:
+                return False
+
+        cambiados = [s for s, nuevo in zip(pendientes, self._pool.map(_sondear, pendientes))
+                     if nuevo]
+        completos, cortos = {}, {}
+        for sym in cambiados:
+            df = self._estados[sym].df
+            (completos if len(df) >= self.n_velas else cortos)[sym] = df
+        resultados = puntuar_lote(completos, self.n_velas)
+        for sym, df in cortos.items():
+            if len(df) >= 20:
+                resultados.update(puntuar_lote({sym: df}, n_velas=len(df)))
+        for sym in cambiados:
+            self.almacen.publicar(sym, resultados.get(sym, dict(_SCAN_VACIO)))
+            if self._instantaneas is not None:
+                estado = self._estados[sym]
+                self._instantaneas.publicar_velas(estado.pair, 1, estado.df)
+        if cambiados and self._al_refrescar:
+            try:
+                self._al_refrescar({s: e.df.iloc[-self.n_velas:]
+                                    for s, e in self._estados.items()
+                                    if e.df is not None})
+            except Exception:
+                pass
+        self.recalculados  += len(cambiados)
+        self.ultima_pasada = time.time() - t0
+        return cambiados
+
+    def _espera(self) -> float:
+        if not self.incremental:
+            return self.intervalo
+        # 2 s después del próximo cierre de vela de 1 minuto
+        return 60 - time.time() % 60 + 2
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            self.refrescar()
+            self._parar.wait(self._espera())
+
+    def iniciar(self):
+        """Arranca el hilo de refresco (idempotente)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="scan-bucle",
+                                          daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+
+    def resultados(self) -> dict:
+        """Lectura sin bloqueo de los últimos resultados publicados."""
+        return self.almacen.leer()
+
+
+# ─────────────────────────────────────────────
+# UNIVERSO COMPLETO — todos los pares USD
+# ─────────────────────────────────────────────
+class _Limitador:
+    """Espaciado mínimo entre peticiones a un venue (peticiones/segundo)."""
+
+    def __init__(self, rps: float):
+        self._intervalo = 1.0 / rps if rps else 0.0
+        self._lock      = threading.Lock()
+        self._siguiente = 0.0
+
+    def esperar(self, hasta: float = None) -> bool:
+        """
+        Espera el turno. Con `hasta` (time.monotonic()), si el turno cae
+        después no lo reserva y devuelve False sin esperar.
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            if hasta is not None and turno > hasta:
+                return False
+            self._siguiente = turno + self._intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+        return True
+
+
+_NO_LLEGO = object()     # par sin turno antes de agotar el presupuesto
+
+
+class EscanerUniverso:
+    """
+    Scan de todo el universo por pasadas:
+      1. descubre pares (OKX USDT + Kraken USD de bases que OKX no tiene:
+         OKX admite ~20 peticiones de velas/s y Kraken ~1/s por IP, que
+         además comparte con el resto de la app),
+      2. descarga velas 1m en lotes de `lote` símbolos con `workers` hilos,
+         respetando `rps` peticiones/s por venue; los pares se intercalan
+         en proporción a esos límites para que cada lote avance en los dos
+         venues a la vez,
+      3. puntúa cada lote de golpe con puntuar_lote (vectorizado),
+      4. ordena con dos heaps de tamaño `top_k` las señales más fuertes.
+    Cada pasada dura como mucho `presupuesto` segundos (por defecto, una
+    vela de 1 minuto): un par cuyo turno caería después no se pide, y la
+    pasada siguiente sigue desde el primero que quedó sin pedir. Así, con
+    más pares de los que caben en una pasada (la cola de Kraken a 1/s),
+    el universo se recorre entero en varias. El ranking mezcla las
+    puntuaciones de esta pasada con las anteriores de menos de `max_edad`
+    segundos; cada entrada lleva "edad_s".
+    """
+
+    def __init__(self, top_k: int = 10, n_velas: int = 60, workers: int = 16,
+                 lote: int = 48, rps: dict = None, presupuesto: float = 60.0,
+                 ttl_universo: float = 3600.0, max_edad: float = 900.0,
+                 intervalo: float = 60.0):
+        self.top_k        = top_k
+        self.n_velas      = n_velas
+        self.lote         = lote
+        self.presupuesto  = presupuesto
+        self.ttl_universo = ttl_universo
+        self.max_edad     = max_edad
+        self.intervalo    = intervalo
+        self.rps      = rps or {"kraken": 1, "okx": 18}
+        self._limites = {v: _Limitador(r) for v, r in self.rps.items()}
+        self._pool    = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="universo")
+        self._universo    = []
+        self._universo_ts = 0.0
+        self._cursor      = 0       # posición del primer par sin pedir en la vuelta
+        self._scores      = {}      # "SYM@venue" → (resultado, time.time())
+        self._lock        = threading.Lock()
+        self._parar       = threading.Event()
+        self._hilo        = None
+        self.ultimo       = None    # ranking de la última pasada
+
+    # ── Descubrimiento ──
+    def descubrir(self, forzar: bool = False) -> list:
+        """[{"symbol", "venue", "inst"}] — cacheado `ttl_universo` segundos."""
+        if not forzar and self._universo and \
+                time.time() - self._universo_ts < self.ttl_universo:
+            return self._universo
+        okx = [{"symbol": base, "venue": "okx", "inst": inst}
+               for inst, base in _okx_pares_usdt()]
+        en_okx = {u["symbol"] for u in okx}
+        kraken = [{"symbol": base, "venue": "kraken", "inst": alt}
+                  for alt, base in _kraken_pares_usd() if base not in en_okx]
+        # Turno de cada par = su posición / rps de su venue (reparto proporcional)
+        turnos = [(i / self.rps[u["venue"]], n, u)
+                  for n, lista in enumerate((okx, kraken)) for i, u in enumerate(lista)]
+        universo = [u for _, _, u in sorted(turnos, key=lambda t: t[:2])]
+        if universo:
+            if universo != self._universo:
+                self._cursor = 0
+            self._universo, self._universo_ts = universo, time.time()
+        return self._universo
+
+    # ── Descarga ──
+    def _velas(self, par: dict, hasta: float = None):
+        if not self._limites[par["venue"]].esperar(hasta):
+            return _NO_LLEGO
+        try:
+            if par["venue"] == "kraken":
+                return _kraken_ohlc(par["inst"], 1, self.n_velas)
+            return _okx_ohlc(par["inst"], self.n_velas)
+        except Exception:
+            return None
+
+    # ── Pasada ──
+    def pasada(self) -> dict:
+        t0 = time.time()
+        hasta = time.monotonic() + self.presupuesto
+        universo = self.descubrir()
+        n = len(universo)
+        inicio = self._cursor % n if n else 0
+        orden  = universo[inicio:] + universo[:inicio]
+        n_pedidos = n_puntuados = 0
+        sin_pedir = None                 # primer índice (en `orden`) que no llegó
+
+        for i in range(0, n, self.lote):
+            if time.monotonic() >= hasta:
+                sin_pedir = i if sin_pedir is None else sin_pedir
+                break
+            pares = orden[i:i + self.lote]
+            descargas = list(self._pool.map(lambda p: self._velas(p, hasta), pares))
+            velas = {}
+            for j, (p, df) in enumerate(zip(pares, descargas)):
+                if df is _NO_LLEGO:
+                    sin_pedir = i + j if sin_pedir is None else sin_pedir
+                    continue
+                n_pedidos += 1
+                velas[f"{p['symbol']}@{p['venue']}"] = df
+            scores = puntuar_lote(velas, self.n_velas)
+            ahora  = time.time()
+            with self._lock:
+                for clave, res in scores.items():
+                    self._scores[clave] = (res, ahora)
+            n_puntuados += len(scores)
+            if sin_pedir is not None:
+                break
+
+        completo = sin_pedir is None
+        self._cursor = (inicio + (sin_pedir or 0)) % n if n else 0
+        ranking = self._ranking()
+        ranking.update({
+            "n_pares":     n,
+            "n_pedidos":   n_pedidos,
+            "n_puntuados": n_puntuados,
+            "cursor":      self._cursor,
+            "duracion":    time.time() - t0,
+            "completo":    completo,
+        })
+        with self._lock:
+            self.ultimo = ranking
+        return ranking
+
+    def _ranking(self) -> dict:
+        """Top-K alcistas y bajistas entre las puntuaciones de menos de `max_edad` s."""
+        ahora = time.time()
+        vigentes = {f"{u['symbol']}@{u['venue']}" for u in self._universo}
+        alcistas, bajistas = [], []      # min-heaps de (fuerza, clave, resultado)
+
+        def _meter(heap, fuerza, clave, res):
+            item = (fuerza, clave, res)
+            if len(heap) < self.top_k:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+        with self._lock:
+            for clave in [c for c, (_, ts) in self._scores.items()
+                          if c not in vigentes or ahora - ts > self.max_edad]:
+                del self._scores[clave]
+            scores = list(self._scores.items())
+        for clave, (res, ts) in scores:
+            res = dict(res, edad_s=ahora - ts)
+            if res["score"] > 0:
+                _meter(alcistas, res["score"], clave, res)
+            elif res["score"] < 0:
+                _meter(bajistas, -res["score"], clave, res)
+        return {
+            "alcistas":  [(c, r) for _, c, r in sorted(alcistas, reverse=True)],
+            "bajistas":  [(c, r) for _, c, r in sorted(bajistas, reverse=True)],
+            "cobertura": len(scores) / max(1, len(self._universo)),
+            "ts":        ahora,
+        }
+
+    # ── Servicio de fondo ──
+    def _bucle(self):
+        while not self._parar.is_set():
+            t0 = time.time()
+            try:
+                self.pasada()
+            except Exception:
+                pass
+            self._parar.wait(max(0.0, self.intervalo - (time.time() - t0)))
+
+    def iniciar(self):
+        """Arranca las pasadas periódicas cada `intervalo` s (idempotente)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="universo-bucle",
+                                          daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+
+    def resultados(self):
+        """Último ranking (None hasta terminar la primera pasada)."""
+        with self._lock:
+            return self.ultimo
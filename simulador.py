@@ -0,0 +1,244 @@
+"""
+Simulador — Crypto Predictor 5min
+══════════════════════════════════
+Servidor HTTP local que se hace pasar por Kraken, OKX y alternative.me
+para pruebas de carga sin red. Los datos salen de
+fixturas.MercadoSintetico (velas, books, trades, funding, OI, long/short
+coherentes, a la hora real) para cualquier número de símbolos.
+
+  python simulador.py --symbols 200 --latencia 80 --jitter 40 \\
+                      --errores 0.02 --timeouts 0.005 --limite 20
+  # y en otra terminal, con las variables que imprime:
+  CRYPTO_KRAKEN_BASE=http://127.0.0.1:8090/0/public \\
+  CRYPTO_OKX_BASE=http://127.0.0.1:8090/api/v5 \\
+  CRYPTO_FNG_URL=http://127.0.0.1:8090/fng/?limit=3 streamlit run app_cripto.py
+
+Fallos simulados, por petición:
+  • latencia — fija + exponencial de media `jitter` (ms)
+  • errores  — fracción de respuestas 5xx
+  • timeouts — fracción de peticiones que no responden en `espera_timeout` s
+  • limite   — peticiones/s por venue (cubo de fichas con ráfaga = limite);
+               al pasarse, Kraken responde EAPI:Rate limit exceeded y OKX 429
+
+GET /__estadisticas devuelve las peticiones servidas por venue, endpoint
+y resultado (JSON); POST /__reiniciar las pone a cero.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from fixturas import MercadoSintetico
+
+
+class _Cubo:
+    """Limitador de cubo de fichas: `tasa` fichas/s, capacidad `rafaga`."""
+
+    def __init__(self, tasa: float, rafaga: float):
+        self.tasa, self.rafaga = tasa, rafaga
+        self._fichas = rafaga
+        self._t      = time.monotonic()
+        self._lock   = threading.Lock()
+
+    def tomar(self) -> bool:
+        with self._lock:
+            ahora = time.monotonic()
+            self._fichas = min(self.rafaga, self._fichas + (ahora - self._t) * self.tasa)
+            self._t = ahora
+            if self._fichas < 1:
+                return False
+            self._fichas -= 1
+            return True
+
+
+def _venue(ruta: str) -> str:
+    if ruta.startswith("/0/public/"):
+        return "kraken"
+    if ruta.startswith("/api/v5/"):
+        return "okx"
+    if ruta.startswith("/fng"):
+        return "fng"
+    return ""
+
+
+class SimuladorMercado:
+    """
+    Servidor del mercado sintético en un hilo daemon.
+      iniciar() / detener()  — como ServidorMetricas
+      entorno()              — variables CRYPTO_* para apuntar el predictor aquí
+      estadisticas()         — {venue: {endpoint: {resultado: n}}}
+    """
+
+    def __init__(self, mercado: MercadoSintetico = None, puerto: int = 8090,
+                 host: str = "127.0.0.1", latencia: float = 0.0, jitter: float = 0.0,
+                 errores: float = 0.0, timeouts: float = 0.0, limite: float = None,
+                 espera_timeout: float = 30.0, seed: int = None):
+        self.mercado  = mercado or MercadoSintetico()
+        self.host, self.puerto = host, puerto
+        self.latencia = latencia / 1000
+        self.jitter   = jitter / 1000
+        self.errores  = errores
+        self.timeouts = timeouts
+        self.espera_timeout = espera_timeout
+        self._cubos   = ({v: _Cubo(limite, limite) for v in ("kraken", "okx", "fng")}
+                         if limite else {})
+        self._rng     = random.Random(seed)
+        self._lock    = threading.Lock()
+        self._stats   = {}
+        self.httpd    = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.puerto}"
+
+    def entorno(self) -> dict:
+        return {"CRYPTO_KRAKEN_BASE": f"{self.url}/0/public",
+                "CRYPTO_OKX_BASE":    f"{self.url}/api/v5",
+                "CRYPTO_FNG_URL":     f"{self.url}/fng/?limit=3"}
+
+    def configurar(self, modulo=None):
+        """Apunta un crypto_predictor ya importado a este servidor."""
+        if modulo is None:
+            import crypto_predictor as modulo
+        e = self.entorno()
+        modulo.KRAKEN_BASE = e["CRYPTO_KRAKEN_BASE"]
+        modulo.OKX_BASE    = e["CRYPTO_OKX_BASE"]
+        modulo.FNG_URL     = e["CRYPTO_FNG_URL"]
+
+    # ── Estadísticas ──
+    def _anotar(self, venue: str, endpoint: str, resultado: str):
+        with self._lock:
+            ep = self._stats.setdefault(venue, {}).setdefault(endpoint, {})
+            ep[resultado] = ep.get(resultado, 0) + 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def total_peticiones(self) -> int:
+        with self._lock:
+            return sum(n for eps in self._stats.values() for r in eps.values()
+                       for n in r.values())
+
+    def reiniciar(self):
+        with self._lock:
+            self._stats.clear()
+
+    # ── Petición ──
+    def atender(self, ruta: str, params: dict) -> tuple:
+        """(código HTTP, cuerpo JSON o None) de una petición, con los fallos simulados."""
+        venue = _venue(ruta)
+        endpoint = ruta.rsplit("/", 1)[-1] if venue != "okx" else ruta.split("/api/v5/", 1)[1]
+        with self._lock:
+            azar, espera = self._rng.random(), self._rng.expovariate(1.0) * self.jitter
+        if not venue:
+            self._anotar("?", ruta, "404")
+            return 404, None
+        if self.latencia or espera:
+            time.sleep(self.latencia + espera)
+        if azar < self.timeouts:
+            self._anotar(venue, endpoint, "timeout")
+            time.sleep(self.espera_timeout)
+            return 504, None
+        cubo = self._cubos.get(venue)
+        if cubo is not None and not cubo.tomar():
+            self._anotar(venue, endpoint, "limite")
+            if venue == "kraken":
+                return 200, {"error": ["EAPI:Rate limit exceeded"]}
+            return 429, {"code": "50011", "msg": "Too Many Requests", "data": []}
+        if azar < self.timeouts + self.errores:
+            self._anotar(venue, endpoint, "5xx")
+            return self._rng.choice((500, 502, 503)), None
+        cuerpo = self.mercado.responder(ruta, params)
+        self._anotar(venue, endpoint, "200" if cuerpo is not None else "404")
+        return (200, cuerpo) if cuerpo is not None else (404, None)
+
+    def _manejador(self):
+        sim = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self, codigo: int, cuerpo):
+                datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                u = urlsplit(self.path)
+                if u.path == "/__estadisticas":
+                    self._responder(200, sim.estadisticas())
+                    return
+                try:
+                    codigo, cuerpo = sim.atender(u.path, dict(parse_qsl(u.query)))
+                except Exception as e:
+                    codigo, cuerpo = 500, {"error": [str(e)]}
+                try:
+                    self._responder(codigo, cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass                 # el cliente se cansó de esperar (timeout simulado)
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/__reiniciar":
+                    self.send_error(404)
+                    return
+                sim.reiniciar()
+                self._responder(200, {})
+
+            def log_message(self, *args):
+                pass
+
+        return _Manejador
+
+    def iniciar(self):
+        """Arranca el servidor (idempotente); OSError si el puerto está ocupado."""
+        if self.httpd is None:
+            self.httpd = ThreadingHTTPServer((self.host, self.puerto), self._manejador())
+            self.httpd.daemon_threads = True
+            self.puerto = self.httpd.server_address[1]      # puerto 0 → uno libre
+            threading.Thread(target=self.httpd.serve_forever, name="simulador-http",
+                             daemon=True).start()
+        return self
+
+    def detener(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Simulador local de Kraken / OKX / alternative.me")
+    ap.add_argument("--puerto", type=int, default=8090)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--symbols", type=int, default=18, help="número de símbolos sintéticos")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--latencia", type=float, default=0.0, help="latencia fija (ms)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="latencia extra media (ms)")
+    ap.add_argument("--errores", type=float, default=0.0, help="fracción de respuestas 5xx")
+    ap.add_argument("--timeouts", type=float, default=0.0, help="fracción de peticiones colgadas")
+    ap.add_argument("--limite", type=float, help="peticiones/s por venue")
+    args = ap.parse_args(argv)
+
+    sim = SimuladorMercado(MercadoSintetico(n_symbols=args.symbols, seed=args.seed),
+                           args.puerto, args.host, args.latencia, args.jitter,
+                           args.errores, args.timeouts, args.limite, seed=args.seed).iniciar()
+    print(f"Simulador en {sim.url} · {args.symbols} símbolos")
+    for k, v in sim.entorno().items():
+        print(f"export {k}='{v}'")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sim.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Tiempos — Crypto Predictor 5min
+════════════════════════════════
+Tramos de tiempo por etapa (descargas, cada indicador, predicción,
+secciones de la app) para saber en qué se va un análisis lento.
+
+  with informe() as inf:          # abre un informe en este hilo
+      with tramo("fetch.okx"):    # mide una etapa (anidable)
+          ...
+  inf.resumen()                   # {"total_ms", "tramos", "por_grupo"}
+
+seccion("app.hero") marca etapas seguidas (cierra la anterior) sin
+tener que anidar el código en un with.
+
+@medido() hace lo mismo con una función. Sin informe abierto ni
+histogramas activos un tramo no mide nada, así que puede quedarse en
+el código de producción. activar_histogramas() agrega además todas
+las duraciones del proceso en histogramas por tramo (p50/p95/p99).
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+_LOCAL = threading.local()
+
+# Límites de los cubos del histograma (ms), logarítmicos de 0.01 ms a 100 s
+_CUBOS_MS = np.logspace(-2, 5, 57)
+
+
+class Informe:
+    """Tramos medidos en un hilo: (nombre, nivel, inicio, duración) en s."""
+
+    def __init__(self):
+        self.t0     = time.perf_counter()
+        self.fin    = None
+        self.tramos = []
+        self.nivel  = 0
+        self._seccion = None
+
+    def cerrar_seccion(self):
+        if self._seccion is not None:
+            nombre, t0 = self._seccion
+            self._seccion = None
+            self.nivel -= 1
+            _anotar(self, nombre, self.nivel, t0, time.perf_counter() - t0)
+
+    def resumen(self) -> dict:
+        fin = self.fin or time.perf_counter()
+        por_grupo = {}
+        for nombre, nivel, _, dur in self.tramos:
+            if nivel == 0:
+                grupo = nombre.split(".", 1)[0]
+                por_grupo[grupo] = por_grupo.get(grupo, 0.0) + dur * 1000
+        return {
+            "total_ms":  (fin - self.t0) * 1000,
+            "tramos":    [{"tramo": n, "nivel": nv, "inicio_ms": (ini - self.t0) * 1000,
+                           "ms": dur * 1000}
+                          for n, nv, ini, dur in sorted(self.tramos, key=lambda t: t[2])],
+            "por_grupo": por_grupo,
+        }
+
+
+class Histogramas:
+    """Duraciones agregadas por tramo en cubos logarítmicos; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._cuenta = {}
+        self._suma   = {}
+
+    def añadir(self, nombre: str, ms: float):
+        i = int(np.searchsorted(_CUBOS_MS, ms))
+        with self._lock:
+            c = self._cuenta.get(nombre)
+            if c is None:
+                c = self._cuenta[nombre] = np.zeros(len(_CUBOS_MS) + 1, dtype=np.int64)
+            c[i] += 1
+            self._suma[nombre] = self._suma.get(nombre, 0.0) + ms
+
+    def resumen(self) -> dict:
+        """{tramo: {"n", "media_ms", "p50_ms", "p95_ms", "p99_ms"}} (límite superior del cubo)."""
+        with self._lock:
+            cuentas = {k: v.copy() for k, v in self._cuenta.items()}
+            sumas   = dict(self._suma)
+        limites = np.append(_CUBOS_MS, np.inf)
+        res = {}
+        for nombre, c in cuentas.items():
+            n = int(c.sum())
+            acum = np.cumsum(c) / n
+            p = {f"p{q}_ms": float(limites[np.searchsorted(acum, q / 100)])
+                 for q in (50, 95, 99)}
+            res[nombre] = {"n": n, "media_ms": sumas[nombre] / n, **p}
+        return res
+
+    def limpiar(self):
+        with self._lock:
+            self._cuenta.clear()
+            self._suma.clear()
+
+
+HISTOGRAMAS = Histogramas()
+_HISTOGRAMAS_ACTIVOS = False
+
+
+def activar_histogramas(activo: bool = True):
+    """Agrega (o deja de agregar) todos los tramos del proceso en HISTOGRAMAS."""
+    global _HISTOGRAMAS_ACTIVOS
+    _HISTOGRAMAS_ACTIVOS = activo
+
+
+@contextmanager
+def informe():
+    """
+    Abre un informe en el hilo actual. Anidado dentro de otro, al cerrarse
+    sus tramos pasan también al de fuera (un nivel más adentro).
+    """
+    padre = getattr(_LOCAL, "informe", None)
+    inf = _LOCAL.informe = Informe()
+    try:
+        yield inf
+    finally:
+        inf.cerrar_seccion()
+        inf.fin = time.perf_counter()
+        _LOCAL.informe = padre
+        if padre is not None:
+            padre.tramos.extend((n, nv + padre.nivel, ini, dur)
+                                for n, nv, ini, dur in inf.tramos)
+
+
+@contextmanager
+def tramo(nombre: str):
+    """Mide el bloque si hay un informe abierto o histogramas activos."""
+    inf = getattr(_LOCAL, "informe", None)
+    if inf is None and not _HISTOGRAMAS_ACTIVOS:
+        yield
+        return
+    nivel = inf.nivel if inf is not None else 0
+    if inf is not None:
+        inf.nivel += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if inf is not None:
+            inf.nivel -= 1
+        _anotar(inf, nombre, nivel, t0, time.perf_counter() - t0)
+
+
+def _anotar(inf, nombre, nivel, t0, dur):
+    if inf is not None:
+        inf.tramos.append((nombre, nivel, t0, dur))
+    if _HISTOGRAMAS_ACTIVOS:
+        HISTOGRAMAS.añadir(nombre, dur * 1000)
+
+
+def seccion(nombre: str):
+    """
+    Cierra la sección abierta del informe actual y abre `nombre`: marca
+    etapas consecutivas sin anidar el código (la última se cierra con el
+    informe). Los tramos de dentro quedan un nivel por debajo.
+    """
+    inf = getattr(_LOCAL, "informe", None)
+    if inf is None:
+        return
+    inf.cerrar_seccion()
+    inf._seccion = (nombre, time.perf_counter())
+    inf.nivel += 1
+
+
+def medido(nombre: str = None):
+    """Decorador: un tramo por llamada (por defecto con el nombre de la función)."""
+    def deco(fn):
+        etiqueta = nombre or fn.__name__
+
+        @functools.wraps(fn)
+        def envuelta(*args, **kwargs):
+            if getattr(_LOCAL, "informe", None) is None and not _HISTOGRAMAS_ACTIVOS:
+                return fn(*args, **kwargs)
+            with tramo(etiqueta):
+                return fn(*args, **kwargs)
+        return envuelta
+    return deco